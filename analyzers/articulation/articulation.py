@@ -1,13 +1,19 @@
+from dataclasses import dataclass, field
 
+import numpy as np
 import pandas as pd
-from functools import lru_cache
-from music21 import converter, stream
+from music21 import stream
 
-from data_processing import derive_observed_grades
-from analyzers.articulation.articulation_confidence import get_articulation_confidence 
+from data_processing import derive_observed_grades, rules_cache, rules_file
+from analyzers.articulation.articulation_confidence import (
+    articulation_comment,
+    articulation_confidence_matrix,
+    compiled_articulation_rules,
+    encode_articulations,
+)
 
 from models import BaseAnalyzer, PartialNoteData, ArticulationGradeRules
-from utilities import iter_measure_events
+from utilities import iter_measure_events, load_score, stable_note_id, ticks_per_quarter, to_ticks
 
 
 # ----------------------------
@@ -19,17 +25,20 @@ class ArticulationAnalyzer(BaseAnalyzer):
     Expects BaseAnalyzer to store self.rules (dict[grade -> rules_for_grade])
     """
 
-    def analyze(self, score, grade: float, *, run_target: bool = False):
-        return analyze_articulation(score, self.rules, grade, run_target=run_target)
+    def analyze(self, score, grade: float, *, run_target: bool = False, note_table=None):
+        return analyze_articulation(score, self.rules, grade, run_target=run_target, note_table=note_table)
+
+    def analyze_grades(self, score, grades):
+        return articulation_confidences(score, self.rules, grades)
 
 
 # ----------------------------
 # Rules loader
 # ----------------------------
 
-@lru_cache(maxsize=1)
+@rules_cache
 def load_articulation_rules(path: str = r"data/articulation_guidelines.csv") -> dict[float, ArticulationGradeRules]:
-    df = pd.read_csv(path)
+    df = pd.read_csv(rules_file(path))
     rules: dict[float, ArticulationGradeRules] = {}
 
     for _, row in df.iterrows():
@@ -60,6 +69,7 @@ def run_articulation(
     progress_cb=None,
     run_observed=True,
     analysis_options=None,
+    note_table=None,
 ):
     rules = load_articulation_rules()
     analyzer = ArticulationAnalyzer(rules)
@@ -68,7 +78,7 @@ def run_articulation(
         if score is not None:
             score_factory = lambda: score
         elif score_path is not None:
-            score_factory = lambda: converter.parse(score_path)
+            score_factory = lambda: load_score(score_path)
         else:
             raise ValueError("score_path or score_factory is required")
 
@@ -82,6 +92,7 @@ def run_articulation(
         kwargs = {
             "score_factory": score_factory,
             "analyze_confidence": lambda s, g: analyzer.analyze(s, g, run_target=False),
+            "analyze_confidences": analyzer.analyze_grades,
             "progress_cb": progress_cb,
         }
         if grades is not None:
@@ -93,7 +104,9 @@ def run_articulation(
     # 2) Target-grade UI data (single parse)
     if score is None:
         score = score_factory()
-    analysis_notes, overall_conf = analyzer.analyze(score, target_grade, run_target=True)
+    analysis_notes, overall_conf = analyzer.analyze(
+        score, target_grade, run_target=True, note_table=note_table
+    )
 
     return {
         "observed_grade": observed,
@@ -104,67 +117,140 @@ def run_articulation(
 
 
 # ----------------------------
-# Confidence-only pass
+# Extraction + confidence passes
 # ----------------------------
 
-def analyze_articulation(score, rules: dict[float, ArticulationGradeRules], grade: float, *, run_target: bool = False):
-    total_weighted = 0.0
-    total_dur = 0.0
-    analysis_notes: dict | None = {} if run_target else None
+@dataclass
+class _ArticulatedPart:
+    name: str
+    index: int
+    measures: list = field(default_factory=list)
+    offsets: list = field(default_factory=list)
+    offset_ticks: list = field(default_factory=list)
+    durations: list = field(default_factory=list)
+    pitches: list = field(default_factory=list)
+    midis: list = field(default_factory=list)
+    masks: list = field(default_factory=list)
+    counts: list = field(default_factory=list)
+    singles: list = field(default_factory=list)
+
+
+def extract_articulations(score) -> list[_ArticulatedPart]:
+    """
+    Single walk over the score collecting every articulated note as a bitmask;
+    grade checks then run on the arrays instead of the music21 objects.
+    """
+    parts: list[_ArticulatedPart] = []
+    tpq = ticks_per_quarter(score)
+    for part_index, part in enumerate(score.parts):
+        data = _ArticulatedPart(part.partName or "Unknown Part", part_index)
+        for m in part.getElementsByClass(stream.Measure):
+            for n in iter_measure_events(m, expand_chords=True):
+                if n.isRest or not n.articulations:
+                    continue
+                mask, count, single = encode_articulations(n)
+                written_pitch = None
+                written_midi = None
+                if getattr(n, "isChord", False) is False and hasattr(n, "pitch"):
+                    written_pitch = n.pitch.nameWithOctave
+                    written_midi = n.pitch.midi
+                data.measures.append(m.number)
+                data.offsets.append(float(n.offset))
+                data.offset_ticks.append(to_ticks(n.offset, tpq))
+                data.durations.append(float(n.duration.quarterLength))
+                data.pitches.append(written_pitch)
+                data.midis.append(written_midi)
+                data.masks.append(mask)
+                data.counts.append(count)
+                data.singles.append(single)
+        parts.append(data)
+    return parts
+
+
+def _flatten(parts: list[_ArticulatedPart]):
+    masks = [v for p in parts for v in p.masks]
+    counts = [v for p in parts for v in p.counts]
+    durations = np.asarray([v for p in parts for v in p.durations], dtype=float)
+    return masks, counts, durations
+
+
+def articulation_confidences(score, rules: dict[float, ArticulationGradeRules], grades, *, parts=None) -> dict[float, float | None]:
+    """Duration-weighted articulation confidence for every grade in one pass."""
+    grades = [float(g) for g in grades]
+    if parts is None:
+        parts = extract_articulations(score)
+    masks, counts, durations = _flatten(parts)
+    total_dur = float(durations.sum())
+    compiled = compiled_articulation_rules(rules)
+    if total_dur <= 0:
+        return {g: None for g in grades}
+    if compiled is None:
+        return {g: 1.0 for g in grades}
+    confs = articulation_confidence_matrix(masks, counts, compiled, grades)
+    weighted = confs @ durations / total_dur
+    return {g: float(w) for g, w in zip(grades, weighted)}
+
+
+def analyze_articulation(
+    score,
+    rules: dict[float, ArticulationGradeRules],
+    grade: float,
+    *,
+    run_target: bool = False,
+    note_table=None,
+):
+    parts = extract_articulations(score)
+    if not run_target:
+        return articulation_confidences(score, rules, [grade], parts=parts)[float(grade)]
+
+    compiled = compiled_articulation_rules(rules)
+    analysis_notes: dict = {}
     overall_weighted = 0.0
     overall_total = 0.0
 
-    for part in score.parts:
-        part_name = part.partName or "Unknown Part"
+    for data in parts:
+        if compiled is not None and data.masks:
+            confs = articulation_confidence_matrix(data.masks, data.counts, compiled, [grade])[0]
+        else:
+            confs = np.ones(len(data.masks))
+
         part_notes: list[PartialNoteData] = []
         part_weighted = 0.0
         part_total = 0.0
+        for i, conf in enumerate(confs):
+            note = PartialNoteData(
+                measure=data.measures[i],
+                offset=data.offsets[i],
+                offset_ticks=data.offset_ticks[i],
+                grade=grade,
+                instrument=data.name,
+                duration=data.durations[i],
+                written_pitch=data.pitches[i],
+                written_midi_value=data.midis[i],
+            )
+            note.note_id = stable_note_id(data.index, note)
+            note.articulation_confidence = float(conf)
+            if conf == 0:
+                comment, ctype = articulation_comment(
+                    data.masks[i], data.counts[i], data.singles[i], grade
+                )
+                if ctype:
+                    note.add_comment(ctype, comment)
+            part_notes.append(note)
+            part_weighted += float(conf) * note.duration
+            part_total += note.duration
 
-        for m in part.getElementsByClass(stream.Measure):
-            for n in iter_measure_events(m, expand_chords=True):
-                if n.isRest or not n.articulations:
-                    continue
+        if note_table is not None:
+            note_table.add_analyzer_notes("articulation", part_notes)
+
+        part_conf = (part_weighted / part_total) if part_total > 0 else None
+        analysis_notes[data.name] = {
+            "articulation_data": part_notes,
+            "articulation_confidence": part_conf,
+        }
+        if part_total > 0:
+            overall_weighted += part_weighted
+            overall_total += part_total
 
-                conf, comment, ctype = get_articulation_confidence(n, rules, grade)
-                d = float(n.duration.quarterLength)
-                total_weighted += float(conf) * d
-                total_dur += d
-
-                if run_target:
-                    written_pitch = None
-                    written_midi = None
-                    if getattr(n, "isChord", False) is False and hasattr(n, "pitch"):
-                        written_pitch = n.pitch.nameWithOctave
-                        written_midi = n.pitch.midi
-
-                    data = PartialNoteData(
-                        measure=m.number,
-                        offset=float(n.offset),
-                        grade=grade,
-                        instrument=part_name,
-                        duration=float(n.duration.quarterLength),
-                        written_pitch=written_pitch,
-                        written_midi_value=written_midi,
-                    )
-                    data.articulation_confidence = float(conf)
-                    if conf == 0 and ctype:
-                        data.comments[ctype] = comment
-                    part_notes.append(data)
-                    part_weighted += float(conf) * data.duration
-                    part_total += data.duration
-
-        if run_target:
-            part_conf = (part_weighted / part_total) if part_total > 0 else None
-            analysis_notes[part_name] = {
-                "articulation_data": part_notes,
-                "articulation_confidence": part_conf,
-            }
-            if part_total > 0:
-                overall_weighted += part_weighted
-                overall_total += part_total
-
-    overall_conf = (total_weighted / total_dur) if total_dur > 0 else None
-    if run_target:
-        overall_conf = (overall_weighted / overall_total) if overall_total > 0 else None
-        return analysis_notes, overall_conf
-    return overall_conf
+    overall_conf = (overall_weighted / overall_total) if overall_total > 0 else None
+    return analysis_notes, overall_conf
@@ -1,42 +1,134 @@
-from utilities import format_grade, get_closest_grade
+from dataclasses import dataclass
+
+import numpy as np
+
+from data_processing import rules_cache
+from utilities import Comment, comment
+
+# Map music21 articulation names to our field names
+ART_MAPPING = {
+    'staccato': 'staccato',
+    'tenuto': 'tenuto',
+    'accent': 'accent',
+    'strongAccent': 'marcato',  # marcato is strongAccent in music21
+    'slur': 'slur'
+}
+
+# One bit per rule field; unrecognized articulations get no bit but still
+# count toward "multiple articulations".
+ART_BITS = {
+    'staccato': 1 << 0,
+    'tenuto': 1 << 1,
+    'accent': 1 << 2,
+    'marcato': 1 << 3,
+    'slur': 1 << 4,
+}
+
+
+@dataclass(frozen=True)
+class CompiledArticulationRules:
+    grades: np.ndarray    # sorted rule grades
+    allowed: np.ndarray   # per-grade bitmask of allowed articulations
+    multiple: np.ndarray  # per-grade bool: several articulations on one note ok
+
+    def grade_index(self, grades) -> np.ndarray:
+        """
+        Index of the closest rule grade for each requested grade
+        (ties go to the higher grade, as in get_closest_grade).
+        """
+        requested = np.asarray(grades, dtype=float).reshape(-1, 1)
+        dist = np.abs(self.grades.reshape(1, -1) - requested)
+        # argmin keeps the first minimum, so scan grades high-to-low
+        flipped = np.argmin(dist[:, ::-1], axis=1)
+        return len(self.grades) - 1 - flipped
+
+
+def _rules_signature(rules) -> tuple:
+    """Hashable (grade, *allowed flags, multiple) rows, sorted by grade."""
+    return tuple(
+        (float(g),)
+        + tuple(bool(getattr(rules[g], name)) for name in ART_BITS)
+        + (bool(rules[g].multiple_articulations),)
+        for g in sorted(rules, key=float)
+    )
+
+
+def _compile_signature(signature: tuple) -> CompiledArticulationRules:
+    grades = np.asarray([row[0] for row in signature], dtype=float)
+    allowed = np.zeros(len(signature), dtype=np.uint8)
+    for i, row in enumerate(signature):
+        for bit, on in zip(ART_BITS.values(), row[1:-1]):
+            if on:
+                allowed[i] |= bit
+    multiple = np.asarray([row[-1] for row in signature], dtype=bool)
+    return CompiledArticulationRules(grades, allowed, multiple)
+
+
+def compile_articulation_rules(rules) -> CompiledArticulationRules | None:
+    if not rules:
+        return None
+    return _compile_signature(_rules_signature(rules))
+
+
+@rules_cache
+def _cached_compile(signature: tuple = ()) -> CompiledArticulationRules | None:
+    return _compile_signature(signature) if signature else None
+
+
+def compiled_articulation_rules(rules) -> CompiledArticulationRules | None:
+    """compile_articulation_rules, cached per rules version and rule contents."""
+    if not rules:
+        return None
+    return _cached_compile(_rules_signature(rules))
+
+
+def encode_articulations(note) -> tuple[int, int, str | None]:
+    """
+    Returns (bitmask, articulation count, rule name of a single articulation).
+    """
+    names = [ART_MAPPING.get(art.name, art.name) for art in note.articulations]
+    mask = 0
+    for name in names:
+        mask |= ART_BITS.get(name, 0)
+    single = names[0] if len(names) == 1 and names[0] in ART_BITS else None
+    return mask, len(names), single
+
+
+def articulation_confidence_matrix(masks, counts, compiled: CompiledArticulationRules, grades) -> np.ndarray:
+    """
+    Confidence (0/1) for every grade x note.
+    Single articulations must be allowed at the grade; several on one note
+    need the grade's multiple-articulations flag.
+    """
+    masks = np.asarray(masks, dtype=np.uint8)
+    counts = np.asarray(counts, dtype=np.int16)
+    idx = compiled.grade_index(grades)
+    allowed = compiled.allowed[idx][:, None]
+    multiple = compiled.multiple[idx][:, None]
+
+    single_ok = (masks[None, :] & ~allowed) == 0
+    multi = counts[None, :] > 1
+    ok = np.where(multi, multiple, single_ok)
+    return ok.astype(float)
+
+
+def articulation_comment(mask: int, count: int, single: str | None, grade: float) -> tuple[Comment | None, str | None]:
+    """Comment and comment type for a note that failed the grade's rules."""
+    if count > 1:
+        return comment("articulation.multiple", grade=grade), "multiple_articulations"
+    if single:
+        return comment("articulation.single", articulation=single, grade=grade), single
+    return None, None
 
 
 def get_articulation_confidence(note, rules, grade):
-    # Map music21 articulation names to our field names
-    art_mapping = {
-        'staccato': 'staccato',
-        'tenuto': 'tenuto',
-        'accent': 'accent',
-        'strongAccent': 'marcato',  # marcato is strongAccent in music21
-        'slur': 'slur'
-    }
-    
-    articulations = [art_mapping.get(art.name, art.name) for art in note.articulations]
-    
-    rule_grade = get_closest_grade(grade, rules.keys())
-    if rule_grade is None:
+    compiled = compiled_articulation_rules(rules)
+    if compiled is None:
         return (1, None, None)
 
-    if len(articulations) > 1:
-        return (
-            (1, None, None)
-            if rules[rule_grade].multiple_articulations
-            else (
-                0,
-                f"Multiple articulations per note are not common for grade {format_grade(grade)}",
-                "multiple_articulations",
-            )
-        )
-    else:
-        for art in articulations:
-            if hasattr(rules[rule_grade], art):
-                return (
-                    (1, None, None)
-                    if getattr(rules[rule_grade], art)
-                    else (
-                        0,
-                        f"{art}s are not common for grade {format_grade(grade)}",
-                        art,
-                    )
-                )
-        return (1, None, None)  # If no recognized articulation, assume ok
+    mask, count, single = encode_articulations(note)
+    conf = int(articulation_confidence_matrix([mask], [count], compiled, [grade])[0, 0])
+    if conf:
+        return (1, None, None)
+    comment, ctype = articulation_comment(mask, count, single, grade)
+    return (0, comment, ctype)
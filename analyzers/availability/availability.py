@@ -1,8 +1,7 @@
 
-from data_processing import build_instrument_data, derive_observed_grades
+from data_processing import build_instrument_data, derive_observed_grades, rule_table
 from models import BaseAnalyzer
-from utilities import format_grade, validate_part_for_availability
-from music21 import converter
+from utilities import format_grade, load_score, validate_part_for_availability
 from statistics import mean
 import re
 
@@ -16,13 +15,7 @@ def _apply_unavailable_penalty(base_conf: float | None, penalty_total: float) ->
 
 def _stepwise_penalty(delta: float) -> float:
     # delta = availability_grade - target_grade
-    if delta <= 0.5:
-        return 0.05
-    if delta <= 1.0:
-        return 0.10
-    if delta <= 2.0:
-        return 0.15
-    return 0.20
+    return rule_table("availability_unavailable_penalty").evaluate(delta)
 
 
 def _pretty_instrument_name(key: str) -> str:
@@ -74,7 +67,7 @@ def run_availability(
         if score is not None:
             score_factory = lambda: score
         elif score_path is not None:
-            score_factory = lambda: converter.parse(score_path)
+            score_factory = lambda: load_score(score_path)
         else:
             raise ValueError("score_path or score_factory is required")
 
@@ -1,10 +1,9 @@
 
 from models import BaseAnalyzer
-from utilities import format_grade, get_rounded_grade
-from music21 import converter
+from utilities import format_grade, get_rounded_grade, load_score
 from statistics import mean
 
-from data_processing import derive_observed_grades
+from data_processing import derive_observed_grades, rule_table
 from .helpers import load_dynamics_rules, derive_dynamics_data
 
 class DynamicsAnalyzer(BaseAnalyzer):
@@ -29,7 +28,7 @@ def run_dynamics(
         if score is not None:
             score_factory = lambda: score
         elif score_path is not None:
-            score_factory = lambda: converter.parse(score_path)
+            score_factory = lambda: load_score(score_path)
         else:
             raise ValueError("score_path or score_factory is required")
 
@@ -65,6 +64,7 @@ def analyze_dynamics(score, rules_table, grade, *, run_target: bool = False):
     rounded_grade = get_rounded_grade(grade)
     rules = rules_table.get(rounded_grade, {})
     dynamics_data = derive_dynamics_data(score)
+    allowed_rule = rule_table("dynamic_allowed")
     part_confidences = []
     analysis_notes = {} if run_target else None
 
@@ -73,10 +73,11 @@ def analyze_dynamics(score, rules_table, grade, *, run_target: bool = False):
         part_total = 0.0
         if run_target:
             analysis_notes[part_name] = {"dynamics": []}
-        for dynamic in part_dyns:
+        allowed_flags = allowed_rule.evaluate([d["dynamic"] for d in part_dyns], [rules])[0]
+        for dynamic, flag in zip(part_dyns, allowed_flags):
             dyn_name = dynamic["dynamic"]
             exposure = dynamic["exposure"]
-            allowed = rules.get(dyn_name) is True
+            allowed = bool(flag)
             part_total += exposure
             if allowed:
                 part_valid += exposure
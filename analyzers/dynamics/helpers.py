@@ -1,9 +1,9 @@
 import pandas as pd
 from music21 import dynamics, stream, expressions
-from functools import lru_cache
+from data_processing import rules_cache, rules_file
 
 
-@lru_cache(maxsize=1)
+@rules_cache
 def load_dynamics_table(path: str = r"data/dynamics_guidelines.csv") -> dict[float, dict[str, bool]]:
     """
     Returns: {grade: {dynamic: bool}}
@@ -12,7 +12,7 @@ def load_dynamics_table(path: str = r"data/dynamics_guidelines.csv") -> dict[flo
       - remaining columns: grades (e.g., 0.5, 1, 1.5, ...)
       - values: TRUE/FALSE
     """
-    df = pd.read_csv(path)
+    df = pd.read_csv(rules_file(path))
     if df.empty:
         return {}
 
@@ -32,7 +32,7 @@ def load_dynamics_table(path: str = r"data/dynamics_guidelines.csv") -> dict[flo
     return rules
 
 
-@lru_cache(maxsize=1)
+@rules_cache
 def load_dynamics_rules(path: str = r"data/dynamics_guidelines.csv") -> dict[float, dict[str, bool]]:
     return load_dynamics_table(path)
 
@@ -1,21 +1,24 @@
 from __future__ import annotations
 
-from copy import deepcopy
-
 from analyzers.base import BaseAnalyzer
-from analyzers.key_range.extract import extract_key_segments, extract_note_data
+from analyzers.key_range.extract import extract_key_segments, extract_note_data, iter_note_windows
 from analyzers.key_range.rules import total_key_confidence, compute_range_confidence
+from app_data import GRADES
 from data_processing import build_instrument_data
 import math
+import numpy as np
 from utilities import (
+    comment,
     format_grade,
     get_rounded_grade,
+    load_score,
     parse_part_name,
     traffic_light,
     validate_part_for_range_analysis,
 )
-from utilities.instrument_rules import clarinet_break_allowed
-from music21 import converter
+from utilities.instrument_rules import clarinet_break_allowed, get_brass_partial_lookup
+
+CLARINET_BREAK_MIDI = 70
 
 
 class KeyRangeAnalyzer(BaseAnalyzer):
@@ -29,20 +32,84 @@ class KeyRangeAnalyzer(BaseAnalyzer):
         self._key_segments_base = key_segments_base
         self._key_confidence_fn = key_confidence_fn
 
-    def _get_key_segments(self, score, grade: float):
+    def _get_key_segments(self, score):
+        # KeySegment records are immutable, so the base can be shared across grades/threads
         if self._key_segments_base is None:
-            return extract_key_segments(score, grade)
-        key_segments = deepcopy(self._key_segments_base)
-        for k in key_segments:
-            k.grade = grade
-        return key_segments
+            return extract_key_segments(score)
+        return self._key_segments_base
+
+    def key_confidences(self, key_segments, grades) -> np.ndarray:
+        """(grades x segments) key confidence."""
+        return np.array(
+            [[self._key_confidence_fn(k.key, float(g), k.quality) for k in key_segments] for g in grades],
+            dtype=np.float64,
+        ).reshape(len(grades), len(key_segments))
 
     @staticmethod
-    def _get_brass_partial(sounding_midi: int | None, partials: dict | None) -> int | None:
-        if sounding_midi is None or not partials:
-            return None
-        closest = min(partials.items(), key=lambda kv: abs(kv[1] - sounding_midi))
-        return int(closest[0]) + 1  # store partial number (1-based)
+    def _key_comment(k, confidence: float, grade: float) -> str | None:
+        color = traffic_light(confidence)
+        if color == "yellow":
+            return f"{k.key} {k.quality} is somewhat common in grade {format_grade(grade)}"
+        if color == "orange":
+            return f"{k.key} {k.quality} is uncommon in grade {format_grade(grade)}"
+        if color == "red":
+            return f"{k.key} {k.quality} is typically not found in grade {format_grade(grade)}"
+        return None
+
+    @staticmethod
+    def _previous_index(valid: np.ndarray) -> np.ndarray:
+        """Index of the closest earlier valid entry for every position (-1 if none)."""
+        positions = np.where(valid, np.arange(valid.size), -1)
+        last_valid = np.maximum.accumulate(positions)
+        previous = np.full(valid.size, -1, dtype=np.int64)
+        previous[1:] = last_valid[:-1]
+        return previous
+
+    @staticmethod
+    def _get_brass_partials(sounding_midi: np.ndarray, lookup: np.ndarray | None) -> np.ndarray:
+        # 1-based partial number per note, 0 where the note has no partial
+        if lookup is None:
+            return np.zeros(sounding_midi.size, dtype=np.int16)
+        valid = sounding_midi >= 0
+        partials = lookup[np.clip(sounding_midi, 0, lookup.size - 1)]
+        return np.where(valid, partials, 0)
+
+    @classmethod
+    def _partial_jumps(cls, partials: np.ndarray, carry_partial: int = 0) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Flags notes that leap from a low partial (<= 3) over at least one
+        partial into the upper partials (> 3). Notes without a partial are
+        skipped when looking for the previous partial. carry_partial is the
+        last partial before this window (0 if none); a previous index of -1
+        refers to it.
+        """
+        partials = np.concatenate(([carry_partial], partials))
+        valid = partials > 0
+        previous = cls._previous_index(valid)
+        prev_partials = np.where(previous >= 0, partials[previous], 0)
+        jumps = (
+            valid
+            & (prev_partials > 0)
+            & (partials > prev_partials)
+            & (prev_partials <= 3)
+            & (partials > 3)
+            & ((partials - prev_partials) > 1)
+        )
+        return jumps[1:], previous[1:] - 1
+
+    @classmethod
+    def _break_crossings(cls, written_midi: np.ndarray, carry_midi: int = -1) -> np.ndarray:
+        # written pitch moves from below the clarinet break to at/above it
+        written_midi = np.concatenate(([carry_midi], written_midi))
+        valid = written_midi >= 0
+        previous = cls._previous_index(valid)
+        prev_midi = np.where(previous >= 0, written_midi[previous], -1)
+        return (
+            valid
+            & (prev_midi >= 0)
+            & (prev_midi < CLARINET_BREAK_MIDI)
+            & (written_midi >= CLARINET_BREAK_MIDI)
+        )[1:]
 
     @staticmethod
     def _partial_jump_penalty(grade: float) -> float:
@@ -56,135 +123,207 @@ class KeyRangeAnalyzer(BaseAnalyzer):
     # CORE ANALYSIS (confidence-only or target)
     # -------------------------------------------------------------
 
-    def analyze(self, score, grade: float, *, run_target: bool = False):
+    def _part_setup(self, original_part_name, range_grade, grade, instrument_data, key_quality):
+        """Range rules for one part, or None when the part isn't range-scored."""
         ranges = self.rules
+        pname = parse_part_name(original_part_name)
+        canonical = validate_part_for_range_analysis(pname)
+
+        # If we can’t map the part to an instrument bucket, skip range scoring for it
+        if not canonical or canonical not in ranges:
+            return None
+
+        if range_grade not in ranges[canonical]:
+            return None
+
+        inst_meta = instrument_data.get(canonical)
+        return {
+            "core": ranges[canonical][range_grade]["core"],
+            "ext": ranges[canonical][range_grade]["extended"],
+            "total": ranges[canonical]["total_range"],
+            "key_quality": key_quality,
+            "partial_lookup": (
+                get_brass_partial_lookup(canonical)
+                if inst_meta and inst_meta.type == "brass" and inst_meta.partials
+                else None
+            ),
+            "break_allowed": clarinet_break_allowed(grade, original_part_name),
+        }
+
+    def _score_notes(self, notes, setup, grade: float, totals: list, *, run_target: bool, carry=None):
+        """
+        Scores a run of consecutive notes of one part, adding conf * exposure
+        and exposure into totals ([conf, exposure]) note by note.
+        carry holds the previous window's last partial/written pitch so jumps
+        and break crossings across window edges are still caught.
+        Returns the carry for the next window.
+        """
+        carry = carry or {"partial": 0, "partial_label": None, "written_midi": -1}
+        partial_lookup = setup["partial_lookup"]
+        break_allowed = setup["break_allowed"]
+
+        confs = np.empty(len(notes), dtype=np.float64)
+        for i, note in enumerate(notes):
+            conf = compute_range_confidence(
+                note,
+                core=setup["core"],
+                ext=setup["ext"],
+                total=setup["total"],
+                target_grade=grade,
+                key_quality=setup["key_quality"],
+            )
+            if conf < 1.0 and not note.comments:
+                label = note.written_pitch or note.sounding_pitch or "note"
+                note.add_comment("range", comment("range.flagged", pitch=label, grade=grade))
+            confs[i] = conf
+
+        sounding_midi = np.fromiter(
+            (-1 if n.sounding_midi_value is None else n.sounding_midi_value for n in notes),
+            dtype=np.int64,
+            count=len(notes),
+        )
+        partials = self._get_brass_partials(sounding_midi, partial_lookup)
+        written_midi = np.fromiter(
+            (-1 if n.written_midi_value is None else n.written_midi_value for n in notes),
+            dtype=np.int64,
+            count=len(notes),
+        )
+
+        if partial_lookup is not None:
+            jumps, previous = self._partial_jumps(partials, carry["partial"])
+            if jumps.any():
+                confs[jumps] = np.maximum(0.0, confs[jumps] - self._partial_jump_penalty(grade))
+                for i in np.flatnonzero(jumps):
+                    note = notes[i]
+                    if previous[i] < 0:
+                        prev_label = carry["partial_label"]
+                    else:
+                        prev = notes[previous[i]]
+                        prev_label = prev.written_pitch or prev.sounding_pitch or "previous note"
+                    curr_label = note.written_pitch or note.sounding_pitch or "current note"
+                    note.add_comment(
+                        "partial_change",
+                        comment("brass.partial_jump", previous=prev_label, current=curr_label),
+                    )
+
+        if break_allowed is not None:
+            crossings = self._break_crossings(written_midi, carry["written_midi"])
+            if crossings.any():
+                confs[crossings] = np.maximum(0.0, confs[crossings] - (0.1 if break_allowed else 0.25))
+                for i in np.flatnonzero(crossings):
+                    note = notes[i]
+                    if break_allowed:
+                        note.add_comment(
+                            "crosses_break",
+                            comment("clarinet.break_allowed", grade=grade, instrument=note.instrument),
+                        )
+                    else:
+                        note.add_comment("crosses_break", comment("clarinet.break", grade=grade))
+
+        for note, conf, partial in zip(notes, confs.tolist(), partials.tolist()):
+            note.brass_partial = partial or None
+            exposure = float(note.duration or 0.0)
+            note.range_exposure = exposure
+            if run_target:
+                note.range_confidence = conf
+            totals[1] += exposure
+            totals[0] += conf * exposure
+
+        carry = dict(carry)
+        with_partial = np.flatnonzero(partials > 0)
+        if with_partial.size:
+            last = notes[with_partial[-1]]
+            carry["partial"] = int(partials[with_partial[-1]])
+            carry["partial_label"] = last.written_pitch or last.sounding_pitch or "previous note"
+        with_midi = np.flatnonzero(written_midi >= 0)
+        if with_midi.size:
+            carry["written_midi"] = int(written_midi[with_midi[-1]])
+        return carry
+
+    def analyze(
+        self,
+        score,
+        grade: float,
+        *,
+        run_target: bool = False,
+        curve_grades=None,
+        window_measures: int | None = None,
+        note_table=None,
+    ):
         range_grade = float(get_rounded_grade(grade))
         instrument_data = build_instrument_data()
 
         # --- Key segments ---
-        key_segments = self._get_key_segments(score, grade)
+        key_segments = self._get_key_segments(score)
         key_changes = len(key_segments) - 1
-
-        for k in key_segments:
-            k.confidence = self._key_confidence_fn(k.key, grade, k.quality)
-            if run_target:
-                color = traffic_light(k.confidence)
-                if color == "yellow":
-                    k.comments = (
-                        f"{k.key} {k.quality} is somewhat common in grade {format_grade(grade)}"
-                    )
-                elif color == "orange":
-                    k.comments = f"{k.key} {k.quality} is uncommon in grade {format_grade(grade)}"
-                elif color == "red":
-                    k.comments = (
-                        f"{k.key} {k.quality} is typically not found in grade {format_grade(grade)}"
-                    )
-
+        key_confs = [float(c) for c in self.key_confidences(key_segments, [grade])[0]]
         
         # apply key change penalty, if applicable. Max penalty scaled to grade, from .5 to .3.
         MAX_PEN = .5 - (.1 * (grade - .5)) if grade < 3 else None
         key_change_penalty = min(MAX_PEN, MAX_PEN/5 * key_changes) if MAX_PEN else None
         combined_conf_key = (
-            sum((k.confidence or 0.0) * (k.exposure or 0.0) for k in key_segments)
+            sum(conf * (k.exposure or 0.0) for conf, k in zip(key_confs, key_segments))
             if key_segments else 0.0
         )
         if key_change_penalty:
             combined_conf_key = max(0.0, combined_conf_key - key_change_penalty)
 
         # --- Note extraction ---
-        note_map = extract_note_data(score, grade, key_segments)
-
-        total_exposure = 0.0
-        total_conf = 0.0
-
-        for original_part_name, pdata in note_map.items():
-            pname = parse_part_name(original_part_name)
-            canonical = validate_part_for_range_analysis(pname)
-
-            # If we can’t map the part to an instrument bucket, skip range scoring for it
-            if not canonical or canonical not in ranges:
-                continue
-
-            if range_grade not in ranges[canonical]:
-                continue
-
-            core = ranges[canonical][range_grade]["core"]
-            ext = ranges[canonical][range_grade]["extended"]
-            total = ranges[canonical]["total_range"]
-
-            # Use the last key segment quality as a fallback
-            key_quality = key_segments[-1].quality if key_segments else "major"
-            inst_meta = instrument_data.get(canonical)
-            brass_partials = inst_meta.partials if inst_meta and inst_meta.type == "brass" else None
-            prev_partial = None
-            prev_note_name = None
-            break_allowed = clarinet_break_allowed(grade, original_part_name)
-            prev_written_midi = None
-
-            for note in pdata.get("Note Data", []):
-                conf = compute_range_confidence(
-                    note,
-                    core=core,
-                    ext=ext,
-                    total=total,
-                    target_grade=grade,
-                    key_quality=key_quality,
-                )
-                if conf < 1.0 and not note.comments:
-                    label = note.written_pitch or note.sounding_pitch or "note"
-                    note.comments["range"] = f"{label} flagged for grade {format_grade(grade)}"
-                note.brass_partial = self._get_brass_partial(
-                    note.sounding_midi_value, brass_partials
+        key_quality = key_segments[-1].quality if key_segments else "major"
+        totals = [0.0, 0.0]  # conf * exposure, exposure
+        note_map = None
+
+        if window_measures and not run_target:
+            # Streaming: only running totals and the per-part carry survive a window
+            windows = iter_note_windows(score, grade, key_segments, window_measures=window_measures)
+            # extract_note_data keys parts by name, so a later part with the same
+            # name replaces an earlier one; skip the replaced parts here too
+            last_index = {(p.partName or "Unknown Part"): i for i, p in enumerate(score.parts)}
+            setups = {}
+            carries = {}
+            for part_index, original_part_name, notes in windows:
+                if last_index.get(original_part_name) != part_index:
+                    continue
+                if part_index not in setups:
+                    setups[part_index] = self._part_setup(
+                        original_part_name, range_grade, grade, instrument_data, key_quality
+                    )
+                setup = setups[part_index]
+                if setup is None or not notes:
+                    continue
+                carries[part_index] = self._score_notes(
+                    notes, setup, grade, totals, run_target=False, carry=carries.get(part_index)
                 )
-                if prev_partial is not None and note.brass_partial is not None:
-                    if (
-                        note.brass_partial > prev_partial
-                        and prev_partial <= 3
-                        and note.brass_partial > 3
-                        and (note.brass_partial - prev_partial) > 1
-                    ):
-                        penalty = self._partial_jump_penalty(grade)
-                        conf = max(0.0, conf - penalty)
-                        prev_label = prev_note_name or "previous note"
-                        curr_label = note.written_pitch or note.sounding_pitch or "current note"
-                        note.comments["partial_change"] = (
-                            f"partial jump detected from {prev_label} to {curr_label}"
-                        )
-
-                if note.brass_partial is not None:
-                    prev_partial = note.brass_partial
-                    prev_note_name = note.written_pitch or note.sounding_pitch
-                if break_allowed is not None:
-                    curr_midi = note.written_midi_value
-                    if prev_written_midi is not None and curr_midi is not None:
-                        if prev_written_midi < 70 <= curr_midi:
-                            if break_allowed:
-                                conf = max(0.0, conf - 0.1)
-                                note.comments["crosses_break"] = (
-                                    "Clarinet break crossed (allowed for grade "
-                                    f"{format_grade(grade)}/{note.instrument})"
-                                )
-                            else:
-                                conf = max(0.0, conf - 0.25)
-                                note.comments["crosses_break"] = (
-                                    "Clarinet break crossed (not allowed for grade "
-                                    f"{format_grade(grade)})"
-                                )
-                    if curr_midi is not None:
-                        prev_written_midi = curr_midi
-                exposure = float(note.duration or 0.0)
-                note.range_exposure = exposure
-                if run_target:
-                    note.range_confidence = conf
-                total_exposure += exposure
-                total_conf += conf * exposure
-
+        else:
+            note_map = extract_note_data(score, grade, key_segments)
+            for original_part_name, pdata in note_map.items():
+                setup = self._part_setup(original_part_name, range_grade, grade, instrument_data, key_quality)
+                notes = pdata.get("Note Data", [])
+                if setup is not None and notes:
+                    self._score_notes(notes, setup, grade, totals, run_target=run_target)
+                if run_target and note_table is not None:
+                    note_table.add_analyzer_notes("key_range", notes)
+
+        total_conf, total_exposure = totals
         avg_range_conf = (total_conf / total_exposure) if total_exposure else 0.0
 
         if not run_target:
             return (avg_range_conf, combined_conf_key)
 
-        analysis_notes = {"key_data": {"segments": key_segments}, "range_data": note_map}
+        curves = self.key_confidences(key_segments, curve_grades) if curve_grades else None
+        segments_out = [
+            k.materialize(
+                grade,
+                key_confs[i],
+                comments=self._key_comment(k, key_confs[i], grade),
+                curve=(
+                    {float(g): float(curves[j, i]) for j, g in enumerate(curve_grades)}
+                    if curves is not None else None
+                ),
+            )
+            for i, k in enumerate(key_segments)
+        ]
+        analysis_notes = {"key_data": {"segments": segments_out}, "range_data": note_map}
         if key_change_penalty:
             analysis_notes["key_data"]["key_changes"] = f"Multiple key changes found, {key_changes}."
         summary = {
@@ -208,16 +347,19 @@ def run_key_range(
     run_observed=True,
     string_only=False,
     analysis_options=None,
+    note_table=None,
 ):
     from data_processing import derive_observed_grades
     from analyzers.key_range.ranges import load_combined_ranges
     from analyzers.key_range.rules import load_string_key_guidelines, string_key_confidence
 
     grades = None
+    window_measures = None
     if analysis_options is not None:
         run_observed = analysis_options.run_observed
         string_only = analysis_options.string_only
         grades = analysis_options.observed_grades
+        window_measures = analysis_options.window_measures
 
     combined_ranges = load_combined_ranges("data/range")
     key_confidence_fn = total_key_confidence
@@ -231,13 +373,12 @@ def run_key_range(
         if score is not None:
             score_factory = lambda: score
         elif score_path is not None:
-            score_factory = lambda: converter.parse(score_path)
+            score_factory = lambda: load_score(score_path)
         else:
             raise ValueError("score_path or score_factory is required")
 
     base_score = score if score is not None else score_factory()
-    sounding_score = base_score.toSoundingPitch()
-    key_segments_base = extract_key_segments(base_score, target_grade, sounding_score=sounding_score)
+    key_segments_base = extract_key_segments(base_score)
     analyzer = KeyRangeAnalyzer(
         combined_ranges,
         key_segments_base=key_segments_base,
@@ -256,7 +397,9 @@ def run_key_range(
     if run_observed:
         kwargs = {
             "score_factory": score_factory,
-            "analyze_confidence": lambda s, g: analyzer.analyze(s, g, run_target=False)[0],
+            "analyze_confidence": lambda s, g: analyzer.analyze(
+                s, g, run_target=False, window_measures=window_measures
+            )[0],
             "progress_cb": _progress_range if progress_cb is not None else None,
         }
         if grades is not None:
@@ -268,7 +411,9 @@ def run_key_range(
     if run_observed:
         kwargs = {
             "score_factory": score_factory,
-            "analyze_confidence": lambda s, g: analyzer.analyze(s, g, run_target=False)[1],
+            "analyze_confidence": lambda s, g: analyzer.analyze(
+                s, g, run_target=False, window_measures=window_measures
+            )[1],
             "progress_cb": _progress_key if progress_cb is not None else None,
         }
         if grades is not None:
@@ -282,7 +427,10 @@ def run_key_range(
     if score is None:
         score = base_score
 
-    _, _, analysis_notes, summary = analyzer.analyze(score, target_grade, run_target=True)
+    curve_grades = (grades if grades is not None else GRADES) if run_observed else None
+    _, _, analysis_notes, summary = analyzer.analyze(
+        score, target_grade, run_target=True, curve_grades=curve_grades, note_table=note_table
+    )
 
     return {
         "observed_grade_range": observed_grade_range,
@@ -1,24 +1,54 @@
 # extract_key_range.py
-from music21 import stream, key, pitch
-from models import KeyData, PartialNoteData
-from utilities import normalize_key_name, get_rounded_grade, iter_measure_events
+from functools import lru_cache
+
+from music21 import key, pitch, interval as m21interval
+from models import KeySegment, PartialNoteData
+from utilities import (
+    context_index,
+    get_rounded_grade,
+    iter_measure_events,
+    iter_measure_windows,
+    normalize_key_name,
+    stable_note_id,
+    ticks_per_quarter,
+    to_ticks,
+)
 from app_data import PITCH_TO_INDEX
 from utilities import parse_part_name, validate_part_for_range_analysis
 
 
-def extract_key_segments(score, target_grade, *, sounding_score=None):
+@lru_cache(maxsize=4096)
+def _sounding_pitch_name(written: str, directed_interval: str) -> str:
+    transposed = pitch.Pitch(written).transpose(m21interval.Interval(directed_interval))
+    return normalize_key_name(transposed.nameWithOctave)
+
+
+def _sounding_key(ks, interval):
+    if interval is None or getattr(ks, "sharps", None) is None:
+        return ks
+    return ks.transpose(interval)
+
+
+def extract_key_segments(score) -> tuple[KeySegment, ...]:
     """
     Extracts key signature changes and computes exposures.
-    Returns a list of KeyData objects.
+    Key signatures are read from the first part and transposed to sounding
+    pitch with that part's instrument interval (no full-score copy).
+    Returns immutable KeySegment records; grading happens in the analyzer.
     """
-    src = sounding_score if sounding_score is not None else score.toSoundingPitch()
-    keys = src.parts[0].recurse().getElementsByClass('KeySignature')
+    part_ctx = context_index(score)[0]
+    at_sounding = getattr(score.parts[0], "atSoundingPitch", False) is True
+
+    keys = []
+    for offset, ks in part_ctx.key_signatures.items():
+        interval = None if at_sounding else part_ctx.transposition_at(offset)
+        measure = part_ctx.measure_number_at(offset)
+        keys.append((measure if measure is not None else 1, _sounding_key(ks, interval)))
     if not keys:
-        keys = [key.KeySignature(sharps=None)]
+        keys = [(1, key.KeySignature(sharps=None))]
 
-    key_segments = []
-    for ks in keys:
-        measure = ks.getContextByClass(stream.Measure).number
+    found = []
+    for measure, ks in keys:
         if getattr(ks, "sharps", None) is None:
             tonic = "None"
             quality = "none"
@@ -28,80 +58,100 @@ def extract_key_segments(score, target_grade, *, sounding_score=None):
             quality = ks.type
             pitch_index = PITCH_TO_INDEX[tonic]
 
-        key_segments.append(
-            KeyData(
-                measure=measure,
-                grade=target_grade,
-                key=tonic,
-                quality=quality,
-                pitch_index=pitch_index
-            )
-        )
+        found.append((measure, tonic, quality, pitch_index))
 
     # Compute durations + exposure
-    if key_segments:
+    key_segments = []
+    if found:
         total_measures = score.parts[0].measure(-1).number
-        key_segments.sort(key=lambda k: k.measure)
+        found.sort(key=lambda k: k[0])
 
-        for i in range(len(key_segments)):
-            if i < len(key_segments) - 1:
-                duration = key_segments[i+1].measure - key_segments[i].measure
+        for i, (measure, tonic, quality, pitch_index) in enumerate(found):
+            if i < len(found) - 1:
+                duration = found[i + 1][0] - measure
             else:
-                duration = total_measures - key_segments[i].measure + 1
-
-            key_segments[i].duration = duration
-            key_segments[i].exposure = duration / total_measures
+                duration = total_measures - measure + 1
+
+            key_segments.append(
+                KeySegment(
+                    measure=measure,
+                    key=tonic,
+                    quality=quality,
+                    pitch_index=pitch_index,
+                    duration=duration,
+                    exposure=duration / total_measures,
+                )
+            )
 
-    return key_segments
+    return tuple(key_segments)
 
 
-def extract_note_data(score, target_grade, key_segments):
-    analysis_results = {}
+def iter_note_windows(score, target_grade, key_segments, *, window_measures=None):
+    """
+    Yields (part_index, part name, notes) per window of `window_measures`
+    measures (one window per part when None), so callers that only need
+    running totals never hold more than a window of PartialNoteData.
+    """
+    tpq = ticks_per_quarter(score)
+    ctx = context_index(score)
 
-    for part in score.parts:
+    for part_index, part in enumerate(score.parts):
         original_name = part.partName or "Unknown Part"
-        analysis_results[original_name] = {"Note Data": []}
-
-        for measure in part.getElementsByClass(stream.Measure):
-            local_key = None
-            for ks in reversed(key_segments):
-                if measure.number >= ks.measure:
-                    local_key = ks
-                    break
-
-            for n in iter_measure_events(measure, expand_chords=True):
-                if not n.isNote:
-                    continue
-
-                inst = n.getContextByClass("Instrument")
-                interval = inst.transposition if inst else None
-
-                written_pitch = normalize_key_name(n.pitch.nameWithOctave)
-                written_midi = n.pitch.midi
-
-                if interval:
-                    sounding_pitch = normalize_key_name(n.pitch.transpose(interval).nameWithOctave)
-                    sounding_midi = n.pitch.transpose(interval).midi
-                else:
-                    sounding_pitch = written_pitch
-                    sounding_midi = written_midi
-
-                data = PartialNoteData(
-                    measure=n.measureNumber,
-                    offset=n.offset,
-                    grade=target_grade,
-                    instrument=original_name,
-                    duration=n.quarterLength,
-                    written_pitch=written_pitch,
-                    written_midi_value=written_midi,
-                    sounding_pitch=sounding_pitch,
-                    sounding_midi_value=sounding_midi,
-                )
-
-                if local_key is not None and local_key.key != "None" and local_key.pitch_index is not None:
-                    pitch_class = sounding_midi % 12
-                    data.relative_key_index = (pitch_class - local_key.pitch_index) % 12
+        part_ctx = ctx[part_index]
+
+        for window in iter_measure_windows(part, window_measures):
+            notes = []
+            for measure in window:
+                measure_offset = float(measure.offset)
+                local_key = None
+                for ks in reversed(key_segments):
+                    if measure.number >= ks.measure:
+                        local_key = ks
+                        break
+
+                for n in iter_measure_events(measure, expand_chords=True):
+                    if not n.isNote:
+                        continue
+
+                    interval = part_ctx.transposition_at(measure_offset + float(n.offset))
+
+                    written_pitch = normalize_key_name(n.pitch.nameWithOctave)
+                    written_midi = n.pitch.midi
+
+                    if interval:
+                        sounding_pitch = _sounding_pitch_name(n.pitch.nameWithOctave, interval.directedName)
+                        sounding_midi = written_midi + interval.semitones
+                    else:
+                        sounding_pitch = written_pitch
+                        sounding_midi = written_midi
+
+                    data = PartialNoteData(
+                        measure=n.measureNumber,
+                        offset=float(n.offset),
+                        grade=target_grade,
+                        instrument=original_name,
+                        duration=float(n.quarterLength),
+                        offset_ticks=to_ticks(n.offset, tpq),
+                        duration_ticks=to_ticks(n.quarterLength, tpq),
+                        written_pitch=written_pitch,
+                        written_midi_value=written_midi,
+                        sounding_pitch=sounding_pitch,
+                        sounding_midi_value=sounding_midi,
+                    )
+
+                    data.note_id = stable_note_id(part_index, data)
+
+                    if local_key is not None and local_key.key != "None" and local_key.pitch_index is not None:
+                        pitch_class = sounding_midi % 12
+                        data.relative_key_index = (pitch_class - local_key.pitch_index) % 12
+
+                    notes.append(data)
+
+            yield part_index, original_name, notes
 
-                analysis_results[original_name]["Note Data"].append(data)
 
+def extract_note_data(score, target_grade, key_segments):
+    analysis_results = {}
+    for _, original_name, notes in iter_note_windows(score, target_grade, key_segments):
+        analysis_results[original_name] = {"Note Data": notes}
     return analysis_results
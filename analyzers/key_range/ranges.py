@@ -1,18 +1,19 @@
 from __future__ import annotations
 
 from pathlib import Path
-from functools import lru_cache
 from functools import reduce
 import pandas as pd
 from music21 import pitch
 
+from data_processing import rules_cache, rules_file, rules_glob
+
 
 
 def unpack_range_data(file_path: Path, publisher_id: int) -> dict:
     """
     Returns: dict[instrument_name][grade(float)] -> list[midi...]
     """
-    df = pd.read_csv(file_path)
+    df = pd.read_csv(rules_file(file_path))
     if "Instrument" not in df.columns:
         raise ValueError(f"{file_path.name} missing 'Instrument' column. Columns: {list(df.columns)}")
 
@@ -109,11 +110,11 @@ def reconcile_ranges(master: dict) -> dict:
     return combined
 
 
-@lru_cache(maxsize=4)
+@rules_cache
 def load_combined_ranges(range_dir: str | Path = "data/range", *, file_glob: str = "*.csv") -> dict:
 
     range_dir = Path(range_dir)
-    files = sorted(range_dir.glob(file_glob))
+    files = rules_glob(range_dir, file_glob)
     if not files:
         raise FileNotFoundError(f"No range csv files found in {range_dir.resolve()}")
 
@@ -136,6 +137,6 @@ def load_combined_ranges(range_dir: str | Path = "data/range", *, file_glob: str
     return combined
 
 
-@lru_cache(maxsize=2)
+@rules_cache
 def load_string_ranges(range_dir: str | Path = "data/range") -> dict:
     return load_combined_ranges(range_dir, file_glob="string_range*.csv")
@@ -5,10 +5,11 @@ from app_data import (
     MAJOR_DIATONIC_MAP,
     MINOR_DIATONIC_MAP
 )
-from utilities import confidence_curve, format_grade, normalize_key_name
+from utilities import comment, confidence_curve, normalize_key_name
 from music21 import pitch as m21pitch
+from data_processing import rules_cache, rules_text
 import csv
-from functools import lru_cache
+import io
 
 
 
@@ -80,9 +81,9 @@ def total_key_confidence(key, grade, key_quality=None):
     return min(1.0, publisher_key_confidence(eval_key, grade) + catalog_key_confidence(eval_key, grade))
 
 
-@lru_cache(maxsize=1)
+@rules_cache
 def load_string_key_guidelines(path: str = "data/string_key_guidelines.csv") -> dict:
-    with open(path, newline="", encoding="utf-8-sig") as f:
+    with io.StringIO(rules_text(path, encoding="utf-8-sig"), newline="") as f:
         reader = csv.reader(f)
         rows = [row for row in reader if row]
 
@@ -157,17 +158,16 @@ def compute_range_confidence(note, core, ext, total, target_grade, key_quality):
         conf = 1.0
     elif ext[0] <= midi <= ext[1]:
         conf = 0.6
-        note.comments["range"] = (
-            f"{note.written_pitch} in extended range for grade {format_grade(target_grade)}"
-        )
+        note.add_comment("range", comment("range.extended", pitch=note.written_pitch, grade=target_grade))
     elif total[0] <= midi <= total[1]:
         conf = 0.25
-        note.comments["range"] = (
-            f"{note.written_pitch} out of range for grade {format_grade(target_grade)}"
-        )
+        note.add_comment("range", comment("range.out", pitch=note.written_pitch, grade=target_grade))
     else:
         conf = 0.0
-        note.comments["range"] = f"{note.written_pitch} out of range altogether for {note.instrument}"
+        note.add_comment(
+            "range",
+            comment("range.out_altogether", pitch=note.written_pitch, instrument=note.instrument),
+        )
 
     # -------------- Harmonic Tolerance Penalty --------------
     penalty = harmonic_tolerance_penalty(target_grade)
@@ -176,21 +176,19 @@ def compute_range_confidence(note, core, ext, total, target_grade, key_quality):
         if key_q.startswith("maj"):
             if rel not in MAJOR_DIATONIC_MAP:
                 conf = max(0.0, conf - penalty)
-                note.comments["harmonic_tolerance"] = (
-                    "Non-diatonic note "
-                    f"{note.written_pitch} in major key for grade {format_grade(target_grade)}"
+                note.add_comment(
+                    "harmonic_tolerance",
+                    comment("harmonic.non_diatonic", pitch=note.written_pitch, quality="major", grade=target_grade),
                 )
         else:  # minor
             if (rel not in MINOR_DIATONIC_MAP) and rel != 11:
                 conf = max(0.0, conf - penalty)
-                note.comments["harmonic_tolerance"] = (
-                    "Non-diatonic note "
-                    f"{note.written_pitch} in minor key for grade {format_grade(target_grade)}"
+                note.add_comment(
+                    "harmonic_tolerance",
+                    comment("harmonic.non_diatonic", pitch=note.written_pitch, quality="minor", grade=target_grade),
                 )
 
     if conf < 1.0 and not note.comments:
-        note.comments["range"] = (
-            f"{note.written_pitch} penalized for grade {format_grade(target_grade)}"
-        )
+        note.add_comment("range", comment("range.penalized", pitch=note.written_pitch, grade=target_grade))
 
     return max(0.0, conf)
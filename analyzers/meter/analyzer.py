@@ -2,13 +2,14 @@
 from __future__ import annotations
 
 
-from music21 import converter
 
 from analyzers.base import BaseAnalyzer
-from analyzers.shared.score_extract import extract_meter_segments
+from analyzers.meter.helpers import meter_type_confidences
+from analyzers.shared.score_extract import extract_meter_records, materialize_meter_segment
 from analyzers.rhythm.rules import load_rhythm_rules
+from app_data import GRADES
 from data_processing import derive_observed_grades
-from utilities import get_closest_grade
+from utilities import get_closest_grade, load_score
 
 
 def apply_meter_change_penalty(base_total: float, meter_data, grade: float):
@@ -39,21 +40,52 @@ def apply_meter_change_penalty(base_total: float, meter_data, grade: float):
 
 
 class MeterAnalyzer(BaseAnalyzer):
-    def analyze(self, score, grade: float, *, run_target: bool = False):
+    def _rulesets(self, grades):
+        rule_grades = [get_closest_grade(g, self.rules.keys()) for g in grades]
+        return [self.rules[rg] if rg is not None else None for rg in rule_grades]
+
+    def _total(self, records, confs, grade: float):
+        base_total = sum(float(c) * (r.exposure or 0.0) for c, r in zip(confs, records))
+        return apply_meter_change_penalty(base_total, records, grade)
+
+    def analyze(self, score, grade: float, *, run_target: bool = False, curve_grades=None):
         rule_grade = get_closest_grade(grade, self.rules.keys())
         if rule_grade is None:
             return ([], None) if run_target else None
-        rules_for_grade = self.rules[rule_grade]
-        meter_data = extract_meter_segments(score, grade=grade, rules_for_grade=rules_for_grade)
-
-        base_total = sum((m.confidence or 0.0) * (m.exposure or 0.0) for m in meter_data)
-        total_conf, meter_comment = apply_meter_change_penalty(base_total, meter_data, grade)
-
-        if run_target:
-            if meter_comment and meter_data:
-                meter_data[0].comments["meter_changes"] = meter_comment
-            return meter_data, total_conf
-        return total_conf
+        records = extract_meter_records(score)
+        types = [r.type for r in records]
+        confs = meter_type_confidences(types, [self.rules[rule_grade]])[0]
+        total_conf, meter_comment = self._total(records, confs, grade)
+
+        if not run_target:
+            return total_conf
+
+        curves = meter_type_confidences(types, self._rulesets(curve_grades)) if curve_grades else None
+        meter_data = [
+            materialize_meter_segment(
+                r,
+                grade,
+                int(confs[i]),
+                curve=(
+                    {float(g): float(curves[j, i]) for j, g in enumerate(curve_grades)}
+                    if curves is not None else None
+                ),
+            )
+            for i, r in enumerate(records)
+        ]
+        if meter_comment and meter_data:
+            meter_data[0].comments["meter_changes"] = meter_comment
+        return meter_data, total_conf
+
+    def analyze_grades(self, score, grades):
+        """Meter confidence for every grade from a single extraction."""
+        records = extract_meter_records(score)
+        rulesets = self._rulesets(grades)
+        confs = meter_type_confidences([r.type for r in records], rulesets)
+        out = {}
+        for j, (g, rs) in enumerate(zip(grades, rulesets)):
+            out[float(g)] = None if rs is None else self._total(records, confs[j], float(g))[0]
+        return out
 
 def run_meter(
     score_path: str,
@@ -69,7 +101,7 @@ def run_meter(
         if score is not None:
             score_factory = lambda: score
         elif score_path is not None:
-            score_factory = lambda: converter.parse(score_path)
+            score_factory = lambda: load_score(score_path)
         else:
             raise ValueError("score_path or score_factory is required")
 
@@ -86,6 +118,7 @@ def run_meter(
         kwargs = {
             "score_factory": score_factory,
             "analyze_confidence": lambda score, g: analyzer.analyze(score, g, run_target=False),
+            "analyze_confidences": analyzer.analyze_grades,
             "progress_cb": progress_cb,
         }
         if grades is not None:
@@ -96,7 +129,10 @@ def run_meter(
 
     if score is None:
         score = score_factory()
-    meter_segments, overall_conf = analyzer.analyze(score, target_grade, run_target=True)
+    curve_grades = (grades if grades is not None else GRADES) if run_observed else None
+    meter_segments, overall_conf = analyzer.analyze(
+        score, target_grade, run_target=True, curve_grades=curve_grades
+    )
 
     return {
         "observed_grade": observed_grade,
@@ -1,14 +1,14 @@
+from data_processing import rule_table
 from models import RhythmGradeRules
 
 def meter_segment_confidence(segment, rules: RhythmGradeRules):
-    c = segment.type
-    if c == "compound":
-        return 1 if rules.allow_compound else 0
-    if c == "mixed":
-        return 1 if rules.allow_mixed_compound else 0
-    if c == "odd":
-        return 1 if rules.allow_easy_compound else 0
-    return 1  # simple meter always allowed
+    # simple meter always allowed; see "meter_type_allowed" in data/rule_tables.json
+    return int(meter_type_confidences([segment.type], [rules])[0, 0])
+
+
+def meter_type_confidences(types, rulesets):
+    """(grades x segments) 0/1 array for meter classifications against each grade's rules."""
+    return rule_table("meter_type_allowed").evaluate(types, rulesets)
 
 def classify_meter(ts):
     num, denom = map(int, ts.ratioString.split("/"))
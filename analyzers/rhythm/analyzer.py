@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from music21 import meter, stream, converter
+from music21 import meter, stream
 
 from models import PartialNoteData
 from analyzers.rhythm.helpers import (
@@ -13,7 +13,7 @@ from analyzers.rhythm.helpers import (
 from analyzers.rhythm.note_rules import rule_dotted, rule_subdivision, rule_syncopation, rule_tuplet
 from analyzers.rhythm.rules import load_rhythm_rules
 from data_processing import derive_observed_grades
-from utilities import get_closest_grade, iter_measure_lines
+from utilities import context_index, get_closest_grade, iter_measure_lines, load_score, stable_note_id, ticks_per_quarter, to_ticks
 
 
 def rhythm_note_confidence(note, rules_for_grade, target_grade):
@@ -77,8 +77,11 @@ def analyze_rhythm_confidence(score, rules, grade: float) -> float | None:
         return None
 
     part_confs: list[float] = []
+    tpq = ticks_per_quarter(score)
 
-    for part in score.parts:
+    ctx = context_index(score)
+    for part_index, part in enumerate(score.parts):
+        part_ctx = ctx[part_index]
         current_ts = None
         total_conf = 0.0
         total_dur = 0.0
@@ -89,7 +92,7 @@ def analyze_rhythm_confidence(score, rules, grade: float) -> float | None:
         extreme_measure_count = 0  # <-- per part
 
         for m in part.getElementsByClass(stream.Measure):
-            ts = m.getContextByClass(meter.TimeSignature)
+            ts = part_ctx.time_signature_at(float(m.offset))
             if ts is None:
                 local_ts = list(m.getElementsByClass(meter.TimeSignature))
                 ts = local_ts[0] if local_ts else None
@@ -99,6 +102,7 @@ def analyze_rhythm_confidence(score, rules, grade: float) -> float | None:
                 continue
 
             beat_length = current_ts.beatDuration.quarterLength
+            beat_ticks = to_ticks(beat_length, tpq) or 1
 
             if is_implicit_empty_measure(m, current_ts):
                 continue
@@ -114,17 +118,20 @@ def analyze_rhythm_confidence(score, rules, grade: float) -> float | None:
                         written_pitch = n.pitch.nameWithOctave
                         written_midi = n.pitch.midi
 
+                    offset_ticks = to_ticks(n.offset, tpq)
                     p = PartialNoteData(
                         measure=m.number,
-                        offset=n.offset,
+                        offset=float(n.offset),
                         grade=grade,
                         instrument=(part.partName or ""),
-                        duration=n.duration.quarterLength,
+                        duration=float(n.duration.quarterLength),
+                        offset_ticks=offset_ticks,
+                        duration_ticks=to_ticks(n.duration.quarterLength, tpq),
                         written_pitch=written_pitch,
                         written_midi_value=written_midi,
                         rhythm_token=get_rhythm_token(n) + ("r" if n.isRest else ""),
-                        beat_index=int(n.offset // beat_length),
-                        beat_offset=(n.offset % beat_length),
+                        beat_index=offset_ticks // beat_ticks,
+                        beat_offset=(offset_ticks % beat_ticks) / tpq,
                         beat_unit=beat_length,
                         voice_index=line_index,
                         chord_index=event_index,
@@ -211,7 +218,7 @@ def analyze_rhythm_confidence(score, rules, grade: float) -> float | None:
 # 2) Target-grade pass (build UI note data)
 # ----------------------------
 
-def analyze_rhythm_target(score, rules, target_grade: float):
+def analyze_rhythm_target(score, rules, target_grade: float, *, note_table=None):
     analysis_notes = {}
     rule_grade = get_closest_grade(target_grade, rules.keys())
     rules_for_grade = rules.get(rule_grade) if rule_grade is not None else None
@@ -219,7 +226,10 @@ def analyze_rhythm_target(score, rules, target_grade: float):
         return {}, None
 
     # Build note data
-    for part in score.parts:
+    tpq = ticks_per_quarter(score)
+    ctx = context_index(score)
+    for part_index, part in enumerate(score.parts):
+        part_ctx = ctx[part_index]
         part_name = part.partName or "Unknown"
         current_ts = None
 
@@ -228,7 +238,7 @@ def analyze_rhythm_target(score, rules, target_grade: float):
         music21_notes = []
 
         for m in part.getElementsByClass(stream.Measure):
-            ts = m.getContextByClass(meter.TimeSignature)
+            ts = part_ctx.time_signature_at(float(m.offset))
             if ts is None:
                 local_ts = list(m.getElementsByClass(meter.TimeSignature))
                 ts = local_ts[0] if local_ts else None
@@ -238,27 +248,30 @@ def analyze_rhythm_target(score, rules, target_grade: float):
                 continue
 
             beat_length = current_ts.beatDuration.quarterLength
+            beat_ticks = to_ticks(beat_length, tpq) or 1
 
             if is_implicit_empty_measure(m, current_ts):
-                partial_notes.append(
-                    PartialNoteData(
-                        measure=m.number,
-                        offset=0.0,
-                        grade=target_grade,
-                        instrument=part_name,
-                        duration=current_ts.barDuration.quarterLength,
-                        rhythm_token=None,
-                        beat_index=None,
-                        beat_offset=None,
-                        beat_unit=beat_length,
-                    )
+                rest = PartialNoteData(
+                    measure=m.number,
+                    offset=0.0,
+                    grade=target_grade,
+                    instrument=part_name,
+                    duration=current_ts.barDuration.quarterLength,
+                    offset_ticks=0,
+                    rhythm_token=None,
+                    beat_index=None,
+                    beat_offset=None,
+                    beat_unit=beat_length,
                 )
+                rest.note_id = stable_note_id(part_index, rest)
+                partial_notes.append(rest)
                 continue
 
             for line_index, events in iter_measure_lines(m):
                 for event_index, n in enumerate(events):
-                    beat_index = int(n.offset // beat_length)
-                    beat_offset = n.offset % beat_length
+                    offset_ticks = to_ticks(n.offset, tpq)
+                    beat_index = offset_ticks // beat_ticks
+                    beat_offset = (offset_ticks % beat_ticks) / tpq
 
                     written_pitch = None
                     written_midi = None
@@ -268,10 +281,12 @@ def analyze_rhythm_target(score, rules, target_grade: float):
 
                     p = PartialNoteData(
                         measure=m.number,
-                        offset=n.offset,
+                        offset=float(n.offset),
                         grade=target_grade,
                         instrument=part_name,
-                        duration=n.duration.quarterLength,
+                        duration=float(n.duration.quarterLength),
+                        offset_ticks=offset_ticks,
+                        duration_ticks=to_ticks(n.duration.quarterLength, tpq),
                         written_pitch=written_pitch,
                         written_midi_value=written_midi,
                         rhythm_token=get_rhythm_token(n) + ("r" if n.isRest else ""),
@@ -283,6 +298,7 @@ def analyze_rhythm_target(score, rules, target_grade: float):
                         is_chord=bool(getattr(n, "isChord", False)),
                         chord_size=len(n.pitches) if getattr(n, "isChord", False) else None,
                     )
+                    p.note_id = stable_note_id(part_index, p)
                     partial_notes.append(p)
                     music21_notes.append(n)
 
@@ -318,7 +334,7 @@ def analyze_rhythm_target(score, rules, target_grade: float):
             # Attach note-level comments
             for conf, msg, label in res:
                 if label is not None and conf < 1 and msg:
-                    note.comments[label] = msg
+                    note.add_comment(label, msg)
 
             measure = note.measure if note.measure is not None else -1
             acc = measure_acc.setdefault(measure, {"sum": 0.0, "dur": 0.0, "min": 1.0, "extreme": False})
@@ -332,6 +348,9 @@ def analyze_rhythm_target(score, rules, target_grade: float):
             if is_extreme_hit(note, res, target_grade):
                 acc["extreme"] = True
 
+        if note_table is not None:
+            note_table.add_analyzer_notes("rhythm", notes)
+
         # Compute measure confidences
         extreme_measure_count = 0
         for measure_num, acc in measure_acc.items():
@@ -378,9 +397,9 @@ def analyze_rhythm_target(score, rules, target_grade: float):
     overall_conf = (sum(part_confs) / len(part_confs)) if part_confs else None
     return analysis_notes, overall_conf
 
-def analyze_rhythm(score, rules, grade: float, *, run_target: bool = False):
+def analyze_rhythm(score, rules, grade: float, *, run_target: bool = False, note_table=None):
     if run_target:
-        return analyze_rhythm_target(score, rules, grade)
+        return analyze_rhythm_target(score, rules, grade, note_table=note_table)
     return analyze_rhythm_confidence(score, rules, grade)
 
 # ----------------------------
@@ -396,12 +415,13 @@ def run_rhythm(
     progress_cb=None,
     run_observed=True,
     analysis_options=None,
+    note_table=None,
 ):
     if score_factory is None:
         if score is not None:
             score_factory = lambda: score
         elif score_path is not None:
-            score_factory = lambda: converter.parse(score_path)
+            score_factory = lambda: load_score(score_path)
         else:
             raise ValueError("score_path or score_factory is required")
 
@@ -427,7 +447,9 @@ def run_rhythm(
     if score is None:
         score = score_factory()
 
-    analysis_notes, overall_conf = analyze_rhythm(score, rules, target_grade, run_target=True)
+    analysis_notes, overall_conf = analyze_rhythm(
+        score, rules, target_grade, run_target=True, note_table=note_table
+    )
 
     return {
         "observed_grade": observed_grade,
@@ -111,7 +111,11 @@ def mark_eighth_pairs(notes: list[PartialNoteData], *, grade: float) -> None:
             if prev.offset is None or note.offset is None:
                 run = [note]
                 continue
-            if math.isclose(prev.offset + prev.duration, note.offset, abs_tol=1e-3):
+            if prev.offset_ticks is not None and prev.duration_ticks is not None and note.offset_ticks is not None:
+                contiguous = prev.offset_ticks + prev.duration_ticks == note.offset_ticks
+            else:
+                contiguous = math.isclose(prev.offset + prev.duration, note.offset, abs_tol=1e-3)
+            if contiguous:
                 run.append(note)
             else:
                 if len(run) == 2:
@@ -177,6 +181,7 @@ def annotate_tuplets(notes: list[PartialNoteData], music21_notes):
 
 def check_syncopation(dur, offset):
     # return remainder, if any, and if syncopation exists for given note length and offset
+    # (pass integer ticks so the modulo is exact)
     if dur in (None, 0) or offset is None:
         return (0, False)
     return (offset % dur, offset % dur != 0)
@@ -1,5 +1,5 @@
 from app_data import RHYTHM_TOKEN_MAP
-from utilities import format_grade
+from utilities import comment
 from .helpers import check_syncopation, get_quarter_length, get_token_duration
 from .rules import normalize_tuplet_class, TUPLET_CLASS_ORDER
 
@@ -51,12 +51,15 @@ def rule_dotted(note, rules, target_grade):
     conf = 0.7 * _ratio_penalty(ratio, exponent=1.2, floor=0.05)
     return (
         conf,
-        f"dotted rhythms not common for grade {format_grade(target_grade)}",
+        comment("rhythm.dotted", grade=target_grade),
         "Dotted Rhythm",
     )
 
 def rule_syncopation(note, rules, target_grade):
-    _, is_sync = check_syncopation(note.duration, note.offset)
+    if note.duration_ticks is not None and note.offset_ticks is not None:
+        _, is_sync = check_syncopation(note.duration_ticks, note.offset_ticks)
+    else:
+        _, is_sync = check_syncopation(note.duration, note.offset)
     if not is_sync:
         return (1, None, None)
     if rules.allow_syncopation:
@@ -67,7 +70,7 @@ def rule_syncopation(note, rules, target_grade):
     conf = 0.85 * _ratio_penalty(ratio, exponent=0.6, floor=0.2)
     return (
         conf,
-        f"syncopation not common for grade {format_grade(target_grade)}",
+        comment("rhythm.syncopation", grade=target_grade),
         "Syncopation",
     )
 
@@ -75,11 +78,11 @@ def rule_syncopation(note, rules, target_grade):
 def rule_subdivision(note, rules, target_grade):
     note_duration = note.duration if note.duration is not None else get_quarter_length(note.rhythm_token)
     if note_duration is None:
-        return (0.7, f"unknown rhythm value {_token_label(note.rhythm_token)}", "Subdivision")
+        return (0.7, comment("rhythm.unknown_value", token=_token_label(note.rhythm_token)), "Subdivision")
     if float(target_grade) < 5 and note_duration <= 0.0625:
         return (
             0.0,
-            f"64th notes or smaller not common for grade {format_grade(target_grade)}",
+            comment("rhythm.sixty_fourth", grade=target_grade),
             "Subdivision",
         )
     if float(target_grade) == 0.5 and getattr(note, "eighth_pair_ok", False):
@@ -87,7 +90,7 @@ def rule_subdivision(note, rules, target_grade):
     if float(target_grade) == 0.5 and getattr(note, "eighth_pair_overflow", False):
         return (
             0.0,
-            f"consecutive eighth notes not common for grade {format_grade(target_grade)}",
+            comment("rhythm.eighth_run", grade=target_grade),
             "Subdivision",
         )
     max_allowed = _max_allowed_duration(rules)
@@ -100,14 +103,14 @@ def rule_subdivision(note, rules, target_grade):
     if float(target_grade) < 4 and ratio <= 0.5:
         return (
             0.0,
-            f"subdivisions smaller than a {max_label} note not common for grade {format_grade(target_grade)}",
+            comment("rhythm.subdivision", max_label=max_label, grade=target_grade),
             "Subdivision",
         )
     exponent = max(2.0, 6.0 - float(target_grade))
     conf = _ratio_penalty(ratio, exponent=exponent, floor=0.02)
     return (
         conf,
-        f"subdivisions smaller than a {max_label} note not common for grade {format_grade(target_grade)}",
+        comment("rhythm.subdivision", max_label=max_label, grade=target_grade),
         "Subdivision",
     )
 
@@ -118,7 +121,7 @@ def rule_tuplet(note, rules, target_grade):
         tuplet_class = normalize_tuplet_class(note.tuplet_class)
         order = TUPLET_CLASS_ORDER.get(tuplet_class, 1)
         conf = max(0.05, 0.5 / (order + 1))
-        return (conf, "Tuplets not common for given grade", "Tuplets")
+        return (conf, comment("rhythm.tuplets"), "Tuplets")
     if tuplet_class := normalize_tuplet_class(note.tuplet_class):
         if tuplet_class in rules.allowed_tuplet_classes:
             return (1, None, None)
@@ -130,7 +133,7 @@ def rule_tuplet(note, rules, target_grade):
         conf = max(0.1, 0.8 * ratio)
         return (
             conf,
-            f"{tuplet_class} tuplets not common for grade {format_grade(target_grade)}",
+            comment("rhythm.tuplet_class", tuplet_class=tuplet_class, grade=target_grade),
             "Tuplets",
         )
         
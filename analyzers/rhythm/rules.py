@@ -1,11 +1,11 @@
 from __future__ import annotations
 
 from pathlib import Path
-from functools import lru_cache
 import pandas as pd
 
 from app_data import GRADES
 from app_data import RHYTHM_TOKEN_MAP
+from data_processing import rules_cache, rules_file, rules_glob
 from models import RhythmGradeRules
 
 TUPLET_CLASS_ORDER = {
@@ -15,10 +15,6 @@ TUPLET_CLASS_ORDER = {
     "complex": 3,
 }
 
-# module cache (so we only read CSVs once per process)
-_CACHED_RULES: dict[float, RhythmGradeRules] | None = None
-
-
 def normalize_tuplet_class(value: str) -> str:
     if pd.isna(value):
         return "none"
@@ -27,7 +23,7 @@ def normalize_tuplet_class(value: str) -> str:
 
 
 def unpack_rhythm_data(filename: Path) -> dict[float, RhythmGradeRules]:
-    df = pd.read_csv(filename)
+    df = pd.read_csv(rules_file(filename))
     ruleset: dict[float, RhythmGradeRules] = {}
 
     for _, row in df.iterrows():
@@ -104,21 +100,16 @@ def reconcile_rhythm_rules(*rulesets: dict[float, RhythmGradeRules]) -> dict[flo
     return reconciled
 
 
-@lru_cache(maxsize=2)
+@rules_cache
 def load_rhythm_rules(data_dir: str = "data/rhythm") -> dict[float, RhythmGradeRules]:
     """
     Loads all rhythm CSVs and returns the reconciled grade->rules dict.
-    Cached so repeated calls are cheap.
+    Cached per rules version so repeated calls are cheap.
     """
-    global _CACHED_RULES
-    if _CACHED_RULES is not None:
-        return _CACHED_RULES
-
     rulesets: list[dict[float, RhythmGradeRules]] = []
-    for filename in Path(data_dir).iterdir():
+    for filename in rules_glob(data_dir):
         if filename.suffix.lower() != ".csv":
             continue
         rulesets.append(unpack_rhythm_data(filename))
 
-    _CACHED_RULES = reconcile_rhythm_rules(*rulesets)
-    return _CACHED_RULES
+    return reconcile_rhythm_rules(*rulesets)
@@ -3,7 +3,7 @@ from __future__ import annotations
 import math
 import re
 
-from music21 import converter, stream
+from music21 import stream
 
 from data_processing import build_instrument_data, derive_observed_grades
 from utilities import (
@@ -11,7 +11,11 @@ from utilities import (
     validate_part_for_availability,
     format_grade,
     get_closest_grade,
+    load_score,
+    ticks_per_quarter,
+    to_ticks,
 )
+from utilities.timebase import as_fraction
 from analyzers.rhythm.rules import load_rhythm_rules
 from app_data import RHYTHM_TOKEN_MAP
 
@@ -170,9 +174,9 @@ def _compute_texture_density(score) -> tuple[float, float, int]:
     return ratio, avg_active, total_measures
 
 
-def _norm_offset(value) -> float | None:
+def _offset_ticks(value, tpq: int) -> int | None:
     try:
-        return round(float(value), 6)
+        return to_ticks(value, tpq)
     except (TypeError, ValueError):
         return None
 
@@ -196,14 +200,18 @@ def _get_rhythm_step(grade: float) -> float:
     return max(0.03125, step)
 
 
-def _quantize_offset(offset: float, step: float) -> float:
-    if step <= 0:
-        return offset
-    pos = offset / step
-    snapped = round(pos)
-    if abs(pos - snapped) <= 1e-3:
-        return round(snapped * step, 6)
-    return round(offset, 6)
+def _quantize_ticks(ticks: int, step: float, tpq: int) -> int:
+    # snap to the rhythm grid only when within 1/1000 of a step of it
+    step_ticks = as_fraction(step) * tpq
+    if step_ticks <= 0:
+        return ticks
+    remainder = ticks % step_ticks
+    tol = step_ticks / 1000
+    if remainder <= tol:
+        return round(ticks - remainder)
+    if step_ticks - remainder <= tol:
+        return round(ticks - remainder + step_ticks)
+    return ticks
 
 
 def _pitch_midi(pitch_obj):
@@ -297,8 +305,9 @@ def _pair_congruency(events_a: dict, events_b: dict) -> dict[str, float | None]:
 def _compute_congruency(score, grade: float) -> dict[str, float | None]:
     instrument_data = build_instrument_data()
     step = _get_rhythm_step(grade)
+    tpq = ticks_per_quarter(score)
 
-    part_events: dict[str, dict[tuple[int, float], object | None]] = {}
+    part_events: dict[str, dict[tuple[int, int], object | None]] = {}
     part_groups: dict[str, str | None] = {}
     part_families: dict[str, str] = {}
 
@@ -311,16 +320,16 @@ def _compute_congruency(score, grade: float) -> dict[str, float | None]:
         part_groups[part_name] = group
         part_families[part_name] = family
 
-        events: dict[tuple[int, float], object | None] = {}
+        events: dict[tuple[int, int], object | None] = {}
         for meas in part.getElementsByClass(stream.Measure):
             num = getattr(meas, "measureNumber", None)
             if num is None:
                 continue
             for el in meas.recurse().notes:
-                offset = _norm_offset(getattr(el, "offset", None))
+                offset = _offset_ticks(getattr(el, "offset", None), tpq)
                 if offset is None:
                     continue
-                quantized = _quantize_offset(offset, step)
+                quantized = _quantize_ticks(offset, step, tpq)
                 pitch = _pick_event_pitch(el)
                 if pitch is None and family != "percussion":
                     continue
@@ -740,7 +749,7 @@ def run_scoring(
         if score is not None:
             score_factory = lambda: score
         elif score_path is not None:
-            score_factory = lambda: converter.parse(score_path)
+            score_factory = lambda: load_score(score_path)
         else:
             raise ValueError("score_path or score_factory is required")
 
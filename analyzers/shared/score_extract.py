@@ -1,58 +1,68 @@
 # shared/score_extract.py
 from __future__ import annotations
 
-from music21 import meter as m21meter, stream
-from models import MeterData, RhythmGradeRules
-from analyzers.meter.helpers import meter_segment_confidence
-from utilities import format_grade, iter_measure_events
+from music21 import stream
+from models import MeterData, MeterSegment, RhythmGradeRules
+from analyzers.meter.helpers import meter_type_confidences
+from utilities import context_index, format_grade, iter_measure_events
 
 
 def extract_meter_segments(score, *, grade: float, rules_for_grade: RhythmGradeRules) -> list[MeterData]:
+    records = extract_meter_records(score)
+    confs = meter_type_confidences([r.type for r in records], [rules_for_grade])[0]
+    return [materialize_meter_segment(r, grade, int(c)) for r, c in zip(records, confs)]
+
+
+def materialize_meter_segment(record: MeterSegment, grade: float, confidence: int, *, curve=None) -> MeterData:
+    seg = record.materialize(grade, confidence, curve=curve)
+    if confidence == 0:
+        seg.comments["Time Signature"] = (
+            f"{seg.time_signature} not common for grade {format_grade(grade)}"
+        )
+    return seg
+
+
+def extract_meter_records(score) -> tuple[MeterSegment, ...]:
+    """Time signature segments with exposure; grade-independent and immutable."""
     part0 = score.parts[0]
     measures = list(part0.getElementsByClass(stream.Measure))
 
     if not measures:
-        return []
+        return ()
 
     total_measures = len(measures)  # IMPORTANT: use count of measures in score order
+    part_ctx = context_index(score)[0]
 
     # Build list of (measure_index, measure_number, ts_ratio) ONLY when TS changes
     change_points: list[tuple[int, int, str]] = []
 
     prev_ratio = None
     for idx, meas in enumerate(measures):
-        ts = meas.getContextByClass(m21meter.TimeSignature)
+        ts = part_ctx.time_signature_at(float(meas.offset))
         ratio = ts.ratioString if ts else "4/4"
 
         if ratio != prev_ratio:
             change_points.append((idx, meas.number, ratio))
             prev_ratio = ratio
 
-    segments: list[MeterData] = []
+    segments: list[MeterSegment] = []
 
     for i, (start_idx, start_num, ratio) in enumerate(change_points):
         end_idx = change_points[i + 1][0] if i + 1 < len(change_points) else total_measures
         duration_measures = end_idx - start_idx
         exposure = duration_measures / total_measures if total_measures else 0.0
 
-        seg = MeterData(
-            measure=start_num,
-            time_signature=ratio,
-            grade=grade,
-        )
-        seg.duration = duration_measures
-        seg.exposure = exposure
-        seg.type = classify_meter(ratio)          # helper below (avoids needing ts object)
-        seg.confidence = meter_segment_confidence(seg, rules_for_grade)
-
-        if seg.confidence == 0:
-            seg.comments["Time Signature"] = (
-                f"{seg.time_signature} not common for grade {format_grade(grade)}"
+        segments.append(
+            MeterSegment(
+                measure=start_num,
+                time_signature=ratio,
+                type=classify_meter(ratio),          # helper below (avoids needing ts object)
+                duration=duration_measures,
+                exposure=exposure,
             )
+        )
 
-        segments.append(seg)
-
-    return segments
+    return tuple(segments)
 
 
 def classify_meter(ratio: str) -> str:
@@ -1,10 +1,10 @@
 
-from music21 import converter
-from functools import lru_cache
 import pandas as pd
 
-from data_processing import derive_observed_grades
+from app_data import GRADES
+from data_processing import derive_observed_grades, rules_cache, rules_file
 from models import DurationGradeBucket
+from utilities import load_score
 from .tempo.analyzer import TempoAnalyzer
 from .duration.analyzer import analyze_duration
 
@@ -23,9 +23,9 @@ def _parse_tempo_range(value: str):
     return int(parts[0]), int(parts[1])
 
 
-@lru_cache(maxsize=4)
+@rules_cache
 def load_tempo_rules(path: str = r"data/tempo_guidelines.csv", column: str = "combined"):
-    df = pd.read_csv(path)
+    df = pd.read_csv(rules_file(path))
     rules = {}
     for _, row in df.iterrows():
         grade = float(row["grade"])
@@ -46,9 +46,9 @@ def _parse_duration_value(value):
     return float(text) * 60.0
 
 
-@lru_cache(maxsize=1)
+@rules_cache
 def load_duration_rules(path: str = r"data/duration_guidelines.csv"):
-    df = pd.read_csv(path)
+    df = pd.read_csv(rules_file(path))
     rules = {}
     for _, row in df.iterrows():
         grade = float(row["Grade"])
@@ -81,7 +81,7 @@ def run_tempo_duration(
         if score is not None:
             score_factory = lambda: score
         elif score_path is not None:
-            score_factory = lambda: converter.parse(score_path)
+            score_factory = lambda: load_score(score_path)
         else:
             raise ValueError("score_path or score_factory is required")
 
@@ -103,6 +103,7 @@ def run_tempo_duration(
         kwargs = {
             "score_factory": score_factory,
             "analyze_confidence": lambda s, g: analyzer.analyze(s, g, run_target=False),
+            "analyze_confidences": analyzer.analyze_grades,
             "progress_cb": _progress_tempo if progress_cb is not None else None,
         }
         if grades is not None:
@@ -114,7 +115,10 @@ def run_tempo_duration(
     # target-grade UI data
     if score is None:
         score = score_factory()
-    tempo_data, tempo_conf = analyzer.analyze(score, target_grade, run_target=True)
+    curve_grades = (grades if grades is not None else GRADES) if run_observed else None
+    tempo_data, tempo_conf = analyzer.analyze(
+        score, target_grade, run_target=True, curve_grades=curve_grades
+    )
     duration_data, duration_conf = analyze_duration(
         score,
         duration_rules,
@@ -1,45 +1,78 @@
+import numpy as np
+
 from models import BaseAnalyzer
 from .helpers import build_tempo_marks, build_tempo_segments, get_tempo_confidence, VALID_TEMPOS
 from utilities import format_grade, get_rounded_grade
 
 
-def analyze_tempo(score, rules, grade, *, run_target: bool = False):
+def _tempo_range(rules, grade) -> tuple[int, int]:
+    # This assumes rules is a mapping grade -> "min-max" string or (min,max)
+    tempo_rule = rules[get_rounded_grade(grade)]
+    if isinstance(tempo_rule, str) and "-" in tempo_rule:
+        tempo_min, tempo_max = map(int, tempo_rule.split("-"))
+    else:
+        tempo_min, tempo_max = tempo_rule  # e.g. (72, 120)
+    return tempo_min, tempo_max
+
+
+def tempo_confidences(segments, rules, grades) -> np.ndarray:
+    """(grades x segments) tempo confidence for immutable TempoSegment records."""
+    rows = []
+    for grade in grades:
+        tempo_min, tempo_max = _tempo_range(rules, grade)
+        rows.append([get_tempo_confidence(s.bpm, tempo_min, tempo_max, grade) for s in segments])
+    return np.array(rows, dtype=np.float64).reshape(len(grades), len(segments))
+
+
+def _composite(confs, segments) -> float:
+    composite = sum(float(c) * (s.exposure or 0.0) for c, s in zip(confs, segments))
+    return min(1.0, max(0.0, composite))
+
+
+def analyze_tempo(score, rules, grade, *, run_target: bool = False, curve_grades=None):
     """
     rules[target_grade] should provide a tempo range, or you can pass in your tempo_grade_buckets mapping.
     Returns (tempo_data, composite_confidence)
     """
     tempo_marks = build_tempo_marks(score)
     segments = build_tempo_segments(score, tempo_marks)
-    rounded_grade = get_rounded_grade(grade)
-
-    # This assumes rules is a mapping grade -> "min-max" string or (min,max)
-    tempo_rule = rules[rounded_grade]
-    if isinstance(tempo_rule, str) and "-" in tempo_rule:
-        tempo_min, tempo_max = map(int, tempo_rule.split("-"))
-    else:
-        tempo_min, tempo_max = tempo_rule  # e.g. (72, 120)
+    tempo_min, tempo_max = _tempo_range(rules, grade)
+    confs = tempo_confidences(segments, rules, [grade])[0]
+    composite = _composite(confs, segments)
+    if not run_target:
+        return composite
 
-    for seg in segments:
-        seg.grade = grade
-        seg.confidence = get_tempo_confidence(seg.bpm, tempo_min, tempo_max, grade)
-        if run_target and seg.confidence < 1:
+    curves = tempo_confidences(segments, rules, curve_grades) if curve_grades else None
+    tempo_data = []
+    for i, seg in enumerate(segments):
+        conf = float(confs[i])
+        comments = None
+        if conf < 1:
             if seg.bpm < tempo_min or seg.bpm > tempo_max:
-                seg.comments = (
+                comments = (
                     f"Tempo {seg.bpm} ({seg.beat_unit}) "
                     f"outside grade {format_grade(grade)} range ({tempo_min}-{tempo_max})"
                 )
             elif seg.bpm not in VALID_TEMPOS:
-                seg.comments = f"Tempo {seg.bpm} BPM is not a standard metronome marking"
-
-    composite = sum((s.confidence or 0.0) * (s.exposure or 0.0) for s in segments)
-    composite = min(1.0, max(0.0, composite))
-    if run_target:
-        return segments, composite
-    return composite
+                comments = f"Tempo {seg.bpm} BPM is not a standard metronome marking"
+        curve = (
+            {float(g): float(curves[j, i]) for j, g in enumerate(curve_grades)}
+            if curves is not None else None
+        )
+        tempo_data.append(seg.materialize(grade, conf, comments=comments, curve=curve))
+    return tempo_data, composite
 
 
+def analyze_tempo_grades(score, rules, grades) -> dict[float, float]:
+    """Composite tempo confidence for every grade from a single extraction."""
+    segments = build_tempo_segments(score, build_tempo_marks(score))
+    confs = tempo_confidences(segments, rules, grades)
+    return {float(g): _composite(confs[j], segments) for j, g in enumerate(grades)}
 
 
 class TempoAnalyzer(BaseAnalyzer):
-    def analyze(self, score, grade, *, run_target: bool = False):
-        return analyze_tempo(score, self.rules, grade, run_target=run_target)
+    def analyze(self, score, grade, *, run_target: bool = False, curve_grades=None):
+        return analyze_tempo(score, self.rules, grade, run_target=run_target, curve_grades=curve_grades)
+
+    def analyze_grades(self, score, grades):
+        return analyze_tempo_grades(score, self.rules, grades)
@@ -1,5 +1,6 @@
 from music21 import stream, tempo
-from models import TempoData
+from data_processing import rule_table
+from models import TempoSegment
 from typing import List
 
 VALID_TEMPOS = [
@@ -39,28 +40,26 @@ def build_tempo_marks(score) -> List[tuple[int, int, str, int]]:
     return marks
 
 
-def build_tempo_segments(score, tempo_marks: List[tuple[int, int, str, int]]) -> List[TempoData]:
+def build_tempo_segments(score, tempo_marks: List[tuple[int, int, str, int]]) -> List[TempoSegment]:
     measures = score.parts[0].getElementsByClass(stream.Measure)
     total_measures = measures[-1].number
 
     if not tempo_marks:
         # default "unknown" tempo segment; you can choose 100 or whatever default
         return [
-            TempoData(
+            TempoSegment(
                 bpm=100,
                 quarter_bpm=100,
                 beat_unit="quarter",
                 measure=1,
                 exposure=1.0,
-                grade=0.0,
                 qtr_len=total_measures * 4,
-                confidence=0.0,
-                comments="No tempo markings found; using default 100 BPM"
+                note="No tempo markings found; using default 100 BPM",
             )
         ]
 
     tempo_marks = sorted(tempo_marks, key=lambda x: x[0])
-    segments: List[TempoData] = []
+    segments: List[TempoSegment] = []
 
     for i, (start, bpm, beat_unit, quarter_bpm) in enumerate(tempo_marks):
         end_measure = tempo_marks[i + 1][0] if i + 1 < len(tempo_marks) else total_measures + 1
@@ -68,15 +67,13 @@ def build_tempo_segments(score, tempo_marks: List[tuple[int, int, str, int]]) ->
         exposure = length / total_measures if total_measures else 0
 
         segments.append(
-            TempoData(
+            TempoSegment(
                 bpm=bpm,
                 quarter_bpm=quarter_bpm,
                 beat_unit=beat_unit,
                 measure=start,
                 exposure=exposure,
-                grade=0.0,
                 qtr_len=length * 4,
-                confidence=0.0
             )
         )
 
@@ -88,11 +85,7 @@ def get_tempo_score(bpm: int, low: int, high: int) -> float:
 
 
 def _penalty_per_step(grade: float) -> float:
-    if grade >= 5:
-        return 0.0
-    steps = max(0, round((grade - 0.5) / 0.5))
-    penalty = 0.20 - (0.03 * steps)
-    return max(0.0, penalty)
+    return rule_table("tempo_step_penalty").evaluate(grade)
 
 
 def _step_distance_from_range(bpm: int, low: int, high: int) -> int:
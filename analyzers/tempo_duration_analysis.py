@@ -1,10 +1,10 @@
 from dataclasses import dataclass, field
-from music21 import converter, tempo, stream
+from music21 import tempo, stream
 import math
 import pandas as pd
 from typing import List
 from models import DurationData, DurationGradeBucket
-from utilities import format_grade, get_rounded_grade
+from utilities import format_grade, get_rounded_grade, load_score
 from app_data import GRADES, ROUNDED_GRADES
 from data_processing import derive_observed_grades
 
@@ -120,7 +120,7 @@ tempo_grade_buckets = {
 
 def run(score_path: str, target_grade: float):
 
-    score = converter.parse(score_path)
+    score = load_score(score_path)
 
     # extract tempo marks explicitly
     tempo_marks = []
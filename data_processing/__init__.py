@@ -1,9 +1,37 @@
 from .build_instrument_data import build_instrument_data
 from .derive_observed_grades import derive_observed_grades
 from .unpack_tables import unpack_source_grade_table
+from .rule_tables import compile_rule, load_rule_tables, rule_table
+from .rules_version import (
+    active_rules_version,
+    bind_rules_version,
+    on_rules_reload,
+    reload_rules,
+    rules_bytes,
+    rules_cache,
+    rules_file,
+    rules_glob,
+    rules_text,
+    rules_version,
+    use_rules_version,
+)
 
 __all__ = [
     "build_instrument_data",
     "derive_observed_grades",
     "unpack_source_grade_table",
+    "compile_rule",
+    "load_rule_tables",
+    "rule_table",
+    "active_rules_version",
+    "bind_rules_version",
+    "on_rules_reload",
+    "reload_rules",
+    "rules_bytes",
+    "rules_cache",
+    "rules_file",
+    "rules_glob",
+    "rules_text",
+    "rules_version",
+    "use_rules_version",
 ]
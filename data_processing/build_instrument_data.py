@@ -1,21 +1,20 @@
 from app_data import NON_PERCUSSION_INSTRUMENTS, PERCUSSION_INSTRUMENTS, FAMILY_MAP, INST_TO_GRADE_NON_STRING
 from models import InstrumentData
 from utilities.instrument_rules import HARMONIC_SERIES, get_brass_partials
+from .rules_version import rules_cache, rules_text
 import json
-from pathlib import Path
-from functools import lru_cache
 
 
-@lru_cache(maxsize=1)
+@rules_cache
 def load_range_excluded(path: str = r"data/range_excluded.json") -> set[str]:
     try:
-        data = json.loads(Path(path).read_text())
+        data = json.loads(rules_text(path))
     except (OSError, json.JSONDecodeError):
         return set()
     excluded = data.get("range_excluded", [])
     return {str(x) for x in excluded}
 
-@lru_cache(maxsize=1)
+@rules_cache
 def build_instrument_data():
     data = {}
     range_excluded = load_range_excluded()
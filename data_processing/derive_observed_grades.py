@@ -11,6 +11,7 @@ def derive_observed_grades(
     flat_threshold: float = 0.97,
     flat_epsilon: float = 0.02,
     progress_cb: Optional[Callable[..., None]] = None,
+    analyze_confidences: Optional[Callable[[object, list], Dict[float, Optional[float]]]] = None,
 ) -> Tuple[Optional[float], Dict[float, Optional[float]]]:
     """
     Runs confidence-only analysis for each grade and derives an observed grade.
@@ -22,6 +23,9 @@ def derive_observed_grades(
         (Important: avoids cross-grade mutation / caching issues.)
     analyze_confidence:
         Function(score, grade) -> confidence (0..1) or None
+    analyze_confidences:
+        Optional batch form, Function(score, grades) -> {grade: confidence}.
+        When given, the score is parsed once and every grade is scored together.
     flat_threshold:
         Minimum confidence level to consider the piece "easy enough" across grades.
     flat_epsilon:
@@ -36,11 +40,18 @@ def derive_observed_grades(
     confidences: Dict[float, Optional[float]] = {}
 
     total = len(grades)
-    for idx, grade in enumerate(grades, start=1):
-        score = score_factory()
-        confidences[grade] = analyze_confidence(score, float(grade))
-        if progress_cb is not None:
-            progress_cb(float(grade), idx, total)
+    if analyze_confidences is not None:
+        batch = analyze_confidences(score_factory(), [float(g) for g in grades])
+        for idx, grade in enumerate(grades, start=1):
+            confidences[grade] = batch.get(float(grade))
+            if progress_cb is not None:
+                progress_cb(float(grade), idx, total)
+    else:
+        for idx, grade in enumerate(grades, start=1):
+            score = score_factory()
+            confidences[grade] = analyze_confidence(score, float(grade))
+            if progress_cb is not None:
+                progress_cb(float(grade), idx, total)
 
     observed = _derive_observed_grade(
         confidences,
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+
+import numpy as np
+
+from .rules_version import rules_cache, rules_text
+
+RULE_TABLES_PATH = "data/rule_tables.json"
+
+
+# ------------------------------
+# Compiled rule kinds
+# ------------------------------
+
+@dataclass(frozen=True)
+class StepRule:
+    """
+    Piecewise-constant rule: value[i] applies while feature <= bounds[i];
+    the last value applies above every bound.
+    """
+    name: str
+    bounds: np.ndarray
+    values: np.ndarray
+
+    def evaluate(self, feature):
+        x = np.asarray(feature, dtype=float)
+        out = self.values[np.searchsorted(self.bounds, x, side="left")]
+        return out if out.ndim else float(out)
+
+
+@dataclass(frozen=True)
+class GradeLinearRule:
+    """
+    Per-grade value that moves linearly with the number of grade steps above
+    origin, clamped at floor, and zero from zero_from_grade upward.
+    """
+    name: str
+    origin: float
+    step: float
+    base: float
+    slope: float
+    floor: float
+    zero_from_grade: float | None
+
+    def evaluate(self, grades):
+        g = np.asarray(grades, dtype=float)
+        steps = np.maximum(0.0, np.round((g - self.origin) / self.step))
+        out = np.maximum(self.floor, self.base + self.slope * steps)
+        if self.zero_from_grade is not None:
+            out = np.where(g >= self.zero_from_grade, 0.0, out)
+        return out if out.ndim else float(out)
+
+
+@dataclass(frozen=True)
+class CategoryRule:
+    """
+    Maps a category to a boolean flag in each grade's ruleset.
+    cases is {category: field}, or None to use the category itself as the key.
+    Only a literal True passes; categories without a case get default.
+    """
+    name: str
+    cases: dict[str, str] | None
+    default: float
+
+    def _flag(self, ruleset, category: str) -> float:
+        if self.cases is None:
+            field = category
+        elif category in self.cases:
+            field = self.cases[category]
+        else:
+            return self.default
+        if ruleset is None:
+            return self.default
+        if isinstance(ruleset, dict):
+            value = ruleset.get(field)
+        else:
+            value = getattr(ruleset, field, None)
+        if value is None and self.cases is None:
+            return self.default
+        return 1.0 if value is True else 0.0
+
+    def evaluate(self, categories, rulesets) -> np.ndarray:
+        """
+        Returns a (len(rulesets), len(categories)) array. Each distinct
+        category is resolved once per grade and broadcast back to the items.
+        """
+        cats = [str(c) for c in categories]
+        if not cats:
+            return np.zeros((len(rulesets), 0))
+        unique, inverse = np.unique(np.asarray(cats, dtype=object), return_inverse=True)
+        table = np.array(
+            [[self._flag(rs, c) for c in unique] for rs in rulesets],
+            dtype=float,
+        ).reshape(len(rulesets), len(unique))
+        return table[:, inverse]
+
+
+_KINDS = {"step", "grade_linear", "category"}
+
+
+def compile_rule(name: str, spec: dict):
+    kind = spec.get("kind")
+    if kind not in _KINDS:
+        raise ValueError(f"Rule table {name!r} has unknown kind {kind!r}")
+
+    if kind == "step":
+        bounds = np.asarray(spec["bounds"], dtype=float)
+        values = np.asarray(spec["values"], dtype=float)
+        if len(values) != len(bounds) + 1:
+            raise ValueError(f"Rule table {name!r} needs one more value than bounds")
+        if np.any(np.diff(bounds) <= 0):
+            raise ValueError(f"Rule table {name!r} bounds must be increasing")
+        return StepRule(name, bounds, values)
+
+    if kind == "grade_linear":
+        zero_from = spec.get("zero_from_grade")
+        return GradeLinearRule(
+            name,
+            origin=float(spec.get("origin", 0.5)),
+            step=float(spec.get("step", 0.5)),
+            base=float(spec["base"]),
+            slope=float(spec["slope"]),
+            floor=float(spec.get("floor", 0.0)),
+            zero_from_grade=float(zero_from) if zero_from is not None else None,
+        )
+
+    cases = spec.get("cases", "*")
+    return CategoryRule(
+        name,
+        cases=None if cases == "*" else {str(k): str(v) for k, v in cases.items()},
+        default=float(spec.get("default", 0.0)),
+    )
+
+
+# ------------------------------
+# Loader
+# ------------------------------
+
+@rules_cache
+def load_rule_tables(path: str = RULE_TABLES_PATH) -> dict:
+    data = json.loads(rules_text(path))
+    return {name: compile_rule(name, spec) for name, spec in data.items()}
+
+
+def rule_table(name: str):
+    try:
+        return load_rule_tables()[name]
+    except KeyError:
+        raise KeyError(f"No rule table named {name!r} in {RULE_TABLES_PATH}") from None
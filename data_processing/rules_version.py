@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import fnmatch
+import functools
+import hashlib
+import inspect
+import io
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable
+
+RULES_DIR = "data"
+RULE_SUFFIXES = {".csv", ".json"}
+KEEP_VERSIONS = 2
+
+_LOCK = threading.RLock()
+_CURRENT: str | None = None
+_HISTORY: list[str] = []
+_ACTIVE: ContextVar[str | None] = ContextVar("rules_version", default=None)
+# running jobs per version; a pinned version outlives the KEEP_VERSIONS window
+_PINS: dict[str, int] = {}
+# raw guideline file contents per version, keyed by resolved path
+_SNAPSHOTS: dict[str, dict[Path, bytes]] = {}
+_LOADERS: list[Callable] = []
+_RELOAD_LISTENERS: list[Callable[[str], None]] = []
+
+
+def _read_rules(rules_dir: str | Path = RULES_DIR) -> tuple[str, dict[Path, bytes]]:
+    """
+    Reads every CSV/JSON guideline file under rules_dir once and returns
+    (version, contents). The version is a content hash over those bytes;
+    file paths are part of it so renames and additions count as changes.
+    """
+    root = Path(rules_dir).resolve()
+    files = sorted(
+        p for p in root.rglob("*")
+        if p.is_file() and p.suffix.lower() in RULE_SUFFIXES
+    )
+    digest = hashlib.sha256()
+    contents: dict[Path, bytes] = {}
+    for path in files:
+        data = path.read_bytes()
+        contents[path] = data
+        digest.update(path.relative_to(root).as_posix().encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(data)
+        digest.update(b"\0")
+    return digest.hexdigest()[:16], contents
+
+
+def compute_rules_version(rules_dir: str | Path = RULES_DIR) -> str:
+    """Content hash over every CSV/JSON guideline file under rules_dir."""
+    return _read_rules(rules_dir)[0]
+
+
+def _snapshot() -> dict[Path, bytes]:
+    version = active_rules_version()
+    try:
+        return _SNAPSHOTS[version]
+    except KeyError:
+        # never read the disk instead: that would mix rule sets in one job
+        raise LookupError(f"Rules version {version} is no longer loaded") from None
+
+
+def _in_rules_dir(path: Path) -> bool:
+    root = Path(RULES_DIR).resolve()
+    return path == root or root in path.parents
+
+
+def rules_bytes(path: str | Path) -> bytes:
+    """
+    Contents of a guideline file as of the active rules version. Loaders
+    read through this instead of the disk, so a job pinned to an older
+    version never sees files edited after that version was loaded.
+    Paths outside RULES_DIR are read from disk.
+    """
+    resolved = Path(path).resolve()
+    if not _in_rules_dir(resolved):
+        return resolved.read_bytes()
+    snapshot = _snapshot()
+    try:
+        return snapshot[resolved]
+    except KeyError:
+        raise FileNotFoundError(f"No rules file {path} in rules version {active_rules_version()}") from None
+
+
+def rules_text(path: str | Path, encoding: str = "utf-8") -> str:
+    return rules_bytes(path).decode(encoding)
+
+
+def rules_file(path: str | Path) -> io.BytesIO:
+    """rules_bytes as a binary file object (e.g. for pd.read_csv)."""
+    return io.BytesIO(rules_bytes(path))
+
+
+def rules_glob(directory: str | Path, pattern: str = "*") -> list[Path]:
+    """Sorted guideline files directly inside directory whose names match pattern."""
+    resolved = Path(directory).resolve()
+    if not _in_rules_dir(resolved):
+        return sorted(p for p in Path(directory).glob(pattern) if p.is_file())
+    snapshot = _snapshot()
+    return sorted(
+        p for p in snapshot
+        if p.parent == resolved and fnmatch.fnmatch(p.name, pattern)
+    )
+
+
+def rules_version() -> str:
+    """Version of the rule set new jobs should use (computed and warmed on first call)."""
+    if _CURRENT is None:
+        with _LOCK:
+            if _CURRENT is None:
+                _activate(*_read_rules())
+    return _CURRENT
+
+
+def active_rules_version() -> str:
+    """Version bound to the running job, falling back to the current rule set."""
+    return _ACTIVE.get() or rules_version()
+
+
+@contextmanager
+def use_rules_version(version: str | None = None):
+    """
+    Runs the block under version (default: the current one, pinned
+    atomically). The version stays loaded while any block is using it,
+    however many reloads happen meanwhile.
+    """
+    with _LOCK:
+        if version is None:
+            version = rules_version()
+        _PINS[version] = _PINS.get(version, 0) + 1
+    token = _ACTIVE.set(version)
+    try:
+        yield version
+    finally:
+        _ACTIVE.reset(token)
+        _unpin(version)
+
+
+def _unpin(version: str) -> None:
+    with _LOCK:
+        count = _PINS.pop(version, 0) - 1
+        if count > 0:
+            _PINS[version] = count
+        elif version not in _HISTORY:
+            _prune()
+
+
+def _prune() -> None:
+    # caller holds _LOCK; keeps the KEEP_VERSIONS window plus pinned versions
+    live = set(_HISTORY) | set(_PINS)
+    for old in set(_SNAPSHOTS) - live:
+        _SNAPSHOTS.pop(old, None)
+    for loader in list(_LOADERS):
+        loader.prune_versions(live)
+
+
+def bind_rules_version(fn: Callable, version: str | None = None) -> Callable:
+    """
+    Wraps fn so it runs under the given rules version. Needed for worker
+    threads, which do not inherit the submitting thread's context.
+    """
+    version = version or active_rules_version()
+
+    @functools.wraps(fn)
+    def bound(*args, **kwargs):
+        with use_rules_version(version):
+            return fn(*args, **kwargs)
+
+    return bound
+
+
+def rules_cache(fn: Callable) -> Callable:
+    """
+    Replacement for lru_cache on rule loaders: results are cached per rules
+    version, so a reload never mixes old and new guideline data in one job.
+    """
+    signature = inspect.signature(fn)
+    cache: dict[tuple, object] = {}
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (active_rules_version(), tuple(bound.arguments.items()))
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+        value = fn(*args, **kwargs)
+        return cache.setdefault(key, value)
+
+    def _prune(keep: set[str]):
+        for key in list(cache):
+            if key[0] not in keep:
+                cache.pop(key, None)
+
+    wrapper.cache_clear = cache.clear
+    wrapper.prune_versions = _prune
+    _LOADERS.append(wrapper)
+    return wrapper
+
+
+def on_rules_reload(callback: Callable[[str], None]) -> Callable[[str], None]:
+    _RELOAD_LISTENERS.append(callback)
+    return callback
+
+
+def reload_rules() -> dict:
+    """
+    Re-reads the guideline files and, if anything changed, loads the new
+    rule set completely before switching new jobs over to it. Jobs already
+    running keep the version they started with: their loaders read from
+    that version's snapshot of the files, not from the disk, and the
+    snapshot is kept until the last of them finishes.
+    """
+    with _LOCK:
+        previous = _CURRENT
+        version, contents = _read_rules()
+        if version == previous:
+            return {"version": version, "previous": previous, "changed": False}
+        _activate(version, contents)
+    for callback in list(_RELOAD_LISTENERS):
+        callback(version)
+    return {"version": version, "previous": previous, "changed": True}
+
+
+def _activate(version: str, contents: dict[Path, bytes]) -> None:
+    # caller holds _LOCK
+    global _CURRENT
+    _SNAPSHOTS[version] = contents
+    # not use_rules_version: the version isn't in _HISTORY yet, so
+    # unpinning it would prune the snapshot being warmed
+    token = _ACTIVE.set(version)
+    try:
+        for loader in list(_LOADERS):
+            loader()
+    except Exception:
+        _prune()
+        raise
+    finally:
+        _ACTIVE.reset(token)
+
+    _CURRENT = version
+    if version in _HISTORY:
+        _HISTORY.remove(version)
+    _HISTORY.append(version)
+    del _HISTORY[:-KEEP_VERSIONS]
+    _prune()
@@ -1,10 +1,12 @@
+import hmac
 import json
 import os
-import queue
+import stat
 import threading
 import tempfile
 import uuid
 import hashlib
+import re
 import time
 
 from flask import Flask, Response, jsonify, request, stream_with_context, send_from_directory
@@ -12,15 +14,47 @@ from flask_cors import CORS
 from werkzeug.utils import secure_filename
 
 from app_data import FULL_GRADES, GRADES
+from data_processing import on_rules_reload, reload_rules, rules_version
 from models import AnalysisOptions
+from utilities.cost_model import CostModel, cost_features
+from utilities.json_stream import dumps_json, gzip_chunks, iter_json, result_payload
+from utilities.gc_policy import install_gc_policy
+from utilities.job_store import BATCH, INTERACTIVE, STANDARD, JobStore
+from utilities.memory import MemoryBudget
+from utilities.result_cache import ResultCache, result_cache_key
+from utilities.score_loader import max_xml_bytes, score_xml_bytes
+from utilities.score_scan import scan_score
+from utilities.uploads import ChunkedUploads, UploadOffsetMismatch, UploadStore, UploadTooLarge, save_stream
 from run_analysis import run_analysis_engine
 
 app = Flask(__name__, static_folder="html")
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
-JOBS = {}
-UPLOAD_DIR = tempfile.mkdtemp(prefix="score_uploads_")
+def _private_dir(name: str) -> str:
+    """
+    Per-user directory under the system temp dir, created with mode 0700.
+    Refuses to use one that another user owns or can write to, since the
+    job store and result cache trust what they read from it.
+    """
+    if not hasattr(os, "getuid"):
+        path = os.path.join(tempfile.gettempdir(), name)
+        os.makedirs(path, exist_ok=True)
+        return path
+    path = os.path.join(tempfile.gettempdir(), f"{name}-{os.getuid()}")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise RuntimeError(f"{path} must be a directory owned by this user with mode 0700")
+    return path
+
+
+# Shared by every process on the machine, so any worker can serve any job.
+APP_STATE_DIR = os.environ.get("APP_STATE_DIR") or _private_dir("exemplify")
+JOB_DB_PATH = os.environ.get("JOB_DB_PATH") or os.path.join(APP_STATE_DIR, "jobs.sqlite3")
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR") or os.path.join(tempfile.gettempdir(), "score_uploads")
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR") or os.path.join(APP_STATE_DIR, "result_cache")
 JOB_TTL_SECONDS = 60 * 60 * 6
+_DIGEST_RE = re.compile(r"[0-9a-f]{64}")
 
 
 def _env_int(name, default):
@@ -43,43 +77,325 @@ JOB_TIMEOUT_BASE = _env_int("JOB_TIMEOUT_BASE", 120)
 JOB_TIMEOUT_PER_MB = _env_float("JOB_TIMEOUT_PER_MB", 8.0)
 JOB_TIMEOUT_MIN = _env_int("JOB_TIMEOUT_MIN", 60)
 JOB_TIMEOUT_MAX = _env_int("JOB_TIMEOUT_MAX", 900)
-
-
-def estimate_timeout(file_size_bytes: int | None) -> int:
-    if not file_size_bytes or file_size_bytes <= 0:
+# deadline = predicted runtime * factor + slack, clamped to [MIN, MAX]
+JOB_TIMEOUT_FACTOR = _env_float("JOB_TIMEOUT_FACTOR", 2.5)
+JOB_TIMEOUT_SLACK = _env_int("JOB_TIMEOUT_SLACK", 30)
+# jobs predicted to take longer than this are refused outright
+MAX_JOB_SECONDS = _env_int("MAX_JOB_SECONDS", 1800)
+# predicted seconds of queued + running work accepted before new jobs get 429
+MAX_QUEUED_WORK_SECONDS = _env_int("MAX_QUEUED_WORK_SECONDS", 3600)
+COST_MODEL_REFIT_SECONDS = _env_int("COST_MODEL_REFIT_SECONDS", 300)
+# scores whose MusicXML (decompressed, for .mxl) is at least this large run
+# observed-grade passes in measure windows
+WINDOWED_MIN_BYTES = _env_int("WINDOWED_MIN_BYTES", 5_000_000)
+WINDOW_MEASURES = _env_int("WINDOW_MEASURES", 32)
+# projected RSS per job = base + per MB of MusicXML; 0 disables the budget
+MEMORY_BUDGET_BYTES = _env_int("MEMORY_BUDGET_BYTES", 850_000_000)
+JOB_MEMORY_BASE = _env_int("JOB_MEMORY_BASE", 60_000_000)
+JOB_MEMORY_PER_MB = _env_float("JOB_MEMORY_PER_MB", 45.0)
+# analysis threads per process claiming jobs from the store (0 = serve HTTP only)
+ANALYSIS_WORKER_THREADS = _env_int("ANALYSIS_WORKER_THREADS", 1)
+# extra threads per process that only take interactive jobs, so quick
+# target-only checks never wait behind a full sweep
+INTERACTIVE_WORKER_THREADS = _env_int("INTERACTIVE_WORKER_THREADS", 1)
+# priority classes: target-only jobs predicted under INTERACTIVE_MAX_SECONDS
+# are interactive; full-grade sweeps and jobs over BATCH_MIN_SECONDS are batch.
+# A queued job gains one class every JOB_AGING_SECONDS, so none starves.
+INTERACTIVE_MAX_SECONDS = _env_int("INTERACTIVE_MAX_SECONDS", 30)
+BATCH_MIN_SECONDS = _env_int("BATCH_MIN_SECONDS", 300)
+JOB_AGING_SECONDS = _env_float("JOB_AGING_SECONDS", 60.0)
+JOB_POLL_SECONDS = _env_float("JOB_POLL_SECONDS", 0.5)
+EVENT_POLL_SECONDS = _env_float("EVENT_POLL_SECONDS", 0.25)
+JOB_HEARTBEAT_SECONDS = _env_int("JOB_HEARTBEAT_SECONDS", 15)
+JOB_HEARTBEAT_TIMEOUT = _env_int("JOB_HEARTBEAT_TIMEOUT", 120)
+
+# finished results: per-process memory LRU + compressed disk tier shared by all processes
+RESULT_CACHE_MEMORY_BYTES = _env_int("RESULT_CACHE_MEMORY_BYTES", 64_000_000)
+RESULT_CACHE_DISK_BYTES = _env_int("RESULT_CACHE_DISK_BYTES", 500_000_000)
+
+# abandoned chunked uploads are dropped after this long without a new chunk
+UPLOAD_PARTIAL_TTL = _env_int("UPLOAD_PARTIAL_TTL", 60 * 60)
+# stored uploads are evicted least-recently-used first beyond this; 0 = unbounded
+UPLOAD_STORE_BYTES = _env_int("UPLOAD_STORE_BYTES", 2_000_000_000)
+
+JOB_STORE = JobStore(JOB_DB_PATH)
+# a queued or running job pins its score, in whichever process it runs
+UPLOAD_STORE = UploadStore(UPLOAD_DIR, budget_bytes=UPLOAD_STORE_BYTES, is_pinned=JOB_STORE.digest_in_use)
+CHUNKED_UPLOADS = ChunkedUploads(UPLOAD_DIR, max_bytes=MAX_UPLOAD_BYTES)
+RESULT_CACHE = ResultCache(
+    RESULT_CACHE_DIR,
+    memory_bytes=RESULT_CACHE_MEMORY_BYTES,
+    disk_bytes=RESULT_CACHE_DISK_BYTES,
+)
+on_rules_reload(RESULT_CACHE.drop_rules_versions_except)
+
+# load the rule set before freezing so it is never rescanned by the GC
+install_gc_policy(warmup=rules_version)
+MEMORY_BUDGET = MemoryBudget(MEMORY_BUDGET_BYTES)
+COST_MODEL = CostModel()
+_COST_MODEL_FITTED_AT = 0.0
+
+
+def estimate_timeout(xml_bytes: int | None) -> int:
+    if not xml_bytes or xml_bytes <= 0:
         return JOB_TIMEOUT_BASE
-    size_mb = file_size_bytes / (1024 * 1024)
+    size_mb = xml_bytes / (1024 * 1024)
     timeout = JOB_TIMEOUT_BASE + size_mb * JOB_TIMEOUT_PER_MB
     timeout = max(JOB_TIMEOUT_MIN, timeout)
     timeout = min(JOB_TIMEOUT_MAX, timeout)
     return int(timeout)
 
 
+def _refresh_cost_model() -> None:
+    """Refits the cost model from recorded job timings, at most every COST_MODEL_REFIT_SECONDS."""
+    global _COST_MODEL_FITTED_AT
+    now = time.time()
+    if now - _COST_MODEL_FITTED_AT < COST_MODEL_REFIT_SECONDS:
+        return
+    _COST_MODEL_FITTED_AT = now
+    try:
+        COST_MODEL.fit(JOB_STORE.timings())
+    except Exception:
+        pass
+
+
+def _analysis_passes(payload) -> int:
+    grades = _observed_grades(payload)
+    return 1 + (len(grades) if grades else 0)
+
+
+def _plan_job(payload):
+    """
+    Pre-scans the score, predicts its runtime and sets the job's deadline.
+    Returns an (error, status) pair when the job can never be accepted.
+    """
+    stats = scan_score(payload["score_path"]) if payload.get("score_path") else None
+    if stats is None:
+        # unreadable by the scan; fall back to the size-based estimate
+        payload["timeout_seconds"] = estimate_timeout(_xml_bytes(payload))
+        return None
+    if stats.xml_bytes > (payload.get("xml_bytes") or 0):
+        # the container under-declared its score's size
+        payload["xml_bytes"] = stats.xml_bytes
+        payload["projected_memory"] = estimate_job_memory(stats.xml_bytes)
+        if not MEMORY_BUDGET.fits(payload["projected_memory"]):
+            return "Score too large for available memory", 413
+    _refresh_cost_model()
+    features = cost_features(stats, passes=_analysis_passes(payload))
+    predicted = COST_MODEL.predict(features)
+    if MAX_JOB_SECONDS and predicted > MAX_JOB_SECONDS:
+        return "Score too complex to analyze on this server.", 413
+    payload["scan"] = stats.as_dict()
+    payload["cost_features"] = features
+    payload["predicted_seconds"] = round(predicted, 1)
+    timeout = predicted * JOB_TIMEOUT_FACTOR + JOB_TIMEOUT_SLACK
+    payload["timeout_seconds"] = int(min(JOB_TIMEOUT_MAX, max(JOB_TIMEOUT_MIN, timeout)))
+    return None
+
+
+def _over_capacity(payload) -> bool:
+    if MAX_QUEUE_SIZE and _active_job_count() >= MAX_QUEUE_SIZE:
+        return True
+    predicted = payload.get("predicted_seconds")
+    if not MAX_QUEUED_WORK_SECONDS or not predicted:
+        return False
+    # sweeps queued behind the interactive lane don't crowd out quick checks
+    max_priority = INTERACTIVE if _job_priority(payload) == INTERACTIVE else None
+    queued_work = JOB_STORE.active_cost(max_priority=max_priority)
+    # an idle server always takes one job
+    return queued_work > 0 and queued_work + predicted > MAX_QUEUED_WORK_SECONDS
+
+
+def _job_priority(payload) -> int:
+    predicted = payload.get("predicted_seconds")
+    if parse_bool(payload.get("target_only")):
+        if predicted is None or predicted <= INTERACTIVE_MAX_SECONDS:
+            return INTERACTIVE
+        return STANDARD
+    if parse_bool(payload.get("full_grade_analysis")):
+        return BATCH
+    if predicted is not None and predicted >= BATCH_MIN_SECONDS:
+        return BATCH
+    return STANDARD
+
+
+def _enqueue_job(payload, dedupe_key):
+    """Queues the job with an ETA as its first progress event; returns (job_id, shared)."""
+    predicted = payload.get("predicted_seconds")
+    priority = _job_priority(payload)
+    eta_event = None
+    if predicted:
+        # only work in the same or a faster class is ahead of this job
+        ahead = JOB_STORE.active_cost(max_priority=priority)
+        lanes = ANALYSIS_WORKER_THREADS + (INTERACTIVE_WORKER_THREADS if priority == INTERACTIVE else 0)
+        eta_event = {
+            "type": "eta",
+            "seconds": round(ahead / max(1, lanes) + predicted, 1),
+            "run_seconds": predicted,
+            "queued_seconds": round(ahead, 1),
+            "priority": priority,
+        }
+    return JOB_STORE.enqueue(
+        str(uuid.uuid4()),
+        payload,
+        dedupe_key=dedupe_key,
+        digest=payload.get("digest"),
+        sweep=_sweep_key(payload),
+        cost=predicted,
+        memory=payload.get("projected_memory"),
+        priority=priority,
+        first_event=eta_event,
+    )
+
+
+def _sweep_key(payload) -> str | None:
+    """Jobs with equal keys share run_analysis's in-memory observed-grade results."""
+    if parse_bool(payload.get("target_only")) or not payload.get("digest"):
+        return None
+    return f"{payload['digest']}:{int(parse_bool(payload.get('strings_only')))}"
+
+
+def _xml_bytes(payload) -> int | None:
+    # an .mxl's file_size is its compressed size; everything sized by the
+    # score (memory, windowing, timeouts) goes by the MusicXML it expands to
+    return payload.get("xml_bytes") or payload.get("file_size")
+
+
+def window_measures_for(xml_bytes: int | None) -> int | None:
+    if not xml_bytes or WINDOW_MEASURES <= 0 or xml_bytes < WINDOWED_MIN_BYTES:
+        return None
+    return WINDOW_MEASURES
+
+
+def estimate_job_memory(xml_bytes: int | None) -> int:
+    size = xml_bytes if xml_bytes and xml_bytes > 0 else 0
+    return int(JOB_MEMORY_BASE + size * JOB_MEMORY_PER_MB)
+
+
+def _observed_grades(payload):
+    if parse_bool(payload.get("target_only")):
+        return None
+    return FULL_GRADES if parse_bool(payload.get("full_grade_analysis")) else GRADES
+
+
+def _file_digest(path: str) -> str | None:
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(block)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+
+# request fields a JSON client may set; everything else in a payload (the
+# digest, file size, scan and memory/cost projections) is derived here
+_CLIENT_FIELDS = (
+    "score_path",
+    "target_grade",
+    "target_only",
+    "strings_only",
+    "full_grade_analysis",
+    "comment_codes",
+    "payload_format",
+)
+
+
+def _json_payload() -> dict:
+    body = request.get_json(force=True, silent=True)
+    if not isinstance(body, dict):
+        return {}
+    return {name: body[name] for name in _CLIENT_FIELDS if name in body}
+
+
+def _result_cache_key(payload, rules_ver: str) -> str | None:
+    digest = payload.get("digest")
+    if not digest:
+        return None
+    return result_cache_key(
+        digest,
+        float(payload.get("target_grade", 2)),
+        target_only=parse_bool(payload.get("target_only")),
+        strings_only=parse_bool(payload.get("strings_only")),
+        grades=_observed_grades(payload),
+        rules_ver=rules_ver,
+    )
+
+
+def _cached_result(payload):
+    """
+    Cached final result for this request under the current rules, or None.
+    A payload without a digest gets one hashed from its score file: digests
+    only ever come from the server (an upload, or the content-addressed
+    name of a stored one), never from the client, since they key both the
+    result cache and job sharing.
+    """
+    _sync_rules_version()
+    if payload.get("score_path") and not payload.get("digest"):
+        payload["digest"] = _file_digest(payload["score_path"])
+    key = _result_cache_key(payload, rules_version())
+    if key is None:
+        return None
+    try:
+        cached = RESULT_CACHE.get(key)
+    except Exception:
+        return None
+    return {**cached, "cached": True} if isinstance(cached, dict) else None
+
+
+_SEEN_RULES_VERSION = None
+
+
+def _sync_rules_version() -> None:
+    """
+    Follows rule reloads made through any process sharing the job store:
+    when the shared version changes, this process reloads its rules too,
+    so it neither runs jobs on nor caches results under the old rule set.
+    """
+    global _SEEN_RULES_VERSION
+    try:
+        shared = JOB_STORE.rules_version()
+    except Exception:
+        return
+    if shared is None or shared == _SEEN_RULES_VERSION:
+        return
+    _SEEN_RULES_VERSION = shared
+    if shared != rules_version():
+        try:
+            reload_rules()
+        except Exception:
+            pass
+
+
 def _active_job_count() -> int:
-    return sum(1 for job in JOBS.values() if not job.get("done"))
+    return JOB_STORE.active_count()
 
 
 def _cleanup_jobs():
-    now = time.time()
-    expired = [
-        job_id
-        for job_id, job in JOBS.items()
-        if job.get("done_at") and now - job["done_at"] > JOB_TTL_SECONDS
-    ]
-    for job_id in expired:
-        JOBS.pop(job_id, None)
-
-
-def make_json_safe(value):
-    if isinstance(value, dict):
-        return {str(key): make_json_safe(val) for key, val in value.items()}
-    if isinstance(value, (list, tuple, set)):
-        return [make_json_safe(item) for item in value]
-    if isinstance(value, (str, int, float, bool)) or value is None:
-        return value
-    if hasattr(value, "__dict__"):
-        return make_json_safe(vars(value))
-    return str(value)
+    JOB_STORE.cleanup(JOB_TTL_SECONDS)
+    CHUNKED_UPLOADS.cleanup(UPLOAD_PARTIAL_TTL)
+
+
+def _upload_too_large() -> bool:
+    # reject before reading the body; the multipart envelope adds a little
+    length = request.content_length
+    return bool(MAX_UPLOAD_BYTES and length and length > MAX_UPLOAD_BYTES + 64 * 1024)
+
+
+def _accepts_gzip() -> bool:
+    return "gzip" in (request.headers.get("Accept-Encoding") or "").lower()
+
+
+def _encoded_response(chunks, *, mimetype: str) -> Response:
+    """Streams text chunks, gzip-compressed when the client accepts it."""
+    gzip = _accepts_gzip()
+    body = gzip_chunks(chunks) if gzip else chunks
+    resp = Response(stream_with_context(body), mimetype=mimetype)
+    if gzip:
+        resp.headers["Content-Encoding"] = "gzip"
+    resp.headers["Vary"] = "Accept-Encoding"
+    return resp
 
 
 def parse_bool(value) -> bool:
@@ -101,17 +417,27 @@ def static_files(filename):
 
 
 def _run_job(job_id, payload):
-    job = JOBS[job_id]
-    q = job["queue"]
-
     def progress_cb(event):
-        q.put(event)
+        JOB_STORE.add_event(job_id, event)
+
+    stop_heartbeat = threading.Event()
+
+    def heartbeat():
+        while not stop_heartbeat.wait(JOB_HEARTBEAT_SECONDS):
+            JOB_STORE.heartbeat(job_id)
+
+    threading.Thread(target=heartbeat, daemon=True).start()
 
+    # admitted by JOB_STORE.claim against every process's running jobs
+    projected = payload.get("projected_memory") or estimate_job_memory(_xml_bytes(payload))
+    MEMORY_BUDGET.hold(projected)
+    result = None
+    error = None
     try:
         target_only = parse_bool(payload.get("target_only"))
         strings_only = parse_bool(payload.get("strings_only"))
-        full_grade = parse_bool(payload.get("full_grade_analysis"))
         score_path = payload.get("score_path")
+        UPLOAD_STORE.touch(score_path)
         target_grade = float(payload.get("target_grade", 2))
         timeout_seconds = payload.get("timeout_seconds")
         deadline = (
@@ -119,16 +445,14 @@ def _run_job(job_id, payload):
             if timeout_seconds
             else None
         )
-        observed_grades = None
-
-        if target_only is False:
-            observed_grades = FULL_GRADES if full_grade else GRADES
         options = AnalysisOptions(
             run_observed=not target_only,
             string_only=strings_only,
-            observed_grades=observed_grades,
+            observed_grades=_observed_grades(payload),
+            window_measures=window_measures_for(_xml_bytes(payload)),
         )
 
+        started = time.monotonic()
         result = run_analysis_engine(
             score_path,
             target_grade,
@@ -136,43 +460,174 @@ def _run_job(job_id, payload):
             progress_cb=progress_cb,
             deadline=deadline,
         )
-        job["result"] = result
+        if payload.get("cost_features") and not result.get("timed_out"):
+            try:
+                JOB_STORE.record_timing(payload["cost_features"], time.monotonic() - started)
+            except Exception:
+                pass
     except Exception as exc:
-        job["error"] = str(exc)
+        error = str(exc)
     finally:
-        job["done"] = True
-        job["done_at"] = time.time()
-        q.put({"type": "done"})
+        stop_heartbeat.set()
+        MEMORY_BUDGET.release(projected)
+        if result is not None and not result.get("timed_out"):
+            # keyed by the rules version the job actually ran under
+            key = _result_cache_key(payload, result.get("rules_version") or rules_version())
+            if key is not None:
+                try:
+                    RESULT_CACHE.put(key, result)
+                except Exception:
+                    pass
+        try:
+            JOB_STORE.finish(job_id, result=result, error=error)
+        except Exception as exc:
+            JOB_STORE.finish(job_id, error=f"Could not store result: {exc}")
+
+
+def _stored_upload(path: str) -> None:
+    """Marks an upload as just used and keeps the store within its budget."""
+    UPLOAD_STORE.touch(path)
+    UPLOAD_STORE.trim()
+
+
+def _job_worker_loop(worker_name: str, max_priority: int | None = None):
+    while True:
+        try:
+            JOB_STORE.fail_stale(JOB_HEARTBEAT_TIMEOUT)
+            _sync_rules_version()
+            # a sweep of a score already being swept elsewhere waits for that
+            # process when it has a lane free for it
+            claimed = JOB_STORE.claim(
+                worker_name,
+                group=worker_name.rsplit(":", 1)[0],
+                max_priority=max_priority,
+                aging_seconds=JOB_AGING_SECONDS,
+                # jobs that would overrun the machine's memory budget stay queued
+                memory_limit=MEMORY_BUDGET.reservation_limit(),
+            )
+        except Exception:
+            claimed = None
+        if claimed is None:
+            time.sleep(JOB_POLL_SECONDS)
+            continue
+        job_id, payload = claimed
+        _run_job(job_id, payload)
+
+
+_WORKERS_STARTED_PID = None
+
+
+def start_job_workers(
+    count: int = ANALYSIS_WORKER_THREADS,
+    interactive: int = INTERACTIVE_WORKER_THREADS,
+    *,
+    prefix: str = "web",
+):
+    """Starts this process's analysis threads (once per process, so it is fork-safe)."""
+    global _WORKERS_STARTED_PID
+    if count <= 0 or _WORKERS_STARTED_PID == os.getpid():
+        return []
+    _WORKERS_STARTED_PID = os.getpid()
+    lanes = [(f"{index}", None) for index in range(count)]
+    lanes += [(f"i{index}", INTERACTIVE) for index in range(max(0, interactive))]
+    threads = []
+    for suffix, max_priority in lanes:
+        name = f"{prefix}:{os.getpid()}:{suffix}"
+        thread = threading.Thread(target=_job_worker_loop, args=(name, max_priority), daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
+
+
+def _job_event_stream(job_id, *, with_result, heartbeat_seconds, comment_codes=False, columnar=False):
+    """
+    SSE generator over a job's stored events. with_result=True (the
+    analyze_stream flow) also sends the result, then a final done event,
+    once the job has finished; otherwise the stream ends at the first done.
+    """
+    seq = 0
+    final_done = {"type": "done"}
+    last_heartbeat = time.time()
+    while True:
+        events = JOB_STORE.events_since(job_id, seq)
+        for seq, event in events:
+            if event.get("type") == "done":
+                if not with_result:
+                    yield f"data: {dumps_json(event)}\n\n"
+                    return
+                # the engine's done precedes the stored result; send it last
+                final_done = event
+                continue
+            yield f"data: {dumps_json(event)}\n\n"
+        if events:
+            last_heartbeat = time.time()
+            continue
+
+        job = JOB_STORE.get(job_id)
+        if job is None:
+            yield f"data: {dumps_json({'type': 'error', 'error': 'Unknown job'})}\n\n"
+            return
+        if job["done"]:
+            if JOB_STORE.events_since(job_id, seq):
+                continue
+            if with_result:
+                if job["error"]:
+                    yield f"data: {dumps_json({'type': 'error', 'error': job['error']})}\n\n"
+                else:
+                    yield from _result_event(JOB_STORE.result(job_id), comment_codes=comment_codes, columnar=columnar)
+            yield f"data: {dumps_json(final_done)}\n\n"
+            return
+
+        now = time.time()
+        if now - last_heartbeat >= heartbeat_seconds:
+            last_heartbeat = now
+            yield f"data: {dumps_json({'type': 'heartbeat'})}\n\n"
+        time.sleep(EVENT_POLL_SECONDS)
+
+
+def _result_event(result, *, comment_codes, columnar):
+    event = {"type": "result", "data": result_payload(result, comment_codes=comment_codes)}
+    yield "data: "
+    yield from iter_json(event, comment_codes=comment_codes, columnar=columnar)
+    yield "\n\n"
+
+
+def _cached_event_stream(result, *, comment_codes=False, columnar=False):
+    """Synthetic analyze_stream for a result cache hit: result, then done."""
+    yield f"data: {dumps_json({'type': 'cached'})}\n\n"
+    yield from _result_event(result, comment_codes=comment_codes, columnar=columnar)
+    yield f"data: {dumps_json({'type': 'done', 'cached': True})}\n\n"
 
 
 @app.post("/api/analyze")
 def analyze():
     _cleanup_jobs()
     payload = {}
+    if _upload_too_large():
+        return jsonify({"error": "Score too large"}), 413
     if request.content_type and request.content_type.startswith("multipart/form-data"):
         form = request.form
         uploaded = request.files.get("score_file")
         if uploaded:
             filename = secure_filename(uploaded.filename or "score.musicxml")
             ext = os.path.splitext(filename)[1] or ".musicxml"
-            data = uploaded.read()
-            if len(data) > MAX_UPLOAD_BYTES:
+            try:
+                save_path, digest, size = save_stream(
+                    uploaded.stream, UPLOAD_DIR, ext, max_bytes=MAX_UPLOAD_BYTES
+                )
+            except UploadTooLarge:
                 return jsonify({"error": "Score too large"}), 413
-            digest = hashlib.sha256(data).hexdigest()
-            file_id = f"{digest}{ext}"
-            save_path = os.path.join(UPLOAD_DIR, file_id)
-            if not os.path.exists(save_path):
-                with open(save_path, "wb") as f:
-                    f.write(data)
+            _stored_upload(save_path)
+            payload["digest"] = digest
             payload["score_path"] = save_path
-            payload["file_size"] = len(data)
+            payload["file_size"] = size
         payload["target_only"] = form.get("target_only") == "true"
         payload["strings_only"] = form.get("strings_only") == "true"
         payload["full_grade_analysis"] = form.get("full_grade_analysis") == "true"
         if form.get("target_grade"):
             payload["target_grade"] = float(form.get("target_grade"))
     else:
-        payload = request.get_json(force=True, silent=True) or {}
+        payload = _json_payload()
 
     if not payload.get("score_path") or "target_grade" not in payload:
         return jsonify({"error": "Missing score or target grade."}), 400
@@ -183,61 +638,175 @@ def analyze():
             payload["file_size"] = None
     if payload.get("file_size") and payload["file_size"] > MAX_UPLOAD_BYTES:
         return jsonify({"error": "Score too large"}), 413
+    payload["xml_bytes"] = score_xml_bytes(payload["score_path"])
+    if payload["xml_bytes"] and max_xml_bytes() and payload["xml_bytes"] > max_xml_bytes():
+        return jsonify({"error": "Score too large"}), 413
 
-    if MAX_QUEUE_SIZE and _active_job_count() >= MAX_QUEUE_SIZE:
-        return jsonify({"error": "Analysis queue full. Try again shortly."}), 429
+    cached = _cached_result(payload)
+    if cached is not None:
+        job_id = str(uuid.uuid4())
+        JOB_STORE.add_finished(job_id, payload, cached)
+        return jsonify({"job_id": job_id, "cached": True})
 
-    timeout_seconds = estimate_timeout(payload.get("file_size"))
-    payload["timeout_seconds"] = timeout_seconds
-
-    job_id = str(uuid.uuid4())
-    JOBS[job_id] = {
-        "queue": queue.Queue(),
-        "result": None,
-        "error": None,
-        "done": False,
-        "created_at": time.time(),
-        "done_at": None,
-    }
+    dedupe_key = _result_cache_key(payload, rules_version())
+    shared_id = JOB_STORE.find_active(dedupe_key) if dedupe_key else None
+    if shared_id:
+        return jsonify({"job_id": shared_id, "shared": True})
+
+    projected = estimate_job_memory(_xml_bytes(payload))
+    if not MEMORY_BUDGET.fits(projected):
+        return jsonify({"error": "Score too large for available memory"}), 413
+    payload["projected_memory"] = projected
+
+    rejected = _plan_job(payload)
+    if rejected:
+        return jsonify({"error": rejected[0]}), rejected[1]
+
+    if _over_capacity(payload):
+        return jsonify({"error": "Analysis queue full. Try again shortly."}), 429
 
-    thread = threading.Thread(target=_run_job, args=(job_id, payload), daemon=True)
-    thread.start()
+    job_id, shared = _enqueue_job(payload, dedupe_key)
 
-    return jsonify({"job_id": job_id})
+    return jsonify({"job_id": job_id, "shared": shared, "eta_seconds": payload.get("predicted_seconds")})
 
 
 @app.post("/api/analyze_stream")
 def analyze_stream():
     _cleanup_jobs()
     payload = {}
-    score_path = None
+    if _upload_too_large():
+        return jsonify({"error": "Score too large"}), 413
     if request.content_type and request.content_type.startswith("multipart/form-data"):
         form = request.form
         uploaded = request.files.get("score_file")
         if uploaded:
             filename = secure_filename(uploaded.filename or "score.musicxml")
             ext = os.path.splitext(filename)[1] or ".musicxml"
-            data = uploaded.read()
-            if len(data) > MAX_UPLOAD_BYTES:
+            try:
+                save_path, digest, size = save_stream(
+                    uploaded.stream, UPLOAD_DIR, ext, max_bytes=MAX_UPLOAD_BYTES
+                )
+            except UploadTooLarge:
                 return jsonify({"error": "Score too large"}), 413
-            digest = hashlib.sha256(data).hexdigest()
-            file_id = f"{digest}{ext}"
-            save_path = os.path.join(UPLOAD_DIR, file_id)
-            if not os.path.exists(save_path):
-                with open(save_path, "wb") as f:
-                    f.write(data)
+            _stored_upload(save_path)
+            payload["digest"] = digest
             payload["score_path"] = save_path
-            payload["file_size"] = len(data)
-            score_path = save_path
+            payload["file_size"] = size
         payload["target_only"] = form.get("target_only") == "true"
         payload["strings_only"] = form.get("strings_only") == "true"
         payload["full_grade_analysis"] = form.get("full_grade_analysis") == "true"
+        payload["comment_codes"] = form.get("comment_codes") == "true"
+        payload["payload_format"] = form.get("payload_format")
         if form.get("target_grade"):
             payload["target_grade"] = float(form.get("target_grade"))
     else:
-        payload = request.get_json(force=True, silent=True) or {}
-        score_path = payload.get("score_path")
+        payload = _json_payload()
+
+    return _analysis_stream(payload)
+
+
+@app.post("/api/analyze_by_digest")
+def analyze_by_digest():
+    """
+    Upload-skip handshake: the client sends the score's SHA-256 and the
+    analysis options as JSON. If this server already holds the file (or a
+    cached result for it) the analysis streams exactly like
+    /api/analyze_stream; otherwise 404 with upload_required and the client
+    falls back to the multipart upload.
+    """
+    _cleanup_jobs()
+    body = request.get_json(force=True, silent=True) or {}
+    digest = str(body.get("digest") or "").strip().lower()
+    if not _DIGEST_RE.fullmatch(digest):
+        return jsonify({"error": "Invalid digest."}), 400
+    if body.get("target_grade") is None:
+        return jsonify({"error": "Missing score or target grade."}), 400
+
+    payload = {
+        "digest": digest,
+        "target_grade": float(body["target_grade"]),
+        "target_only": parse_bool(body.get("target_only")),
+        "strings_only": parse_bool(body.get("strings_only")),
+        "full_grade_analysis": parse_bool(body.get("full_grade_analysis")),
+        "comment_codes": parse_bool(body.get("comment_codes")),
+        "payload_format": body.get("payload_format"),
+    }
+    score_path = UPLOAD_STORE.find(digest)
+    if score_path is None:
+        cached = _cached_result(payload)
+        if cached is None:
+            return jsonify({"error": "Upload required.", "upload_required": True}), 404
+        columnar = payload.get("payload_format") == "columnar"
+        return _cached_stream_response(
+            cached,
+            comment_codes=parse_bool(payload.get("comment_codes")) or columnar,
+            columnar=columnar,
+        )
+    payload["score_path"] = score_path
+    return _analysis_stream(payload)
+
+
+@app.post("/api/uploads")
+def create_upload():
+    """
+    Starts a resumable chunked upload. Chunks are PUT in order to
+    /api/uploads/<id>?offset=N; GET /api/uploads/<id> reports the offset
+    to resume from; POST /api/uploads/<id>/complete returns the digest to
+    start the analysis with via /api/analyze_by_digest.
+    """
+    body = request.get_json(force=True, silent=True) or {}
+    filename = secure_filename(body.get("filename") or "score.musicxml")
+    ext = os.path.splitext(filename)[1] or ".musicxml"
+    try:
+        size = int(body["size"]) if body.get("size") is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid size."}), 400
+    try:
+        upload_id = CHUNKED_UPLOADS.create(ext, size)
+    except UploadTooLarge:
+        return jsonify({"error": "Score too large"}), 413
+    return jsonify({"upload_id": upload_id, "offset": 0})
+
+
+@app.get("/api/uploads/<upload_id>")
+def upload_status(upload_id):
+    try:
+        offset = CHUNKED_UPLOADS.offset(upload_id)
+    except KeyError:
+        return jsonify({"error": "Unknown upload"}), 404
+    return jsonify({"upload_id": upload_id, "offset": offset})
+
+
+@app.put("/api/uploads/<upload_id>")
+def upload_chunk(upload_id):
+    try:
+        offset = int(request.args.get("offset", ""))
+    except ValueError:
+        return jsonify({"error": "Missing offset."}), 400
+    try:
+        new_offset = CHUNKED_UPLOADS.append(upload_id, offset, request.stream)
+    except KeyError:
+        return jsonify({"error": "Unknown upload"}), 404
+    except UploadOffsetMismatch as exc:
+        return jsonify({"error": "Offset mismatch", "offset": exc.offset}), 409
+    except UploadTooLarge:
+        return jsonify({"error": "Score too large"}), 413
+    return jsonify({"upload_id": upload_id, "offset": new_offset})
+
+
+@app.post("/api/uploads/<upload_id>/complete")
+def complete_upload(upload_id):
+    try:
+        path, digest, size = CHUNKED_UPLOADS.complete(upload_id)
+    except KeyError:
+        return jsonify({"error": "Unknown upload"}), 404
+    except UploadOffsetMismatch as exc:
+        return jsonify({"error": "Upload incomplete", "offset": exc.offset}), 409
+    _stored_upload(path)
+    return jsonify({"digest": digest, "size": size})
 
+
+def _analysis_stream(payload):
     if not payload.get("score_path") or "target_grade" not in payload:
         return jsonify({"error": "Missing score or target grade."}), 400
 
@@ -248,102 +817,80 @@ def analyze_stream():
             payload["file_size"] = None
     if payload.get("file_size") and payload["file_size"] > MAX_UPLOAD_BYTES:
         return jsonify({"error": "Score too large"}), 413
+    payload["xml_bytes"] = score_xml_bytes(payload["score_path"])
+    if payload["xml_bytes"] and max_xml_bytes() and payload["xml_bytes"] > max_xml_bytes():
+        return jsonify({"error": "Score too large"}), 413
 
-    timeout_seconds = estimate_timeout(payload.get("file_size"))
-    payload["timeout_seconds"] = timeout_seconds
-
-    target_only = parse_bool(payload.get("target_only"))
-    strings_only = parse_bool(payload.get("strings_only"))
-    full_grade = parse_bool(payload.get("full_grade_analysis"))
-    target_grade = float(payload.get("target_grade", 2))
-    observed_grades = None
-    if target_only is False:
-        observed_grades = FULL_GRADES if full_grade else GRADES
-    options = AnalysisOptions(
-        run_observed=not target_only,
-        string_only=strings_only,
-        observed_grades=observed_grades,
-    )
+    columnar = payload.get("payload_format") == "columnar"
+    # columnar payloads always use comment codes, so they need the templates
+    comment_codes = parse_bool(payload.get("comment_codes")) or columnar
 
-    q = queue.Queue()
+    cached = _cached_result(payload)
+    if cached is not None:
+        return _cached_stream_response(cached, comment_codes=comment_codes, columnar=columnar)
 
-    def progress_cb(event):
-        q.put(event)
+    # an identical request already in flight: subscribe to its events
+    dedupe_key = _result_cache_key(payload, rules_version())
+    job_id = JOB_STORE.find_active(dedupe_key) if dedupe_key else None
+    if job_id:
+        return _job_stream_response(job_id, comment_codes=comment_codes, columnar=columnar, shared=True)
 
-    def run():
-        try:
-            deadline = time.monotonic() + float(timeout_seconds)
-            result = run_analysis_engine(
-                payload["score_path"],
-                target_grade,
-                analysis_options=options,
-                progress_cb=progress_cb,
-                deadline=deadline,
-            )
-            q.put({"type": "result", "data": make_json_safe(result)})
-        except Exception as exc:
-            q.put({"type": "error", "error": str(exc)})
-        finally:
-            q.put({"type": "done"})
-            if score_path and os.path.exists(score_path):
-                try:
-                    os.remove(score_path)
-                except Exception:
-                    pass
+    projected = estimate_job_memory(_xml_bytes(payload))
+    if not MEMORY_BUDGET.fits(projected):
+        return jsonify({"error": "Score too large for available memory"}), 413
+    payload["projected_memory"] = projected
 
-    thread = threading.Thread(target=run, daemon=True)
-    thread.start()
+    rejected = _plan_job(payload)
+    if rejected:
+        return jsonify({"error": rejected[0]}), rejected[1]
 
-    def generate():
-        last_heartbeat = time.time()
-        while True:
-            try:
-                event = q.get(timeout=0.5)
-            except queue.Empty:
-                now = time.time()
-                if now - last_heartbeat >= 3:
-                    last_heartbeat = now
-                    yield f"data: {json.dumps({'type': 'heartbeat'})}\n\n"
-                continue
-            yield f"data: {json.dumps(make_json_safe(event))}\n\n"
-            last_heartbeat = time.time()
-            if event.get("type") == "done":
-                break
+    if _over_capacity(payload):
+        return jsonify({"error": "Analysis queue full. Try again shortly."}), 429
+
+    job_id, shared = _enqueue_job(payload, dedupe_key)
+    return _job_stream_response(job_id, comment_codes=comment_codes, columnar=columnar, shared=shared)
+
+
+def _cached_stream_response(result, *, comment_codes, columnar):
+    resp = _encoded_response(
+        _cached_event_stream(result, comment_codes=comment_codes, columnar=columnar),
+        mimetype="text/event-stream",
+    )
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    resp.headers["X-Result-Cache"] = "hit"
+    return resp
 
-    resp = Response(stream_with_context(generate()), mimetype="text/event-stream")
+
+def _job_stream_response(job_id, *, comment_codes, columnar, shared):
+    resp = _encoded_response(
+        _job_event_stream(
+            job_id,
+            with_result=True,
+            heartbeat_seconds=3,
+            comment_codes=comment_codes,
+            columnar=columnar,
+        ),
+        mimetype="text/event-stream",
+    )
     resp.headers["Cache-Control"] = "no-cache"
     resp.headers["X-Accel-Buffering"] = "no"
+    resp.headers["X-Job-Id"] = job_id
+    if shared:
+        resp.headers["X-Job-Shared"] = "1"
     return resp
 
 
 @app.get("/api/progress/<job_id>")
 def progress(job_id):
     _cleanup_jobs()
-    job = JOBS.get(job_id)
-    if not job:
+    if JOB_STORE.get(job_id) is None:
         return jsonify({"error": "Unknown job"}), 404
 
-    q = job["queue"]
-
-    def generate():
-        last_heartbeat = time.time()
-        while True:
-            try:
-                event = q.get(timeout=0.5)
-            except queue.Empty:
-                if job.get("done"):
-                    break
-                now = time.time()
-                if now - last_heartbeat >= 10:
-                    last_heartbeat = now
-                    yield f"data: {json.dumps({'type': 'heartbeat'})}\n\n"
-                continue
-            yield f"data: {json.dumps(event)}\n\n"
-            last_heartbeat = time.time()
-            if event.get("type") == "done":
-                break
-
-    resp = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    resp = Response(
+        stream_with_context(_job_event_stream(job_id, with_result=False, heartbeat_seconds=10)),
+        mimetype="text/event-stream",
+    )
     resp.headers["Cache-Control"] = "no-cache"
     resp.headers["X-Accel-Buffering"] = "no"
     return resp
@@ -352,20 +899,60 @@ def progress(job_id):
 @app.get("/api/result/<job_id>")
 def result(job_id):
     _cleanup_jobs()
-    job = JOBS.get(job_id)
+    job = JOB_STORE.get(job_id)
     if not job:
         return jsonify({"error": "Unknown job"}), 404
+    columnar = request.args.get("payload_format") == "columnar"
+    comment_codes = parse_bool(request.args.get("comment_codes")) or columnar
+    job_result = JOB_STORE.result(job_id) if job["done"] and not job["error"] else None
     payload = {
         "done": job["done"],
         "error": job["error"],
-        "result": job["result"],
+        "result": result_payload(job_result, comment_codes=comment_codes),
     }
-    return jsonify(make_json_safe(payload))
+    return _encoded_response(
+        iter_json(payload, comment_codes=comment_codes, columnar=columnar),
+        mimetype="application/json",
+    )
+
+
+@app.post("/api/admin/reload_rules")
+def admin_reload_rules():
+    token = os.environ.get("ADMIN_TOKEN")
+    if not token:
+        return jsonify({"error": "Not found"}), 404
+    supplied = request.headers.get("X-Admin-Token") or ""
+    if not hmac.compare_digest(supplied.encode("utf-8"), token.encode("utf-8")):
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        info = reload_rules()
+    except Exception as exc:
+        return jsonify({"error": f"Rule reload failed: {exc}"}), 500
+    # every other web and worker process picks this up before its next claim
+    JOB_STORE.publish_rules_version(info["version"])
+    return jsonify(info)
 
 
 @app.get("/healthz")
 def healthz():
-    return jsonify({"ok": True})
+    _sync_rules_version()
+    return jsonify(
+        {
+            "ok": True,
+            "rules_version": rules_version(),
+            "memory": {**MEMORY_BUDGET.snapshot(), "running_reserved": JOB_STORE.running_memory()},
+            "result_cache": RESULT_CACHE.snapshot(),
+            "uploads": UPLOAD_STORE.snapshot(),
+            "cost_model": COST_MODEL.as_dict(),
+            "queued_work_seconds": JOB_STORE.active_cost(),
+        }
+    )
+
+
+# the first process on a fresh store sets the shared rules version; later ones follow it
+JOB_STORE.publish_rules_version(rules_version(), replace=False)
+_sync_rules_version()
+start_job_workers()
 
 
 if __name__ == "__main__":
@@ -36,10 +36,188 @@ function deriveAvailabilityConfidence(availabilityNotes) {
   return Math.max(0, Math.min(1, avg));
 }
 
+// Filled from result.comment_templates when the server sends comment codes.
+let commentTemplates = {};
+
+function commentText(val) {
+  if (val && typeof val === "object" && typeof val.code === "string") {
+    const template = commentTemplates[val.code];
+    if (!template) return val.code;
+    const params = val.params || {};
+    return template.replace(/\{(\w+)\}/g, (match, name) => {
+      if (!(name in params)) return match;
+      return name === "grade" ? formatGrade(params[name]) : String(params[name] ?? "");
+    });
+  }
+  return String(val || "");
+}
+
+// Hex SHA-256 of a file for the upload-skip handshake, or null where
+// SubtleCrypto is unavailable (plain-http origins, old browsers).
+async function sha256Hex(file) {
+  if (!window.crypto?.subtle || !file?.arrayBuffer) return null;
+  try {
+    const hash = await window.crypto.subtle.digest("SHA-256", await file.arrayBuffer());
+    return Array.from(new Uint8Array(hash), (b) => b.toString(16).padStart(2, "0")).join("");
+  } catch (err) {
+    console.warn("Could not hash score file:", err);
+    return null;
+  }
+}
+
+// Compressed MusicXML (.mxl) is a zip container: find the root score through
+// META-INF/container.xml and inflate just that entry.
+async function readMxlText(file) {
+  const buf = await file.arrayBuffer();
+  const view = new DataView(buf);
+  let eocd = -1;
+  for (let i = buf.byteLength - 22; i >= Math.max(0, buf.byteLength - 65557); i -= 1) {
+    if (view.getUint32(i, true) === 0x06054b50) {
+      eocd = i;
+      break;
+    }
+  }
+  if (eocd < 0) throw new Error("Not a compressed MusicXML file.");
+  const decoder = new TextDecoder();
+  const entries = {};
+  let ptr = view.getUint32(eocd + 16, true);
+  for (let n = view.getUint16(eocd + 10, true); n > 0; n -= 1) {
+    if (view.getUint32(ptr, true) !== 0x02014b50) break;
+    const nameLen = view.getUint16(ptr + 28, true);
+    const name = decoder.decode(new Uint8Array(buf, ptr + 46, nameLen));
+    entries[name] = {
+      method: view.getUint16(ptr + 10, true),
+      size: view.getUint32(ptr + 20, true),
+      local: view.getUint32(ptr + 42, true),
+    };
+    ptr += 46 + nameLen + view.getUint16(ptr + 30, true) + view.getUint16(ptr + 32, true);
+  }
+  const read = async (name) => {
+    const entry = entries[name];
+    const start = entry.local + 30 + view.getUint16(entry.local + 26, true) + view.getUint16(entry.local + 28, true);
+    const data = new Blob([new Uint8Array(buf, start, entry.size)]);
+    if (entry.method === 0) return data.text();
+    return new Response(data.stream().pipeThrough(new DecompressionStream("deflate-raw"))).text();
+  };
+  let root = null;
+  if (entries["META-INF/container.xml"]) {
+    const match = (await read("META-INF/container.xml")).match(/full-path="([^"]+)"/);
+    if (match && entries[match[1]]) root = match[1];
+  }
+  root ||= Object.keys(entries).find(
+    (name) => !name.startsWith("META-INF/") && /\.(xml|musicxml)$/i.test(name),
+  );
+  if (!root) throw new Error("Compressed score has no MusicXML file.");
+  return read(root);
+}
+
+async function readScoreText(file) {
+  return /\.mxl$/i.test(file.name) ? readMxlText(file) : file.text();
+}
+
+const CHUNKED_UPLOAD_MIN_BYTES = 2 * 1024 * 1024;
+const UPLOAD_CHUNK_BYTES = 1024 * 1024;
+const UPLOAD_CHUNK_RETRIES = 5;
+
+// Sends a file through the resumable upload endpoints, one chunk at a time.
+// A failed chunk is retried from the offset the server reports, so a flaky
+// connection only costs the chunk in flight. Returns the server's digest.
+async function uploadInChunks(apiBase, file, onProgress) {
+  const start = await fetch(`${apiBase}/api/uploads`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ filename: file.name, size: file.size }),
+  });
+  if (!start.ok) throw new Error((await start.json().catch(() => ({}))).error || "Upload failed.");
+  const { upload_id: uploadId } = await start.json();
+
+  let offset = 0;
+  let failures = 0;
+  while (offset < file.size) {
+    const chunk = file.slice(offset, offset + UPLOAD_CHUNK_BYTES);
+    try {
+      const res = await fetch(`${apiBase}/api/uploads/${uploadId}?offset=${offset}`, {
+        method: "PUT",
+        headers: { "Content-Type": "application/octet-stream" },
+        body: chunk,
+      });
+      const data = await res.json().catch(() => ({}));
+      if (res.ok || res.status === 409) {
+        offset = data.offset;
+        failures = 0;
+        if (onProgress) onProgress(offset, file.size);
+        continue;
+      }
+      if (res.status < 500) throw new Error(data.error || "Upload failed.");
+    } catch (err) {
+      if (!(err instanceof TypeError)) throw err; // network errors are retried
+    }
+    failures += 1;
+    if (failures > UPLOAD_CHUNK_RETRIES) throw new Error("Upload interrupted.");
+    await new Promise((resolve) => setTimeout(resolve, 500 * failures));
+    const status = await fetch(`${apiBase}/api/uploads/${uploadId}`).catch(() => null);
+    if (status?.ok) offset = (await status.json()).offset;
+  }
+
+  const done = await fetch(`${apiBase}/api/uploads/${uploadId}/complete`, { method: "POST" });
+  if (!done.ok) throw new Error((await done.json().catch(() => ({}))).error || "Upload failed.");
+  return (await done.json()).digest;
+}
+
+// Expands a "columnar-v1" payload in place: note lists arrive column-wise
+// ({__notes__, cols, str_cols}) with strings and comment codes as indexes
+// into the top-level string_table.
+function decodeColumnarPayload(payload) {
+  if (!payload || payload.payload_format !== "columnar-v1") return payload;
+  const table = payload.string_table || [];
+
+  const decodeComments = (comments) => {
+    const out = {};
+    for (const [key, val] of Object.entries(comments)) {
+      out[key] = Array.isArray(val) ? { code: table[val[0]], params: val[1] || {} } : val;
+    }
+    return out;
+  };
+
+  const expandNotes = (block) => {
+    const count = block.__notes__;
+    const strCols = new Set(block.str_cols || []);
+    const notes = Array.from({ length: count }, () => ({}));
+    for (const [name, column] of Object.entries(block.cols || {})) {
+      const isString = strCols.has(name);
+      for (let i = 0; i < count; i += 1) {
+        let value = column[i];
+        if (value == null) continue;
+        if (name === "comments") value = decodeComments(value);
+        else if (isString) value = table[value];
+        notes[i][name] = value;
+      }
+    }
+    return notes;
+  };
+
+  const isBlock = (value) =>
+    value && typeof value === "object" && typeof value.__notes__ === "number";
+
+  const walk = (value) => {
+    if (!value || typeof value !== "object") return;
+    const entries = Array.isArray(value) ? value.entries() : Object.entries(value);
+    for (const [key, child] of entries) {
+      if (isBlock(child)) value[key] = expandNotes(child);
+      else walk(child);
+    }
+  };
+
+  walk(payload);
+  delete payload.payload_format;
+  delete payload.string_table;
+  return payload;
+}
+
 function extractCommentList(comments) {
   if (!comments || typeof comments !== "object") return [];
   return Object.values(comments)
-    .map((val) => String(val || "").trim())
+    .map((val) => commentText(val).trim())
     .filter((val) => val);
 }
 
@@ -57,12 +235,12 @@ function extractRangeCommentList(comments) {
     return text ? [text] : [];
   }
   if (Array.isArray(comments)) {
-    return comments.map((val) => String(val || "").trim()).filter((val) => val);
+    return comments.map((val) => commentText(val).trim()).filter((val) => val);
   }
   if (typeof comments === "object") {
     return Object.entries(comments)
       .filter(([key]) => RANGE_COMMENT_KEYS.has(String(key)))
-      .map(([, val]) => String(val || "").trim())
+      .map(([, val]) => commentText(val).trim())
       .filter((val) => val);
   }
   return [];
@@ -1992,15 +2170,17 @@ function initAnalysisRequest() {
       return;
     }
 
+    const options = {
+      target_only: Boolean(targetOnly?.checked),
+      strings_only: window._keyAnalysisMode === KEY_ANALYSIS_MODES.STRING,
+      full_grade_analysis: Boolean(fullGrade?.checked),
+      target_grade: Number(targetGrade?.value || 2),
+      comment_codes: true,
+      payload_format: "columnar",
+    };
     const form = new FormData();
     form.append("score_file", file);
-    form.append("target_only", String(Boolean(targetOnly?.checked)));
-    form.append(
-      "strings_only",
-      String(window._keyAnalysisMode === KEY_ANALYSIS_MODES.STRING),
-    );
-    form.append("full_grade_analysis", String(Boolean(fullGrade?.checked)));
-    form.append("target_grade", String(Number(targetGrade?.value || 2)));
+    Object.entries(options).forEach(([name, value]) => form.append(name, String(value)));
     window.analysisResult = null;
 
     ensureProgressBars();
@@ -2021,6 +2201,7 @@ function initAnalysisRequest() {
 
     const applyFinalResult = (result) => {
       window.analysisResult = result;
+      commentTemplates = result?.result?.comment_templates || {};
 
       bindBarHeadDetailPaneClicks();
       updatePartAnalyzerIssueTooltips(
@@ -2114,6 +2295,21 @@ function initAnalysisRequest() {
           if (durationBar) durationBar.style.width = "100%";
           if (durationPct) durationPct.textContent = "100%";
         }
+      } else if (data.type === "queued") {
+        if (progressText) {
+          progressText.textContent = "Waiting for server capacity...";
+        }
+      } else if (data.type === "eta") {
+        if (progressText && Number.isFinite(data.seconds)) {
+          const total = Math.max(1, Math.round(data.seconds));
+          const minutes = Math.floor(total / 60);
+          const seconds = total % 60;
+          progressText.textContent = `Estimated time: ${minutes ? `${minutes}m ` : ""}${seconds}s`;
+        }
+      } else if (data.type === "cached") {
+        if (progressText) {
+          progressText.textContent = "Loading previous analysis...";
+        }
       } else if (data.type === "timeout") {
         if (progressText) {
           progressText.textContent = "Timed out. Showing partial results.";
@@ -2145,13 +2341,42 @@ function initAnalysisRequest() {
     };
 
     try {
-      const res = await fetch(`${API_BASE}/api/analyze_stream`, {
-        method: "POST",
-        body: form,
-        headers: {
-          Accept: "text/event-stream",
-        },
-      });
+      // skip the upload when the server already has this exact file
+      const analyzeByDigest = async (digest) => {
+        const res = await fetch(`${API_BASE}/api/analyze_by_digest`, {
+          method: "POST",
+          body: JSON.stringify({ ...options, digest }),
+          headers: {
+            "Content-Type": "application/json",
+            Accept: "text/event-stream",
+          },
+        }).catch(() => null);
+        return res && res.status !== 404 ? res : null;
+      };
+      let res = null;
+      const digest = await sha256Hex(file);
+      if (digest) res = await analyzeByDigest(digest);
+      if (!res && file.size >= CHUNKED_UPLOAD_MIN_BYTES) {
+        // large scores go up in resumable chunks, then start by digest
+        const uploaded = await uploadInChunks(API_BASE, file, (sent, total) => {
+          if (progressText) {
+            progressText.textContent = `Uploading... ${Math.round((sent / total) * 100)}%`;
+          }
+        }).catch((err) => {
+          console.warn("Chunked upload failed, sending the file in one request:", err);
+          return null;
+        });
+        if (uploaded) res = await analyzeByDigest(uploaded);
+      }
+      if (!res) {
+        res = await fetch(`${API_BASE}/api/analyze_stream`, {
+          method: "POST",
+          body: form,
+          headers: {
+            Accept: "text/event-stream",
+          },
+        });
+      }
 
       if (!res.ok || !res.body) {
         const err = await res.json().catch(() => ({}));
@@ -2179,7 +2404,7 @@ function initAnalysisRequest() {
             const payload = line.slice(5).trim();
             if (!payload) continue;
             try {
-              const data = JSON.parse(payload);
+              const data = decodeColumnarPayload(JSON.parse(payload));
               handleEventWithResult(data);
             } catch (err) {
               console.warn("Failed to parse SSE payload:", payload, err);
@@ -2380,7 +2605,7 @@ async function initVerovio() {
     syncScoreActions();
 
     try {
-      const text = await file.text();
+      const text = await readScoreText(file);
       window.__lastScoreText = text;
       window._keyAnalysisDetected = detectStringInstruments(text);
       window._keyAnalysisHasStrings = window._keyAnalysisDetected.length > 0;
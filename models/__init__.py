@@ -3,11 +3,11 @@ from .articulation_grade_rules import ArticulationGradeRules
 from .duration_data import DurationData, DurationGradeBucket
 from .analysis_options import AnalysisOptions
 from .instrument_data import InstrumentData
-from .key_data import KeyData
-from .meter_data import MeterData
+from .key_data import KeyData, KeySegment
+from .meter_data import MeterData, MeterSegment
 from .partial_note_data import PartialNoteData
 from .rhythm_grade_rules import RhythmGradeRules
-from .tempo_data import TempoData
+from .tempo_data import TempoData, TempoSegment
 
 __all__ = [
     "ArticulationGradeRules",
@@ -17,8 +17,11 @@ __all__ = [
     "AnalysisOptions",
     "InstrumentData",
     "KeyData",
+    "KeySegment",
     "MeterData",
+    "MeterSegment",
     "PartialNoteData",
     "RhythmGradeRules",
     "TempoData",
+    "TempoSegment",
 ]
@@ -7,3 +7,5 @@ class AnalysisOptions:
     run_observed: bool = True
     string_only: bool = False
     observed_grades: Optional[Tuple[float, ...]] = (0.5, 1, 2, 3, 4, 5)
+    # measures per window for confidence-only passes; None keeps whole parts in memory
+    window_measures: Optional[int] = None
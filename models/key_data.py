@@ -11,3 +11,29 @@ class KeyData:
     exposure: float | None = None
     confidence: float | None = None
     comments: str | None = None
+    confidence_curve: dict | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class KeySegment:
+    """Grade-independent key signature segment as extracted from the score."""
+    measure: int
+    key: str
+    quality: str
+    pitch_index: int | None
+    duration: int | None = None
+    exposure: float | None = None
+
+    def materialize(self, grade: float, confidence: float, *, comments=None, curve=None) -> KeyData:
+        return KeyData(
+            measure=self.measure,
+            grade=grade,
+            key=self.key,
+            quality=self.quality,
+            pitch_index=self.pitch_index,
+            duration=self.duration,
+            exposure=self.exposure,
+            confidence=confidence,
+            comments=comments,
+            confidence_curve=curve,
+        )
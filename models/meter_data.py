@@ -11,4 +11,26 @@ class MeterData:
     exposure: int | None = None
     confidence: float | None = None
     comments: dict = field(default_factory=dict)
+    confidence_curve: dict | None = None
 
+
+@dataclass(frozen=True, slots=True)
+class MeterSegment:
+    """Grade-independent time signature segment."""
+    measure: int
+    time_signature: str
+    type: str
+    duration: int
+    exposure: float
+
+    def materialize(self, grade: float, confidence: float, *, curve=None) -> MeterData:
+        return MeterData(
+            measure=self.measure,
+            time_signature=self.time_signature,
+            grade=grade,
+            type=self.type,
+            duration=self.duration,
+            exposure=self.exposure,
+            confidence=confidence,
+            confidence_curve=curve,
+        )
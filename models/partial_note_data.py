@@ -1,6 +1,12 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass, fields
 
-@dataclass
+# Only present in the serialized note once the rhythm pass has set them.
+_OPTIONAL_OUTPUT_FIELDS = ("tuplet_class", "eighth_pair_ok", "eighth_pair_overflow")
+# Internal bookkeeping, never serialized.
+_INTERNAL_FIELDS = ("note_id",)
+
+
+@dataclass(slots=True)
 class PartialNoteData:
     # required
     measure: int
@@ -8,7 +14,11 @@ class PartialNoteData:
     grade: float
     instrument: str
 
-    comments: dict = field(default_factory=dict)
+    # allocated on first add_comment; most notes never get one
+    comments: dict | None = None
+
+    # stable id shared across analyzers (see utilities.note_table.stable_note_id)
+    note_id: tuple | None = None
 
     duration: float | None = None
     written_midi_value: int | None = None
@@ -17,6 +27,10 @@ class PartialNoteData:
     sounding_pitch: str | None = None
     brass_partial: int | None = None
 
+    # exact timing in integer ticks at the score's ticks-per-quarter
+    offset_ticks: int | None = None
+    duration_ticks: int | None = None
+
     # rhythm context
     beat_index: int | None = None
     beat_offset: float | None = None
@@ -33,6 +47,11 @@ class PartialNoteData:
     tuplet_actual: int | None = None
     tuplet_normal: int | None = None
     tuplet_index: int | None = None
+    tuplet_class: str | None = None
+
+    # eighth-note pairing (rhythm)
+    eighth_pair_ok: bool | None = None
+    eighth_pair_overflow: bool | None = None
 
     # derived
     rhythm_token: str | None = None
@@ -44,3 +63,29 @@ class PartialNoteData:
     range_exposure: float | None = None
     rhythm_confidence: float | None = None
     articulation_confidence: float | None = None
+
+    def add_comment(self, key: str, text) -> None:
+        if self.comments is None:
+            self.comments = {}
+        self.comments[key] = text
+
+    def update_comments(self, other: dict | None) -> None:
+        if other:
+            if self.comments is None:
+                self.comments = {}
+            self.comments.update(other)
+
+    def as_dict(self) -> dict:
+        """Serialized form, matching the old vars() output of the unslotted class."""
+        out = {}
+        for f in _FIELD_NAMES:
+            value = getattr(self, f)
+            if value is None and f in _OPTIONAL_OUTPUT_FIELDS:
+                continue
+            out[f] = value
+        if out["comments"] is None:
+            out["comments"] = {}
+        return out
+
+
+_FIELD_NAMES = tuple(f.name for f in fields(PartialNoteData) if f.name not in _INTERNAL_FIELDS)
@@ -12,3 +12,30 @@ class TempoData:
 
     confidence: float | None = None
     comments : str | None = None
+    confidence_curve: dict | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class TempoSegment:
+    """Grade-independent tempo segment; note is a fixed comment (e.g. default tempo)."""
+    bpm: int
+    quarter_bpm: int
+    beat_unit: str
+    measure: int
+    qtr_len: int
+    exposure: float
+    note: str | None = None
+
+    def materialize(self, grade: float, confidence: float, *, comments=None, curve=None) -> TempoData:
+        return TempoData(
+            bpm=self.bpm,
+            quarter_bpm=self.quarter_bpm,
+            beat_unit=self.beat_unit,
+            measure=self.measure,
+            qtr_len=self.qtr_len,
+            grade=grade,
+            exposure=self.exposure,
+            confidence=confidence,
+            comments=comments if comments is not None else self.note,
+            confidence_curve=curve,
+        )
@@ -1,13 +1,14 @@
 import math
 import threading
 import time
-import gc
+from contextlib import contextmanager, nullcontext
 from time import perf_counter
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import argparse
 import sys
+from dataclasses import replace
 
-from music21 import converter, stream
+from music21 import stream
 
 from analyzers.articulation.articulation import run_articulation
 from analyzers.rhythm import run_rhythm
@@ -18,13 +19,23 @@ from analyzers.tempo_duration import run_tempo_duration
 from analyzers.dynamics import run_dynamics
 from analyzers.scoring import run_scoring
 from models import AnalysisOptions
-from data_processing import build_instrument_data
-from utilities.note_reconciler import NoteReconciler
-from utilities import format_grade, parse_part_name, validate_part_for_availability
+from data_processing import (
+    bind_rules_version,
+    build_instrument_data,
+    on_rules_reload,
+    rules_version,
+    use_rules_version,
+)
+from utilities.gc_policy import install_gc_policy, maybe_collect, track_gc
+from utilities.memory import MemoryTracker
+from utilities.note_table import NoteTable
+from utilities import format_grade, load_score, parse_part_name, validate_part_for_availability
 from app_data import FULL_GRADES
 
 _OBSERVED_CACHE: dict[tuple, dict] = {}
 _CACHE_LOCK = threading.Lock()
+# (cache key, analyzer) -> [lock, holders + waiters]
+_OBSERVED_FLIGHTS: dict[tuple, list] = {}
 
 _OBSERVED_KEYS = {
     "availability": ["observed_grade", "confidences"],
@@ -111,8 +122,16 @@ def _classify_group(instrument_key: str, family: str | None) -> str | None:
     return None
 
 
-def _cache_key(score_path: str, analysis_options: AnalysisOptions) -> tuple:
-    return (score_path, bool(analysis_options.string_only))
+def _cache_key(score_path: str, analysis_options: AnalysisOptions, rules_ver: str) -> tuple:
+    return (score_path, bool(analysis_options.string_only), rules_ver)
+
+
+@on_rules_reload
+def _drop_stale_observed(version: str):
+    # observed curves computed under older guidelines can never be served again
+    with _CACHE_LOCK:
+        for key in [k for k in _OBSERVED_CACHE if k[-1] != version]:
+            _OBSERVED_CACHE.pop(key, None)
 
 
 def _get_cached_observed(cache_key: tuple, analyzer_name: str):
@@ -133,6 +152,29 @@ def _set_cached_observed(cache_key: tuple, analyzer_name: str, grades, result: d
         bucket[analyzer_name] = entry
 
 
+@contextmanager
+def _observed_flight(cache_key: tuple, analyzer_name: str):
+    """
+    Serializes concurrent jobs on the same score/analyzer so that only the
+    first runs the observed sweep; the others wait and then hit the cache
+    instead of repeating it (e.g. the same upload at different target grades).
+    """
+    key = (cache_key, analyzer_name)
+    with _CACHE_LOCK:
+        flight = _OBSERVED_FLIGHTS.get(key)
+        if flight is None:
+            flight = _OBSERVED_FLIGHTS[key] = [threading.Lock(), 0]
+        flight[1] += 1
+    try:
+        with flight[0]:
+            yield
+    finally:
+        with _CACHE_LOCK:
+            flight[1] -= 1
+            if flight[1] == 0:
+                _OBSERVED_FLIGHTS.pop(key, None)
+
+
 def _should_use_cached(entry, requested_grades):
     if not entry:
         return False
@@ -150,11 +192,38 @@ def run_analysis_engine(
     analysis_options: AnalysisOptions,
     progress_cb=None,
     deadline: float | None = None,
+):
+    # Pin the rule set for the whole job so a reload mid-run cannot mix guidelines.
+    with use_rules_version() as rules_ver, track_gc() as gc_stats:
+        result = _run_analysis_engine(
+            score_path,
+            target_grade,
+            analysis_options=analysis_options,
+            progress_cb=progress_cb,
+            deadline=deadline,
+            rules_ver=rules_ver,
+            gc_stats=gc_stats,
+        )
+    result["gc"] = gc_stats.as_dict()
+    return result
+
+
+def _run_analysis_engine(
+    score_path: str,
+    target_grade: float,
+    *,
+    analysis_options: AnalysisOptions,
+    progress_cb=None,
+    deadline: float | None = None,
+    rules_ver: str,
+    gc_stats=None,
 ):
     target_only = not analysis_options.run_observed
-    cache_key = _cache_key(score_path, analysis_options)
+    cache_key = _cache_key(score_path, analysis_options, rules_ver)
     requested_grades = analysis_options.observed_grades if analysis_options.run_observed else None
-    base_score = converter.parse(score_path)
+    memory = MemoryTracker()
+    base_score = load_score(score_path)
+    memory.mark("parse")
     parts = list(base_score.parts)
     instrument_data = build_instrument_data()
     part_order = []
@@ -183,7 +252,12 @@ def run_analysis_engine(
         len(list(parts[0].getElementsByClass(stream.Measure))) if parts else 0
     )
     skip_scoring = len(parts) <= 1
-    score_factory = lambda: base_score
+    # analyzers reach the score only through the holder so it can be dropped
+    # as soon as the last analyzer is done with it
+    score_holder = {"score": base_score}
+    base_score = parts = part = None
+    score_factory = lambda: score_holder["score"]
+    memory.mark("extract")
 
     analyzers = [
         ("key_range", run_key_range, True),
@@ -200,6 +274,20 @@ def run_analysis_engine(
     note_analyzers = [a for a in analyzers if a[2]]
     other_analyzers = [a for a in analyzers if not a[2]]
 
+    # analyzers that still need the score; the last one to finish (or be
+    # skipped) drops it while the rest of the job carries on
+    score_users = [len(analyzers)]
+    score_users_lock = threading.Lock()
+
+    def release_score(count=1):
+        with score_users_lock:
+            score_users[0] -= count
+            if score_users[0] > 0 or not score_holder:
+                return
+            score_holder.clear()
+        # the tree is full of reference cycles: only a collection frees it
+        maybe_collect(gc_stats, force=True)
+
     def emit(event):
         if progress_cb is not None:
             progress_cb(event)
@@ -232,26 +320,57 @@ def run_analysis_engine(
     def _deadline_exceeded():
         return deadline is not None and time.monotonic() > deadline
 
-    def collect_partial_notes(result, name, reconciler: NoteReconciler):
+    def run_analyzer(name, fn, note_table=None):
+        # note analyzers write their columns into the shared table themselves
+        extra = {"note_table": note_table} if note_table is not None else {}
+        try:
+            return _run_analyzer(name, fn, extra)
+        finally:
+            release_score()
+
+    def _run_analyzer(name, fn, extra):
+        flight = _observed_flight(cache_key, name) if not target_only else nullcontext()
+        with flight:
+            cache_entry = _get_cached_observed(cache_key, name) if not target_only else None
+            use_cache = (not target_only) and _should_use_cached(cache_entry, requested_grades)
+            options_for_analyzer = replace(
+                analysis_options,
+                run_observed=analysis_options.run_observed and not use_cache,
+            )
+            result = bind_rules_version(fn, rules_ver)(
+                score_path,
+                target_grade,
+                score=score_factory(),
+                score_factory=score_factory,
+                progress_cb=None if target_only or use_cache else progress_bar(name),
+                analysis_options=options_for_analyzer,
+                **extra,
+            )
+            if use_cache and cache_entry:
+                result.update(cache_entry.get("data") or {})
+            elif not target_only and options_for_analyzer.run_observed:
+                _set_cached_observed(cache_key, name, requested_grades, result)
+        return result
+
+    def use_merged_notes(result, name, note_table: NoteTable):
+        # every analyzer's note lists serialize the merged table rows
         analysis = result.get("analysis_notes") if result else None
         if not analysis:
             return
         if name == "articulation":
-            for pdata in analysis.values():
-                for note in pdata.get("articulation_data", []):
-                    reconciler.add(note)
+            parts, field = analysis.values(), "articulation_data"
         elif name == "rhythm":
-            for pdata in analysis.values():
-                for note in pdata.get("note_data", []):
-                    reconciler.add(note)
+            parts, field = analysis.values(), "note_data"
         elif name == "key_range":
-            range_data = analysis.get("range_data", {})
-            for pdata in range_data.values():
-                for note in pdata.get("Note Data", []):
-                    reconciler.add(note)
+            parts, field = (analysis.get("range_data") or {}).values(), "Note Data"
+        else:
+            return
+        for pdata in parts:
+            if pdata.get(field):
+                pdata[field] = note_table.merged_notes(pdata[field])
 
     results = {}
-    reconciler = NoteReconciler()
+    note_table = NoteTable()
     step = 0
     timed_out = False
 
@@ -259,7 +378,6 @@ def run_analysis_engine(
     with ThreadPoolExecutor(max_workers=4) as executor:
         futures = {}
         future_to_name = {}
-        analyzer_metadata = {}  # Store cache info for later retrieval
         
         for name, fn, _ in note_analyzers:
             if _deadline_exceeded():
@@ -267,31 +385,12 @@ def run_analysis_engine(
                 emit({"type": "timeout", "analyzer": name})
                 break
             
-            cache_entry = _get_cached_observed(cache_key, name) if not target_only else None
-            use_cache = (not target_only) and _should_use_cached(cache_entry, requested_grades)
-            options_for_analyzer = AnalysisOptions(
-                run_observed=analysis_options.run_observed and not use_cache,
-                string_only=analysis_options.string_only,
-                observed_grades=analysis_options.observed_grades,
-            )
-            
-            # Submit to thread pool (non-blocking)
-            future = executor.submit(
-                fn,
-                score_path,
-                target_grade,
-                score=score_factory(),
-                score_factory=score_factory,
-                progress_cb=None if target_only or use_cache else progress_bar(name),
-                analysis_options=options_for_analyzer,
-            )
+            # Submit to thread pool (non-blocking); cache lookups happen in
+            # the worker, after any concurrent job on this score has filled it
+            future = executor.submit(run_analyzer, name, fn, note_table)
             futures[name] = future
             future_to_name[future] = name
-            analyzer_metadata[name] = {
-                "use_cache": use_cache,
-                "cache_entry": cache_entry,
-                "options_for_analyzer": options_for_analyzer,
-            }
+        release_score(len(note_analyzers) - len(futures))
         
         # Collect results as they complete
         for future in as_completed(futures.values()):
@@ -303,28 +402,22 @@ def run_analysis_engine(
             step += 1
             try:
                 results[name] = future.result()
-                metadata = analyzer_metadata[name]
-
-                if metadata["use_cache"] and metadata["cache_entry"]:
-                    results[name].update(metadata["cache_entry"].get("data") or {})
-                elif not target_only and metadata["options_for_analyzer"].run_observed:
-                    _set_cached_observed(cache_key, name, requested_grades, results[name])
-
-                collect_partial_notes(results[name], name, reconciler)
                 analyzer_progress(step, name)
-                gc.collect()
+                memory.mark(name)
             except Exception as exc:
                 emit({"type": "error", "analyzer": name, "error": str(exc)})
                 timed_out = True
                 break
 
-    results["reconciled_notes"] = reconciler._notes
+    for name, _, _ in note_analyzers:
+        use_merged_notes(results.get(name), name, note_table)
+    results["reconciled_notes"] = note_table.view()
+    maybe_collect(gc_stats)
 
     # RUN OTHER ANALYZERS IN PARALLEL (tempo_duration, dynamics, availability, scoring, meter)
     with ThreadPoolExecutor(max_workers=4) as executor:
         futures = {}
         future_to_name = {}
-        analyzer_metadata = {}
         
         for name, fn, _ in other_analyzers:
             if _deadline_exceeded():
@@ -332,31 +425,12 @@ def run_analysis_engine(
                 emit({"type": "timeout", "analyzer": name})
                 break
             
-            cache_entry = _get_cached_observed(cache_key, name) if not target_only else None
-            use_cache = (not target_only) and _should_use_cached(cache_entry, requested_grades)
-            options_for_analyzer = AnalysisOptions(
-                run_observed=analysis_options.run_observed and not use_cache,
-                string_only=analysis_options.string_only,
-                observed_grades=analysis_options.observed_grades,
-            )
-            
-            # Submit to thread pool (non-blocking)
-            future = executor.submit(
-                fn,
-                score_path,
-                target_grade,
-                score=score_factory(),
-                score_factory=score_factory,
-                progress_cb=None if target_only or use_cache else progress_bar(name),
-                analysis_options=options_for_analyzer,
-            )
+            # Submit to thread pool (non-blocking); cache lookups happen in
+            # the worker, after any concurrent job on this score has filled it
+            future = executor.submit(run_analyzer, name, fn)
             futures[name] = future
             future_to_name[future] = name
-            analyzer_metadata[name] = {
-                "use_cache": use_cache,
-                "cache_entry": cache_entry,
-                "options_for_analyzer": options_for_analyzer,
-            }
+        release_score(len(other_analyzers) - len(futures))
         
         # Collect results as they complete
         for future in as_completed(futures.values()):
@@ -368,20 +442,16 @@ def run_analysis_engine(
             step += 1
             try:
                 results[name] = future.result()
-                metadata = analyzer_metadata[name]
-
-                if metadata["use_cache"] and metadata["cache_entry"]:
-                    results[name].update(metadata["cache_entry"].get("data") or {})
-                elif not target_only and metadata["options_for_analyzer"].run_observed:
-                    _set_cached_observed(cache_key, name, requested_grades, results[name])
-
                 analyzer_progress(step, name)
-                gc.collect()
+                memory.mark(name)
             except Exception as exc:
                 emit({"type": "error", "analyzer": name, "error": str(exc)})
                 timed_out = True
                 break
 
+    # the last analyzer to finish has already dropped and collected the music21 tree
+    memory.mark("release_score")
+
     if skip_scoring:
         results["scoring"] = {
             "analysis_notes": {
@@ -394,7 +464,7 @@ def run_analysis_engine(
         emit({"type": "done", "timeout": True})
     else:
         emit({"type": "done"})
-    return build_final_result(
+    final_result = build_final_result(
         results,
         target_only,
         total_measures,
@@ -403,7 +473,11 @@ def run_analysis_engine(
         part_families=part_families,
         part_groups=part_groups,
         timed_out=timed_out,
+        rules_ver=rules_ver,
     )
+    memory.mark("final_result")
+    final_result["memory"] = memory.as_dict()
+    return final_result
 
 
 def build_final_result(
@@ -415,6 +489,7 @@ def build_final_result(
     part_families: dict[str, str] | None = None,
     part_groups: dict[str, str | None] | None = None,
     timed_out: bool = False,
+    rules_ver: str | None = None,
 ):
     def clamp_conf(value):
         if value is None:
@@ -707,6 +782,7 @@ def build_final_result(
         "part_families": part_families or {},
         "part_groups": part_groups or {},
         "timed_out": timed_out,
+        "rules_version": rules_ver,
     }
 
 if __name__ == "__main__":
@@ -733,7 +809,14 @@ if __name__ == "__main__":
         action="store_true",
         help="Include fractional grades (0.5 steps) in observed-grade analysis.",
     )
+    parser.add_argument(
+        "--window-measures",
+        type=int,
+        default=None,
+        help="Process observed-grade passes in windows of this many measures to bound memory.",
+    )
     args = parser.parse_args()
+    install_gc_policy(warmup=rules_version)
 
     target_grade = 2
 
@@ -796,6 +879,7 @@ if __name__ == "__main__":
         run_observed=not args.target_only,
         string_only=args.strings_only,
         observed_grades=observed_grades,
+        window_measures=args.window_measures,
     )
     def cli_progress(event):
         if event.get("type") == "observed":
@@ -1,6 +1,9 @@
 from .confidence import confidence_curve, traffic_light
-from .measure_lines import extract_measure_lines, iter_measure_events, iter_measure_lines
-from .note_reconciler import NoteReconciler
+from .context_index import PartContextIndex, ScoreContextIndex, context_index
+from .measure_lines import extract_measure_lines, iter_measure_events, iter_measure_lines, iter_measure_windows
+from .note_table import ANALYZER_COLUMNS, NoteTable, NoteTableView, stable_note_id
+from .score_loader import ScoreTooLarge, is_compressed_score, load_score, read_score_xml, score_xml_bytes
+from .timebase import ticks_per_quarter, to_ticks
 from .string_parsing import (
     format_grade,
     get_closest_grade,
@@ -10,14 +13,29 @@ from .string_parsing import (
     validate_part_for_availability,
     validate_part_for_range_analysis,
 )
+from .comments import COMMENT_TEMPLATES, Comment, comment, render_comment
 
 __all__ = [
     "confidence_curve",
     "traffic_light",
+    "PartContextIndex",
+    "ScoreContextIndex",
+    "context_index",
     "extract_measure_lines",
     "iter_measure_events",
     "iter_measure_lines",
-    "NoteReconciler",
+    "iter_measure_windows",
+    "ANALYZER_COLUMNS",
+    "NoteTable",
+    "NoteTableView",
+    "stable_note_id",
+    "ScoreTooLarge",
+    "is_compressed_score",
+    "load_score",
+    "read_score_xml",
+    "score_xml_bytes",
+    "ticks_per_quarter",
+    "to_ticks",
     "format_grade",
     "get_closest_grade",
     "get_rounded_grade",
@@ -25,4 +43,8 @@ __all__ = [
     "parse_part_name",
     "validate_part_for_availability",
     "validate_part_for_range_analysis",
+    "COMMENT_TEMPLATES",
+    "Comment",
+    "comment",
+    "render_comment",
 ]
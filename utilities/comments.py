@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from .string_parsing import format_grade
+
+# code -> message template. "grade" params are passed through format_grade on render.
+COMMENT_TEMPLATES: dict[str, str] = {
+    # key / range
+    "range.extended": "{pitch} in extended range for grade {grade}",
+    "range.out": "{pitch} out of range for grade {grade}",
+    "range.out_altogether": "{pitch} out of range altogether for {instrument}",
+    "range.penalized": "{pitch} penalized for grade {grade}",
+    "range.flagged": "{pitch} flagged for grade {grade}",
+    "harmonic.non_diatonic": "Non-diatonic note {pitch} in {quality} key for grade {grade}",
+    "brass.partial_jump": "partial jump detected from {previous} to {current}",
+    "clarinet.break_allowed": "Clarinet break crossed (allowed for grade {grade}/{instrument})",
+    "clarinet.break": "Clarinet break crossed (not allowed for grade {grade})",
+    # rhythm
+    "rhythm.dotted": "dotted rhythms not common for grade {grade}",
+    "rhythm.syncopation": "syncopation not common for grade {grade}",
+    "rhythm.unknown_value": "unknown rhythm value {token}",
+    "rhythm.sixty_fourth": "64th notes or smaller not common for grade {grade}",
+    "rhythm.eighth_run": "consecutive eighth notes not common for grade {grade}",
+    "rhythm.subdivision": "subdivisions smaller than a {max_label} note not common for grade {grade}",
+    "rhythm.tuplets": "Tuplets not common for given grade",
+    "rhythm.tuplet_class": "{tuplet_class} tuplets not common for grade {grade}",
+    # articulation
+    "articulation.multiple": "Multiple articulations per note are not common for grade {grade}",
+    "articulation.single": "{articulation}s are not common for grade {grade}",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class Comment:
+    """
+    Comment stored as a template code plus parameters; the text is only
+    built when the result is serialized (or by the client in code mode).
+    """
+    code: str
+    params: dict = field(default_factory=dict)
+
+    def render(self) -> str:
+        template = COMMENT_TEMPLATES.get(self.code)
+        if template is None:
+            return self.code
+        params = dict(self.params)
+        if "grade" in params:
+            params["grade"] = format_grade(params["grade"])
+        return template.format(**params)
+
+    def as_code(self) -> dict:
+        return {"code": self.code, "params": dict(self.params)}
+
+    def __str__(self) -> str:
+        return self.render()
+
+
+def comment(code: str, **params) -> Comment:
+    return Comment(code, params)
+
+
+def render_comment(value):
+    """Text for a Comment; anything else (legacy strings) passes through."""
+    if isinstance(value, Comment):
+        return value.render()
+    return value
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import threading
+import weakref
+from bisect import bisect_right
+
+from music21 import stream
+
+_CONTEXT_CLASSES = ("TimeSignature", "KeySignature", "Instrument")
+
+_INDEX_CACHE: dict[int, tuple[object, "ScoreContextIndex"]] = {}
+_INDEX_LOCK = threading.Lock()
+
+
+class _OffsetTable:
+    """Elements sorted by offset in their part; lookup is the last one at or before."""
+
+    def __init__(self, entries: list[tuple[float, object]]):
+        entries = sorted(entries, key=lambda e: e[0])
+        self.offsets = [offset for offset, _ in entries]
+        self.values = [value for _, value in entries]
+
+    def at(self, offset: float):
+        i = bisect_right(self.offsets, offset) - 1
+        return self.values[i] if i >= 0 else None
+
+    def items(self):
+        return list(zip(self.offsets, self.values))
+
+
+class PartContextIndex:
+    """
+    Time signatures, key signatures, instruments and measure numbers of one
+    part, indexed by offset in the part. Replaces per-element
+    getContextByClass calls, which walk the context tree every time.
+    """
+
+    def __init__(self, part):
+        found = {name: [] for name in _CONTEXT_CLASSES}
+        measures = []
+
+        def _add(el, offset):
+            for name in _CONTEXT_CLASSES:
+                if name in el.classes:
+                    found[name].append((offset, el))
+                    break
+
+        for el in part.getElementsByClass(_CONTEXT_CLASSES):
+            _add(el, float(el.offset))
+        for m in part.getElementsByClass(stream.Measure):
+            m_offset = float(m.offset)
+            measures.append((m_offset, m.number))
+            for el in m.getElementsByClass(_CONTEXT_CLASSES):
+                _add(el, m_offset + float(el.offset))
+
+        self.time_signatures = _OffsetTable(found["TimeSignature"])
+        self.key_signatures = _OffsetTable(found["KeySignature"])
+        self.instruments = _OffsetTable(found["Instrument"])
+        self.measures = _OffsetTable(measures)
+
+    def time_signature_at(self, offset: float):
+        """
+        The signature in effect at offset, including one placed in the
+        measure starting there. Measure.getContextByClass(TimeSignature),
+        used before, returned the previous measure's signature: measure 1
+        fell back to the 4/4 default and a meter change was reported one
+        measure late.
+        """
+        return self.time_signatures.at(offset)
+
+    def key_signature_at(self, offset: float):
+        return self.key_signatures.at(offset)
+
+    def instrument_at(self, offset: float):
+        return self.instruments.at(offset)
+
+    def transposition_at(self, offset: float):
+        """Written -> sounding interval of the instrument in effect, or None."""
+        inst = self.instruments.at(offset)
+        return inst.transposition if inst is not None else None
+
+    def measure_number_at(self, offset: float):
+        return self.measures.at(offset)
+
+
+class ScoreContextIndex:
+    def __init__(self, score):
+        self.parts = [PartContextIndex(part) for part in score.parts]
+
+    def __getitem__(self, part_index: int) -> PartContextIndex:
+        return self.parts[part_index]
+
+    def __len__(self) -> int:
+        return len(self.parts)
+
+
+def context_index(score) -> ScoreContextIndex:
+    """Per-score memoized ScoreContextIndex (built once, shared by analyzers)."""
+    key = id(score)
+    with _INDEX_LOCK:
+        cached = _INDEX_CACHE.get(key)
+    if cached is not None:
+        ref, index = cached
+        if ref() is score:
+            return index
+
+    index = ScoreContextIndex(score)
+    try:
+        ref = weakref.ref(score, lambda _r, k=key: _INDEX_CACHE.pop(k, None))
+    except TypeError:
+        return index
+    with _INDEX_LOCK:
+        _INDEX_CACHE[key] = (ref, index)
+    return index
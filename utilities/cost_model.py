@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+
+from .score_scan import ScoreStats
+
+FEATURE_NAMES = ("base", "xml_mb", "note_passes", "measure_passes", "chord_passes")
+# seconds per unit of each feature before any timings have been recorded
+DEFAULT_COEFFICIENTS = (2.0, 4.0, 1.5, 0.5, 1.0)
+
+
+def cost_features(stats: ScoreStats, *, passes: int) -> list[float]:
+    """
+    Work drivers of one job. Parsing scales with the XML size; every grade
+    pass walks every note and measure again, and chords cost extra in the
+    range and scoring analyzers.
+    """
+    passes = max(1, passes)
+    return [
+        1.0,
+        stats.xml_bytes / 1e6,
+        stats.notes * passes / 1e4,
+        stats.measures * passes / 1e3,
+        stats.chord_notes * passes / 1e4,
+    ]
+
+
+class CostModel:
+    """
+    Linear runtime model over cost_features, refitted from recorded job
+    timings by least squares. The fit is ridge-regularized toward the
+    current prior, so a handful of samples nudges it instead of
+    overfitting, and coefficients are kept non-negative.
+    """
+
+    def __init__(self, *, prior=DEFAULT_COEFFICIENTS, min_samples: int = 5, ridge: float = 1.0):
+        self.prior = np.asarray(prior, dtype=float)
+        self.min_samples = min_samples
+        self.ridge = ridge
+        self._coef = self.prior.copy()
+        self._samples = 0
+        self._lock = threading.Lock()
+
+    def predict(self, features) -> float:
+        with self._lock:
+            coef = self._coef
+        return max(1.0, float(np.dot(coef, np.asarray(features, dtype=float))))
+
+    def fit(self, samples) -> bool:
+        """samples: (features, seconds) pairs. Returns whether the model changed."""
+        samples = [(f, s) for f, s in samples if len(f) == len(self.prior) and s and s > 0]
+        if len(samples) < self.min_samples:
+            return False
+        X = np.asarray([f for f, _ in samples], dtype=float)
+        y = np.asarray([s for _, s in samples], dtype=float)
+        # ridge toward the prior: minimize |X b - y|^2 + ridge * |b - prior|^2
+        k = len(self.prior)
+        A = np.vstack([X, np.sqrt(self.ridge) * np.eye(k)])
+        b = np.concatenate([y, np.sqrt(self.ridge) * self.prior])
+        coef, *_ = np.linalg.lstsq(A, b, rcond=None)
+        coef = np.clip(coef, 0.0, None)
+        with self._lock:
+            self._coef = coef
+            self._samples = len(samples)
+        return True
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            coef = self._coef.tolist()
+            samples = self._samples
+        return {
+            "coefficients": dict(zip(FEATURE_NAMES, (round(c, 4) for c in coef))),
+            "samples": samples,
+        }
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import gc
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .memory import current_rss_bytes
+
+# Analysis allocates millions of short-lived music21/PartialNoteData objects;
+# a larger gen-0 threshold keeps young collections from firing constantly and
+# the older generations are only worth scanning rarely.
+DEFAULT_THRESHOLDS = (50_000, 20, 20)
+# RSS growth since the last policy collection that justifies a full collect
+DEFAULT_GROWTH_BUDGET = 150_000_000
+
+_LOCK = threading.Lock()
+_ACTIVE_JOBS: set["GcStats"] = set()
+_STARTED: dict[int, float] = {}
+_LAST_COLLECT_RSS: int | None = None
+_INSTALLED = False
+
+
+class GcStats:
+    """
+    GC pauses seen while a job was running. Collections stop every thread,
+    so each pause is charged to all jobs active at the time.
+    """
+
+    def __init__(self):
+        self.pause_seconds = 0.0
+        self.collections = [0, 0, 0]
+        self.policy_collections = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "pause_ms": round(self.pause_seconds * 1000, 2),
+            "collections": {f"gen{i}": n for i, n in enumerate(self.collections)},
+            "policy_collections": self.policy_collections,
+        }
+
+
+def _gc_callback(phase: str, info: dict) -> None:
+    key = threading.get_ident()
+    if phase == "start":
+        _STARTED[key] = time.perf_counter()
+        return
+    started = _STARTED.pop(key, None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    generation = info.get("generation", 0)
+    with _LOCK:
+        for stats in _ACTIVE_JOBS:
+            stats.pause_seconds += elapsed
+            if 0 <= generation < len(stats.collections):
+                stats.collections[generation] += 1
+
+
+def _env_thresholds():
+    raw = os.environ.get("GC_THRESHOLDS")
+    if not raw:
+        return DEFAULT_THRESHOLDS
+    try:
+        values = tuple(int(x) for x in raw.split(","))
+    except ValueError:
+        return DEFAULT_THRESHOLDS
+    return values if len(values) == 3 else DEFAULT_THRESHOLDS
+
+
+def growth_budget() -> int:
+    try:
+        return int(os.environ.get("GC_GROWTH_BUDGET", DEFAULT_GROWTH_BUDGET))
+    except ValueError:
+        return DEFAULT_GROWTH_BUDGET
+
+
+def install_gc_policy(*, warmup=None, thresholds=None) -> None:
+    """
+    Runs warmup (rule loading, imports), then moves everything alive into
+    the permanent generation with gc.freeze() so later collections never
+    rescan it, and applies analysis-friendly thresholds. Call once at
+    startup, before any job runs: anything alive at freeze time is never
+    collected.
+    """
+    global _INSTALLED, _LAST_COLLECT_RSS
+    with _LOCK:
+        if _INSTALLED:
+            return
+        _INSTALLED = True
+    if warmup is not None:
+        warmup()
+    gc.collect()
+    if hasattr(gc, "freeze"):
+        gc.freeze()
+    gc.set_threshold(*(thresholds or _env_thresholds()))
+    if _gc_callback not in gc.callbacks:
+        gc.callbacks.append(_gc_callback)
+    _LAST_COLLECT_RSS = current_rss_bytes()
+
+
+def maybe_collect(
+    stats: GcStats | None = None,
+    *,
+    budget: int | None = None,
+    force: bool = False,
+) -> bool:
+    """
+    Full collection only when RSS grew more than the budget since the last
+    one; cheap to call at every phase boundary. force=True collects
+    regardless, for when a large cyclic structure (a music21 score) was
+    just dropped and would otherwise live until the next threshold.
+    """
+    global _LAST_COLLECT_RSS
+    rss = current_rss_bytes()
+    if rss is None and not force:
+        return False
+    budget = growth_budget() if budget is None else budget
+    with _LOCK:
+        baseline = _LAST_COLLECT_RSS
+        if not force and baseline is not None and rss - baseline < budget:
+            return False
+        _LAST_COLLECT_RSS = rss
+    gc.collect()
+    after = current_rss_bytes()
+    with _LOCK:
+        # the allocator rarely hands pages back, so measure growth from here
+        _LAST_COLLECT_RSS = after if after is not None else rss
+    if stats is not None:
+        stats.policy_collections += 1
+    return True
+
+
+@contextmanager
+def track_gc():
+    """Collects GcStats for the duration of a job."""
+    if _gc_callback not in gc.callbacks:
+        gc.callbacks.append(_gc_callback)
+    stats = GcStats()
+    with _LOCK:
+        _ACTIVE_JOBS.add(stats)
+    try:
+        yield stats
+    finally:
+        with _LOCK:
+            _ACTIVE_JOBS.discard(stats)
@@ -1,4 +1,9 @@
+from functools import lru_cache
+
+import numpy as np
+
 HARMONIC_SERIES = [48, 60, 67, 72, 76, 79, 82, 84, 86, 88, 90, 91]
+MIDI_VALUES = 128
 
 def get_brass_partials(instrument: str) :
     semitones = 0
@@ -13,6 +18,21 @@ def get_brass_partials(instrument: str) :
     return {i: (partial - semitones) for i, partial in enumerate(HARMONIC_SERIES)}
 
 
+@lru_cache(maxsize=None)
+def get_brass_partial_lookup(instrument: str) -> np.ndarray:
+    """
+    MIDI value -> 1-based partial number of the closest harmonic.
+    Ties go to the lower partial, matching min() over get_brass_partials().
+    """
+    partials = get_brass_partials(instrument)
+    lookup = np.empty(MIDI_VALUES, dtype=np.int16)
+    for midi in range(MIDI_VALUES):
+        closest = min(partials.items(), key=lambda kv: abs(kv[1] - midi))
+        lookup[midi] = int(closest[0]) + 1
+    lookup.flags.writeable = False
+    return lookup
+
+
 def clarinet_break_allowed(grade, part_name):
     if "Clarinet" in part_name:
         if grade < 2.0:
@@ -22,4 +42,4 @@ def clarinet_break_allowed(grade, part_name):
     return None
 
 def crosses_break(written_note):
-    return written_note in {"Bb4", "B4"}
\ No newline at end of file
+    return written_note in {"Bb4", "B4"}
@@ -0,0 +1,430 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .json_stream import decode_result, encode_result
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result BLOB,
+    error TEXT,
+    worker TEXT,
+    dedupe_key TEXT,
+    digest TEXT,
+    cost REAL,
+    priority INTEGER NOT NULL DEFAULT 1,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    done_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state_created ON jobs (state, created_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, seq);
+CREATE TABLE IF NOT EXISTS lanes (
+    name TEXT PRIMARY KEY,
+    grp TEXT NOT NULL,
+    max_priority INTEGER,
+    seen_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_timings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    features TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe_key, state);
+CREATE INDEX IF NOT EXISTS jobs_digest ON jobs (digest, state);
+CREATE INDEX IF NOT EXISTS jobs_sweep ON jobs (sweep, state);
+CREATE INDEX IF NOT EXISTS jobs_worker ON jobs (worker, state);
+"""
+# columns added after the first release; databases created before get them on open
+_ADDED_COLUMNS = (
+    ("dedupe_key", "TEXT"),
+    ("digest", "TEXT"),
+    ("cost", "REAL"),
+    ("priority", "INTEGER NOT NULL DEFAULT 1"),
+    ("sweep", "TEXT"),
+    ("memory", "INTEGER"),
+)
+
+# priority classes: lower runs first
+INTERACTIVE = 0
+STANDARD = 1
+BATCH = 2
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "error"
+
+
+class JobStore:
+    """
+    Job state, progress events and results in a local SQLite database (WAL
+    mode), shared by every process on the machine: any gunicorn worker can
+    enqueue a job, any worker thread or process can claim it, and any
+    worker can serve its progress and result.
+
+    Results are stored as zlib-compressed tagged JSON (encode_result), so
+    they can be re-encoded in whatever payload format the requesting
+    client asks for; nothing read from the database is ever unpickled.
+    """
+
+    def __init__(self, path: str, *, busy_timeout: float = 30.0):
+        self.path = path
+        self._busy_timeout = busy_timeout
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for name, kind in _ADDED_COLUMNS:
+            if name not in existing:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+        conn.executescript(_INDEXES)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self._busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # -- submission / claiming ---------------------------------------------
+
+    def enqueue(
+        self,
+        job_id: str,
+        payload: dict,
+        *,
+        dedupe_key: str | None = None,
+        digest: str | None = None,
+        sweep: str | None = None,
+        cost: float | None = None,
+        memory: int | None = None,
+        priority: int = STANDARD,
+        first_event: dict | None = None,
+    ) -> tuple[str, bool]:
+        """
+        Queues a job and returns (job_id, False). When a queued or running
+        job already has the same dedupe_key, nothing is queued and that
+        job's id is returned as (existing_id, True): subscribers share its
+        events and result. sweep identifies the observed-grade sweep the
+        job runs (None for target-only jobs); jobs with the same sweep
+        can reuse each other's in-memory observed results when they run
+        in one process. cost is the predicted runtime in seconds and
+        memory the projected peak RSS in bytes;
+        first_event is stored in the same transaction so it precedes
+        anything a worker emits.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if dedupe_key is not None:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE dedupe_key = ? AND state IN (?, ?)"
+                    " ORDER BY created_at LIMIT 1",
+                    (dedupe_key, QUEUED, RUNNING),
+                ).fetchone()
+                if row is not None:
+                    conn.execute("COMMIT")
+                    return row[0], True
+            conn.execute(
+                "INSERT INTO jobs"
+                " (id, state, payload, dedupe_key, digest, sweep, cost, memory, priority, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    QUEUED,
+                    json.dumps(payload),
+                    dedupe_key,
+                    digest,
+                    sweep,
+                    cost,
+                    memory,
+                    priority,
+                    time.time(),
+                ),
+            )
+            if first_event is not None:
+                conn.execute(
+                    "INSERT INTO job_events (job_id, data) VALUES (?, ?)",
+                    (job_id, json.dumps(first_event, default=str)),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return job_id, False
+
+    def add_finished(self, job_id: str, payload: dict, result) -> None:
+        """Records a job that never needed a worker (e.g. served from the result cache)."""
+        now = time.time()
+        blob = encode_result(result)
+        self._conn().execute(
+            "INSERT INTO jobs (id, state, payload, result, created_at, started_at, done_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, DONE, json.dumps(payload), blob, now, now, now),
+        )
+
+    def claim(
+        self,
+        worker: str,
+        *,
+        group: str | None = None,
+        max_priority: int | None = None,
+        aging_seconds: float = 60.0,
+        lane_timeout: float = 10.0,
+        memory_limit: int | None = None,
+    ) -> tuple[str, dict] | None:
+        """
+        Atomically takes the next queued job, or None if there is none.
+
+        Jobs run in order of created_at + priority * aging_seconds: a
+        lower class is served first, but every queued second counts, so a
+        batch job (class 2) waiting 2 * aging_seconds is ahead of any new
+        interactive one and is never starved. max_priority restricts a
+        worker to the faster classes (a lane kept free for them).
+
+        Every call records the worker as an idle lane of its group (the
+        worker's process). A job whose observed sweep is already running in
+        another process is left for that process, where it reuses the
+        in-memory observed-grade results instead of redoing them, but only
+        while that process has an idle lane (seen in the last lane_timeout
+        seconds) that takes the job's class; otherwise any worker runs it.
+
+        With a memory_limit, a job is only taken while its projected memory
+        plus that of every running job (in any process) stays within it;
+        jobs that don't fit stay queued. With nothing running, any job is
+        taken: the submitter already checked it fits on its own.
+        """
+        now = time.time()
+        clauses = ["state = ?"]
+        params: list = [QUEUED]
+        if max_priority is not None:
+            clauses.append("priority <= ?")
+            params.append(max_priority)
+        if group is not None:
+            clauses.append(
+                "(sweep IS NULL OR NOT EXISTS ("
+                " SELECT 1 FROM jobs AS r"
+                " JOIN lanes AS owner ON owner.name = r.worker"
+                " JOIN lanes AS l ON l.grp = owner.grp"
+                " WHERE r.sweep = j.sweep AND r.state = ? AND owner.grp != ?"
+                " AND l.seen_at > ? AND (l.max_priority IS NULL OR l.max_priority >= j.priority)"
+                " AND NOT EXISTS (SELECT 1 FROM jobs AS b WHERE b.worker = l.name AND b.state = ?)))"
+            )
+            params.extend([RUNNING, group, now - lane_timeout, RUNNING])
+        if memory_limit is not None:
+            clauses.append(
+                "(COALESCE(memory, 0) <= ? - (SELECT COALESCE(SUM(memory), 0) FROM jobs WHERE state = ?)"
+                " OR NOT EXISTS (SELECT 1 FROM jobs WHERE state = ?))"
+            )
+            params.extend([memory_limit, RUNNING, RUNNING])
+        params.append(aging_seconds)
+        query = (
+            "SELECT id, payload FROM jobs AS j WHERE "
+            + " AND ".join(clauses)
+            + " ORDER BY created_at + priority * ?, created_at LIMIT 1"
+        )
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO lanes (name, grp, max_priority, seen_at) VALUES (?, ?, ?, ?)",
+                (worker, group if group is not None else worker, max_priority, now),
+            )
+            row = conn.execute(query, params).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET state = ?, worker = ?, started_at = ?, heartbeat_at = ? WHERE id = ?",
+                (RUNNING, worker, now, now, row[0]),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return row[0], json.loads(row[1])
+
+    def heartbeat(self, job_id: str) -> None:
+        self._conn().execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def finish(self, job_id: str, *, result=None, error: str | None = None) -> None:
+        blob = None
+        if result is not None:
+            blob = encode_result(result)
+        self._conn().execute(
+            "UPDATE jobs SET state = ?, result = ?, error = ?, done_at = ? WHERE id = ?",
+            (FAILED if error else DONE, blob, error, time.time(), job_id),
+        )
+
+    # -- progress events ------------------------------------------------------
+
+    def add_event(self, job_id: str, event: dict) -> None:
+        self._conn().execute(
+            "INSERT INTO job_events (job_id, data) VALUES (?, ?)",
+            (job_id, json.dumps(event, default=str)),
+        )
+
+    def events_since(self, job_id: str, after_seq: int = 0) -> list[tuple[int, dict]]:
+        rows = self._conn().execute(
+            "SELECT seq, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+            (job_id, after_seq),
+        ).fetchall()
+        return [(seq, json.loads(data)) for seq, data in rows]
+
+    # -- reads --------------------------------------------------------------
+
+    def get(self, job_id: str) -> dict | None:
+        row = self._conn().execute(
+            "SELECT state, error, created_at, started_at, done_at FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        state, error, created_at, started_at, done_at = row
+        return {
+            "state": state,
+            "done": state in (DONE, FAILED),
+            "error": error,
+            "created_at": created_at,
+            "started_at": started_at,
+            "done_at": done_at,
+        }
+
+    def result(self, job_id: str):
+        row = self._conn().execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        try:
+            return decode_result(row[0])
+        except ValueError:
+            # written by an older release (or not by us at all)
+            return None
+
+    def find_active(self, dedupe_key: str) -> str | None:
+        row = self._conn().execute(
+            "SELECT id FROM jobs WHERE dedupe_key = ? AND state IN (?, ?) ORDER BY created_at LIMIT 1",
+            (dedupe_key, QUEUED, RUNNING),
+        ).fetchone()
+        return row[0] if row else None
+
+    def digest_in_use(self, digest: str, *, exclude: str | None = None) -> bool:
+        """Whether another queued or running job still needs this upload."""
+        row = self._conn().execute(
+            "SELECT 1 FROM jobs WHERE digest = ? AND state IN (?, ?) AND id != ? LIMIT 1",
+            (digest, QUEUED, RUNNING, exclude or ""),
+        ).fetchone()
+        return row is not None
+
+    def active_cost(self, *, max_priority: int | None = None) -> float:
+        """Predicted seconds of work queued or running (jobs without a prediction count as 0)."""
+        query = "SELECT COALESCE(SUM(cost), 0) FROM jobs WHERE state IN (?, ?)"
+        params: list = [QUEUED, RUNNING]
+        if max_priority is not None:
+            query += " AND priority <= ?"
+            params.append(max_priority)
+        row = self._conn().execute(query, params).fetchone()
+        return float(row[0])
+
+    # -- runtime samples for the cost model ------------------------------------
+
+    def record_timing(self, features: list[float], seconds: float, *, keep: int = 2000) -> None:
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO job_timings (features, seconds, created_at) VALUES (?, ?, ?)",
+            (json.dumps(features), seconds, time.time()),
+        )
+        conn.execute(
+            "DELETE FROM job_timings WHERE id <= (SELECT MAX(id) FROM job_timings) - ?", (keep,)
+        )
+
+    def timings(self, limit: int = 500) -> list[tuple[list[float], float]]:
+        rows = self._conn().execute(
+            "SELECT features, seconds FROM job_timings ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [(json.loads(features), seconds) for features, seconds in rows]
+
+    def running_memory(self) -> int:
+        """Projected memory reserved by running jobs across every process."""
+        row = self._conn().execute(
+            "SELECT COALESCE(SUM(memory), 0) FROM jobs WHERE state = ?", (RUNNING,)
+        ).fetchone()
+        return int(row[0])
+
+    def active_count(self) -> int:
+        row = self._conn().execute(
+            "SELECT COUNT(*) FROM jobs WHERE state IN (?, ?)", (QUEUED, RUNNING)
+        ).fetchone()
+        return int(row[0])
+
+    # -- shared settings --------------------------------------------------------
+
+    def rules_version(self) -> str | None:
+        """Rules version every process sharing this store should run jobs under."""
+        row = self._conn().execute("SELECT value FROM settings WHERE key = 'rules_version'").fetchone()
+        return row[0] if row else None
+
+    def publish_rules_version(self, version: str, *, replace: bool = True) -> str:
+        """Sets the shared rules version (only if none is set yet unless replace); returns it."""
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        conn = self._conn()
+        conn.execute(f"{verb} INTO settings (key, value) VALUES ('rules_version', ?)", (version,))
+        return self.rules_version() or version
+
+    # -- housekeeping ---------------------------------------------------------
+
+    def fail_stale(self, heartbeat_timeout: float) -> int:
+        """Marks running jobs whose worker stopped heartbeating (crashed process) as failed."""
+        now = time.time()
+        cur = self._conn().execute(
+            "UPDATE jobs SET state = ?, error = ?, done_at = ? WHERE state = ? AND heartbeat_at < ?",
+            (FAILED, "Analysis worker stopped unexpectedly.", now, RUNNING, now - heartbeat_timeout),
+        )
+        return cur.rowcount
+
+    def cleanup(self, ttl_seconds: float) -> int:
+        cutoff = time.time() - ttl_seconds
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = [
+                r[0]
+                for r in conn.execute(
+                    "SELECT id FROM jobs WHERE done_at IS NOT NULL AND done_at < ?", (cutoff,)
+                )
+            ]
+            for job_id in expired:
+                conn.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            # lanes of processes that stopped polling
+            conn.execute("DELETE FROM lanes WHERE seen_at < ?", (cutoff,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(expired)
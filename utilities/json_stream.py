@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import json
+import math
+import zlib
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import fields
+from json.encoder import encode_basestring_ascii
+from numbers import Integral, Real
+
+from models import DurationData, KeyData, MeterData, PartialNoteData, TempoData
+
+from .comments import COMMENT_TEMPLATES, Comment
+
+CHUNK_SIZE = 64 * 1024
+
+# payload_format values accepted from clients
+PAYLOAD_FORMATS = ("objects", "columnar")
+COLUMNAR_FORMAT = "columnar-v1"
+
+# Result records serialized straight from their slots/attributes; None
+# fields are left out. Entries are (field name, pre-encoded '"name":').
+_RECORD_FIELDS: dict[type, tuple[tuple[str, str], ...]] = {
+    cls: tuple(
+        (f.name, encode_basestring_ascii(f.name) + ":")
+        for f in fields(cls)
+        if f.name not in exclude
+    )
+    for cls, exclude in (
+        (PartialNoteData, ("note_id",)),
+        (KeyData, ()),
+        (TempoData, ()),
+        (MeterData, ()),
+        (DurationData, ()),
+    )
+}
+_NOTE_FIELDS = tuple(name for name, _ in _RECORD_FIELDS[PartialNoteData])
+
+
+def _float(value: float) -> str:
+    # same spelling as json.dumps (allow_nan=True)
+    if value != value:
+        return "NaN"
+    if math.isinf(value):
+        return "Infinity" if value > 0 else "-Infinity"
+    return float.__repr__(float(value))
+
+
+def _key(key) -> str:
+    return encode_basestring_ascii(key if isinstance(key, str) else str(key))
+
+
+class _JsonWriter:
+    """
+    Generator-based encoder. In columnar mode every list of PartialNoteData
+    becomes a column block and strings in it are indexes into one string
+    table written at the end of the top-level object.
+    """
+
+    def __init__(self, *, comment_codes: bool, columnar: bool):
+        self.columnar = columnar
+        # columnar payloads always carry comment codes; templates ship separately
+        self.comment_codes = comment_codes or columnar
+        self.strings: dict[str, int] = {}
+
+    def intern(self, text: str) -> int:
+        index = self.strings.get(text)
+        if index is None:
+            index = self.strings[text] = len(self.strings)
+        return index
+
+    def top(self, value) -> Iterator[str]:
+        if not self.columnar or not isinstance(value, Mapping):
+            yield from self.value(value)
+            return
+        yield '{"payload_format":' + encode_basestring_ascii(COLUMNAR_FORMAT)
+        for key, val in value.items():
+            yield "," + _key(key) + ":"
+            yield from self.value(val)
+        # only complete once everything above has been encoded
+        yield ',"string_table":'
+        yield from self.value(list(self.strings))
+        yield "}"
+
+    def value(self, value) -> Iterator[str]:
+        if isinstance(value, str):
+            yield encode_basestring_ascii(value)
+        elif value is None:
+            yield "null"
+        elif value is True:
+            yield "true"
+        elif value is False:
+            yield "false"
+        elif isinstance(value, Integral):
+            yield str(int(value))
+        elif isinstance(value, Real):
+            yield _float(value)
+        elif type(value) in _RECORD_FIELDS:
+            yield from self.record(value, _RECORD_FIELDS[type(value)])
+        elif isinstance(value, Mapping):
+            yield from self.mapping(value.items())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            if self.columnar and _is_note_list(value):
+                yield from self.note_columns(value)
+                return
+            yield "["
+            first = True
+            for item in value:
+                if not first:
+                    yield ","
+                first = False
+                yield from self.value(item)
+            yield "]"
+        elif isinstance(value, Comment):
+            if self.comment_codes:
+                yield from self.value(value.as_code())
+            else:
+                yield encode_basestring_ascii(value.render())
+        elif hasattr(value, "tolist"):
+            # numpy scalars and arrays
+            yield from self.value(value.tolist())
+        elif hasattr(value, "as_dict"):
+            yield from self.value(value.as_dict())
+        elif hasattr(value, "__dict__"):
+            yield from self.mapping(vars(value).items())
+        else:
+            yield encode_basestring_ascii(str(value))
+
+    def mapping(self, items) -> Iterator[str]:
+        yield "{"
+        first = True
+        for key, val in items:
+            yield _key(key) + ":" if first else "," + _key(key) + ":"
+            first = False
+            yield from self.value(val)
+        yield "}"
+
+    def record(self, record, record_fields) -> Iterator[str]:
+        yield "{"
+        first = True
+        for name, encoded_key in record_fields:
+            val = getattr(record, name)
+            if val is None:
+                continue
+            yield encoded_key if first else "," + encoded_key
+            first = False
+            yield from self.value(val)
+        yield "}"
+
+    def note_columns(self, notes) -> Iterator[str]:
+        """
+        {"__notes__": n, "cols": {field: [...]}, "str_cols": [...]}.
+        All-None columns are dropped; string columns hold string table
+        indexes; comments are {key: [code index, params]} (or legacy text).
+        """
+        notes = list(notes)
+        yield '{"__notes__":' + str(len(notes)) + ',"cols":{'
+        str_cols = []
+        first = True
+        for name in _NOTE_FIELDS:
+            column = [getattr(n, name) for n in notes]
+            if all(v is None for v in column):
+                continue
+            if name == "comments":
+                column = [self._note_comments(c) for c in column]
+            elif any(isinstance(v, str) for v in column):
+                str_cols.append(name)
+                column = [self.intern(v) if isinstance(v, str) else v for v in column]
+            yield ("" if first else ",") + _key(name) + ":"
+            first = False
+            yield from self.value(column)
+        yield '},"str_cols":'
+        yield from self.value(str_cols)
+        yield "}"
+
+    def _note_comments(self, comments):
+        if not comments:
+            return None
+        out = {}
+        for key, val in comments.items():
+            if isinstance(val, Comment):
+                out[key] = [self.intern(val.code), val.params]
+            else:
+                out[key] = val
+        return out
+
+
+class _StorageWriter(_JsonWriter):
+    """
+    Lossless variant for stored results: notes and comments are tagged so
+    decode_result can rebuild them, and the stored result can later be
+    encoded in whichever payload format a client asks for.
+    """
+
+    def __init__(self):
+        super().__init__(comment_codes=True, columnar=False)
+
+    def value(self, value) -> Iterator[str]:
+        if type(value) is PartialNoteData:
+            yield '{"__note__":'
+            yield from self.mapping((name, getattr(value, name)) for name in _NOTE_FIELDS)
+            yield "}"
+        elif isinstance(value, Comment):
+            yield '{"__comment__":'
+            yield from self.value([value.code, value.params])
+            yield "}"
+        else:
+            yield from super().value(value)
+
+
+def _restore_tagged(obj: dict):
+    if len(obj) == 1:
+        if "__note__" in obj:
+            return PartialNoteData(**obj["__note__"])
+        if "__comment__" in obj:
+            code, params = obj["__comment__"]
+            return Comment(code, params)
+    return obj
+
+
+def encode_result(result) -> bytes:
+    """zlib-compressed JSON of a result, for the job store and the result cache."""
+    compressor = zlib.compressobj(6)
+    parts = [compressor.compress(piece.encode("utf-8")) for piece in _StorageWriter().top(result)]
+    parts.append(compressor.flush())
+    return b"".join(parts)
+
+
+def decode_result(blob: bytes):
+    """Inverse of encode_result. Raises ValueError for anything it did not write."""
+    try:
+        text = zlib.decompress(blob).decode("utf-8")
+    except (zlib.error, UnicodeDecodeError) as exc:
+        raise ValueError("Not an encoded result") from exc
+    try:
+        return json.loads(text, object_hook=_restore_tagged)
+    except TypeError as exc:
+        raise ValueError("Result does not match the current note schema") from exc
+
+
+def _is_note_list(value) -> bool:
+    if not value or not isinstance(value, (list, tuple)):
+        return False
+    return all(type(item) is PartialNoteData for item in value)
+
+
+def iter_json(
+    value,
+    *,
+    comment_codes: bool = False,
+    columnar: bool = False,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[str]:
+    """
+    Encodes a result as JSON in chunks of roughly chunk_size characters,
+    without first building a JSON-safe copy of it. Dataclass records use
+    precomputed field lists and omit None fields; comments are rendered,
+    or left as {"code", "params"} with comment_codes=True. columnar=True
+    switches note lists to the column block format (see _JsonWriter).
+    """
+    writer = _JsonWriter(comment_codes=comment_codes, columnar=columnar)
+    buffer: list[str] = []
+    size = 0
+    for piece in writer.top(value):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(buffer)
+            buffer.clear()
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def dumps_json(value, *, comment_codes: bool = False, columnar: bool = False) -> str:
+    return "".join(iter_json(value, comment_codes=comment_codes, columnar=columnar))
+
+
+def result_payload(result, *, comment_codes: bool = False):
+    """Analysis result as sent to clients; code mode ships the comment templates alongside."""
+    if comment_codes and isinstance(result, dict):
+        return {**result, "comment_templates": COMMENT_TEMPLATES}
+    return result
+
+
+def gzip_chunks(chunks: Iterable[str], *, level: int = 6) -> Iterator[bytes]:
+    """
+    gzip-compresses a chunk stream, sync-flushing after every chunk so
+    streamed (SSE) responses still reach the client as they are produced.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
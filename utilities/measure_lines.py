@@ -4,13 +4,15 @@ from music21 import stream
 
 
 class _ChordNoteProxy:
-    def __init__(self, chord, pitch):
+    def __init__(self, chord, pitch, measure_number=None):
         self._chord = chord
         self.pitch = pitch
         self.duration = chord.duration
         self.quarterLength = chord.quarterLength
         self.offset = chord.offset
-        self.measureNumber = getattr(chord, "measureNumber", None)
+        self.measureNumber = measure_number
+        if self.measureNumber is None:
+            self.measureNumber = getattr(chord, "measureNumber", None)
         if self.measureNumber is None:
             measure = chord.getContextByClass(stream.Measure)
             self.measureNumber = measure.number if measure is not None else None
@@ -71,7 +73,7 @@ def iter_measure_events(
         for event in events:
             if expand_chords and getattr(event, "isChord", False):
                 for pitch in getattr(event, "pitches", []):
-                    yield _ChordNoteProxy(event, pitch)
+                    yield _ChordNoteProxy(event, pitch, measure.number)
                 continue
             yield event
 
@@ -80,3 +82,22 @@ def iter_measure_lines(measure: stream.Measure, *, include_rests: bool = True):
     _, lines = extract_measure_lines(measure, include_rests=include_rests)
     for index, events in enumerate(lines):
         yield index, events
+
+
+def iter_measure_windows(part, window_measures: int | None = None):
+    """
+    Yields lists of consecutive measures of a part. window_measures=None
+    yields the whole part as a single window (even when it has no measures).
+    """
+    measures = part.getElementsByClass(stream.Measure)
+    if not window_measures or window_measures <= 0:
+        yield list(measures)
+        return
+    window = []
+    for m in measures:
+        window.append(m)
+        if len(window) >= window_measures:
+            yield window
+            window = []
+    if window:
+        yield window
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_bytes() -> int | None:
+    """Resident set size of this process, or None where it can't be read."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is not None:
+        # ru_maxrss is the peak (KiB on Linux, bytes on macOS); best we have
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    return None
+
+
+class MemoryTracker:
+    """
+    Process RSS at named phase boundaries of one job (parse, extract, each
+    analyzer, final result). Concurrent jobs share the process, so deltas
+    are indicative rather than exact.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._start_rss = current_rss_bytes()
+        self.phases: list[dict] = []
+
+    def mark(self, phase: str) -> int | None:
+        rss = current_rss_bytes()
+        with self._lock:
+            previous = self.phases[-1]["rss"] if self.phases else self._start_rss
+            self.phases.append(
+                {
+                    "phase": phase,
+                    "rss": rss,
+                    "delta": rss - previous if rss is not None and previous is not None else None,
+                    "elapsed": round(time.monotonic() - self._started, 3),
+                }
+            )
+        return rss
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            phases = list(self.phases)
+        known = [p["rss"] for p in phases if p["rss"] is not None]
+        return {
+            "start_rss": self._start_rss,
+            "peak_rss": max(known) if known else None,
+            "phases": phases,
+        }
+
+
+class MemoryBudget:
+    """
+    This process's side of admission against a machine-wide RSS budget.
+    Jobs are admitted by the shared job store, which sums the projected
+    footprint of every running job; this class tells it how much room
+    there is as seen from here and tracks the reservations of the jobs
+    running in this process.
+    """
+
+    def __init__(self, budget_bytes: int, *, baseline_bytes: int | None = None):
+        self.budget_bytes = budget_bytes
+        self.baseline_bytes = baseline_bytes if baseline_bytes is not None else (current_rss_bytes() or 0)
+        self._reserved = 0
+        self._lock = threading.Lock()
+
+    @property
+    def reserved(self) -> int:
+        return self._reserved
+
+    def fits(self, nbytes: int) -> bool:
+        """Whether a job of this size could ever be admitted."""
+        return not self.budget_bytes or self.baseline_bytes + nbytes <= self.budget_bytes
+
+    def reservation_limit(self) -> int | None:
+        """
+        What the running jobs' reservations may total machine-wide, as seen
+        from this process: the budget less its baseline and any RSS it
+        holds beyond its own reservations (the allocator rarely hands
+        pages back). None when the budget is disabled.
+        """
+        if not self.budget_bytes:
+            return None
+        with self._lock:
+            reserved = self._reserved
+        committed = max(self.baseline_bytes + reserved, current_rss_bytes() or 0)
+        return self.budget_bytes - committed + reserved
+
+    def hold(self, nbytes: int) -> None:
+        """Records the reservation of a job the job store admitted to this process."""
+        with self._lock:
+            self._reserved += nbytes
+
+    def release(self, nbytes: int) -> None:
+        with self._lock:
+            self._reserved = max(0, self._reserved - nbytes)
+
+    def snapshot(self) -> dict:
+        return {
+            "budget": self.budget_bytes,
+            "baseline": self.baseline_bytes,
+            "reserved": self._reserved,
+            "rss": current_rss_bytes(),
+        }
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterable, Mapping
+from dataclasses import replace
+
+from models import PartialNoteData
+
+# Columns each note analyzer owns in the shared table. Identity/timing fields
+# come from whichever analyzer first inserts the note.
+ANALYZER_COLUMNS: dict[str, tuple[str, ...]] = {
+    "articulation": ("articulation_confidence",),
+    "rhythm": (
+        "beat_index",
+        "beat_offset",
+        "time_signature",
+        "beat_unit",
+        "chord_index",
+        "voice_index",
+        "is_chord",
+        "chord_size",
+        "duration_ticks",
+        "tuplet_id",
+        "tuplet_actual",
+        "tuplet_normal",
+        "tuplet_index",
+        "tuplet_class",
+        "eighth_pair_ok",
+        "eighth_pair_overflow",
+        "rhythm_token",
+        "rhythm_level",
+        "rhythm_confidence",
+    ),
+    "key_range": (
+        "written_pitch",
+        "written_midi_value",
+        "sounding_midi_value",
+        "sounding_pitch",
+        "brass_partial",
+        "relative_key_index",
+        "range_confidence",
+        "range_exposure",
+    ),
+}
+
+
+def stable_note_id(part_index: int, note: PartialNoteData) -> tuple:
+    """
+    Id shared by every analyzer's record of the same sounding event:
+    (part index, measure, offset ticks, written midi, chord token).
+    """
+    chord_token = None
+    if note.is_chord and note.chord_size:
+        chord_token = (note.chord_size, note.chord_index)
+    offset = note.offset_ticks if note.offset_ticks is not None else round(note.offset, 5)
+    return (part_index, note.measure, offset, note.written_midi_value, chord_token)
+
+
+class NoteTable:
+    """
+    One row per note id; each analyzer writes only the columns it owns,
+    as soon as its notes for a part are final. Safe to fill from the
+    analyzer threads concurrently.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index: dict[tuple, int] = {}
+        self._ids: list[tuple] = []
+        self._base: list[PartialNoteData] = []
+        self._comments: list[dict | None] = []
+        self._columns: dict[str, list] = {}
+        self._merged: dict[int, PartialNoteData] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _upsert(self, note: PartialNoteData, columns: Iterable[str]) -> None:
+        # caller holds _lock
+        if note.note_id is None:
+            raise ValueError("note has no note_id; assign one with stable_note_id at extraction")
+        row = self._index.get(note.note_id)
+        if row is None:
+            row = len(self._ids)
+            self._index[note.note_id] = row
+            self._ids.append(note.note_id)
+            self._base.append(note)
+            self._comments.append(None)
+            for col in self._columns.values():
+                col.append(None)
+        self._merged.pop(row, None)
+        for name in columns:
+            value = getattr(note, name)
+            if value is None:
+                continue
+            col = self._columns.get(name)
+            if col is None:
+                col = self._columns[name] = [None] * len(self._ids)
+            col[row] = value
+        if note.comments:
+            merged = self._comments[row]
+            if merged is None:
+                merged = self._comments[row] = {}
+            merged.update(note.comments)
+
+    def upsert(self, note: PartialNoteData, columns: Iterable[str]) -> None:
+        with self._lock:
+            self._upsert(note, columns)
+
+    def add_analyzer_notes(self, analyzer: str, notes: Iterable[PartialNoteData]) -> None:
+        columns = ANALYZER_COLUMNS.get(analyzer, ())
+        with self._lock:
+            for note in notes:
+                self._upsert(note, columns)
+
+    def merged_notes(self, notes: Iterable[PartialNoteData]) -> list[PartialNoteData]:
+        """
+        The merged row for each note: every analyzer's columns and comments
+        on one record, shared by all analyzers' lists. Notes that never
+        made it into the table are returned as they are.
+        """
+        with self._lock:
+            out = []
+            for note in notes:
+                row = self._index.get(note.note_id) if note.note_id is not None else None
+                out.append(note if row is None else self._merged_row(row))
+            return out
+
+    def _merged_row(self, row: int) -> PartialNoteData:
+        # caller holds _lock
+        merged = self._merged.get(row)
+        if merged is None:
+            values = {
+                name: col[row] for name, col in self._columns.items() if col[row] is not None
+            }
+            comments = self._comments[row]
+            merged = replace(self._base[row], **values, comments=dict(comments) if comments else None)
+            self._merged[row] = merged
+        return merged
+
+    def column(self, name: str) -> list:
+        return list(self._columns.get(name) or [None] * len(self._ids))
+
+    def row(self, note_id: tuple) -> dict:
+        idx = self._index[note_id]
+        data = self._base[idx].as_dict()
+        for name, col in self._columns.items():
+            if col[idx] is not None:
+                data[name] = col[idx]
+        data["comments"] = dict(self._comments[idx] or {})
+        return data
+
+    def view(self) -> "NoteTableView":
+        return NoteTableView(self)
+
+
+class NoteTableView(Mapping):
+    """Read-only note_id -> merged row mapping; rows are built on access."""
+
+    def __init__(self, table: NoteTable):
+        self._table = table
+
+    def __getitem__(self, note_id):
+        return self._table.row(note_id)
+
+    def __iter__(self):
+        return iter(list(self._table._ids))
+
+    def __len__(self):
+        return len(self._table)
+
+    def as_dict(self) -> dict:
+        return {str(note_id): self[note_id] for note_id in self}
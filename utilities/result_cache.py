@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from .json_stream import decode_result, encode_result
+
+_SUFFIX = ".json.z"
+
+
+def result_cache_key(
+    digest: str,
+    target_grade: float,
+    *,
+    target_only: bool,
+    strings_only: bool,
+    grades,
+    rules_ver: str,
+) -> str:
+    """Everything that changes build_final_result's output, hashed to a filename-safe key."""
+    grade_set = ",".join(f"{float(g):g}" for g in sorted(grades)) if grades else ""
+    raw = "|".join(
+        (
+            digest,
+            f"{float(target_grade):g}",
+            "1" if target_only else "0",
+            "1" if strings_only else "0",
+            grade_set,
+            rules_ver,
+        )
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache of final analysis results.
+
+    Both tiers hold results encoded with encode_result (zlib-compressed
+    tagged JSON, never pickle). The memory tier is an LRU bounded by the
+    encoded size; the disk tier is a directory shared by every process
+    (created with mode 0700), trimmed oldest-first past its byte budget.
+    Entries are stored serialized, so callers can never mutate a cached
+    result through a reference they were handed.
+    """
+
+    def __init__(self, directory: str | None, *, memory_bytes: int, disk_bytes: int):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory: OrderedDict[str, tuple[str, bytes]] = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{_SUFFIX}")
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits["memory"] += 1
+        if entry is not None:
+            return decode_result(entry[1])
+
+        blob = self._read_disk(key)
+        if blob is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            result = decode_result(blob)
+        except ValueError:
+            self._remove_disk(key)
+            return None
+        rules_ver = result.get("rules_version") if isinstance(result, dict) else None
+        self._remember(key, rules_ver or "", blob)
+        with self._lock:
+            self.hits["disk"] += 1
+        return result
+
+    def put(self, key: str, result) -> None:
+        blob = encode_result(result)
+        rules_ver = result.get("rules_version") if isinstance(result, dict) else None
+        self._remember(key, rules_ver or "", blob)
+        self._write_disk(key, blob)
+
+    def _remember(self, key: str, rules_ver: str, raw: bytes) -> None:
+        if not self.memory_bytes or len(raw) > self.memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_size -= len(old[1])
+            self._memory[key] = (rules_ver, raw)
+            self._memory_size += len(raw)
+            while self._memory_size > self.memory_bytes and self._memory:
+                _, (_, evicted) = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted)
+
+    def drop_rules_versions_except(self, version: str) -> None:
+        """Memory entries for other rule sets can never be hit again (their keys include it)."""
+        with self._lock:
+            for key in [k for k, (ver, _) in self._memory.items() if ver != version]:
+                _, raw = self._memory.pop(key)
+                self._memory_size -= len(raw)
+
+    # -- disk tier ------------------------------------------------------------
+
+    def _read_disk(self, key: str) -> bytes | None:
+        if not self.directory or not self.disk_bytes:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+        except OSError:
+            return None
+        try:
+            # mtime doubles as the LRU clock for trimming
+            os.utime(path, None)
+        except OSError:
+            pass
+        return blob
+
+    def _write_disk(self, key: str, blob: bytes) -> None:
+        if not self.directory or not self.disk_bytes or len(blob) > self.disk_bytes:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        self._trim_disk()
+
+    def _remove_disk(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _trim_disk(self) -> None:
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith(_SUFFIX):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+        except OSError:
+            return
+        if total <= self.disk_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "memory_budget": self.memory_bytes,
+                "disk_budget": self.disk_bytes,
+                "hits": dict(self.hits),
+                "misses": self.misses,
+            }
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import os
+import posixpath
+import xml.etree.ElementTree as ET
+import zipfile
+
+from music21 import converter
+
+_CONTAINER = "META-INF/container.xml"
+_SCORE_SUFFIXES = (".xml", ".musicxml")
+# an .mxl may not expand past what an uncompressed upload may be
+DEFAULT_MAX_XML_BYTES = 50_000_000
+
+
+class ScoreTooLarge(ValueError):
+    pass
+
+
+def max_xml_bytes() -> int:
+    """Largest MusicXML a score may hold once decompressed (0 = unlimited)."""
+    try:
+        return int(os.environ.get("MAX_SCORE_XML_BYTES", DEFAULT_MAX_XML_BYTES))
+    except ValueError:
+        return DEFAULT_MAX_XML_BYTES
+
+
+def is_compressed_score(score_path: str) -> bool:
+    """Compressed MusicXML (.mxl) is a zip container, whatever the file is called."""
+    try:
+        return zipfile.is_zipfile(score_path)
+    except OSError:
+        return False
+
+
+def root_member(zf: zipfile.ZipFile) -> str:
+    """Name of the score file inside an .mxl container."""
+    names = zf.namelist()
+    if _CONTAINER in names:
+        try:
+            root = ET.fromstring(zf.read(_CONTAINER))
+            for el in root.iter():
+                if el.tag.rsplit("}", 1)[-1] == "rootfile" and el.get("full-path"):
+                    path = posixpath.normpath(el.get("full-path"))
+                    if path in names:
+                        return path
+        except ET.ParseError:
+            pass
+    for name in names:
+        if not name.startswith("META-INF/") and name.lower().endswith(_SCORE_SUFFIXES):
+            return name
+    raise ValueError("Compressed score has no MusicXML file")
+
+
+def _decode_xml(data: bytes) -> str:
+    if data.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return data.decode("utf-16")
+    return data.decode("utf-8-sig")
+
+
+def score_xml_bytes(score_path: str) -> int | None:
+    """
+    Uncompressed size of the score's MusicXML: the declared size of an
+    .mxl's root member, or the file size. None if it can't be read.
+    """
+    try:
+        if is_compressed_score(score_path):
+            with zipfile.ZipFile(score_path) as zf:
+                return zf.getinfo(root_member(zf)).file_size
+        return os.path.getsize(score_path)
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return None
+
+
+def read_score_xml(score_path: str, *, max_bytes: int | None = None) -> str:
+    """
+    MusicXML text of the score inside an .mxl container, read in memory.
+    Raises ScoreTooLarge rather than decompress more than max_bytes
+    (default max_xml_bytes()), whatever size the container declares.
+    """
+    limit = max_xml_bytes() if max_bytes is None else max_bytes
+    with zipfile.ZipFile(score_path) as zf:
+        info = zf.getinfo(root_member(zf))
+        if limit and info.file_size > limit:
+            raise ScoreTooLarge("Score too large")
+        with zf.open(info) as f:
+            data = f.read(limit + 1) if limit else f.read()
+    if limit and len(data) > limit:
+        raise ScoreTooLarge("Score too large")
+    return _decode_xml(data)
+
+
+def load_score(score_path: str):
+    """
+    converter.parse, except that .mxl containers are opened with zipfile
+    and their score is handed to the MusicXML parser as text, so the
+    decompressed XML never goes back to disk.
+    """
+    if is_compressed_score(score_path):
+        return converter.parseData(read_score_xml(score_path), format="musicxml")
+    return converter.parse(score_path)
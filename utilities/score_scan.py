@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import re
+import zipfile
+from dataclasses import asdict, dataclass
+
+from .score_loader import is_compressed_score, max_xml_bytes, root_member
+
+_SCAN_CHUNK = 1024 * 1024
+
+# Tag openings counted by the scan; each alternative is a whole tag name so
+# "<note" never matches "<notehead" / "<notations".
+_TOKENS = re.compile(rb"<(score-part|measure|note|rest|chord|grace)[\s/>]")
+_TOKEN_TAIL = 16
+
+
+@dataclass(frozen=True, slots=True)
+class ScoreStats:
+    """Element counts from a MusicXML pre-scan; measures are summed over parts."""
+
+    parts: int
+    measures: int
+    notes: int
+    rests: int
+    chord_notes: int
+    grace_notes: int
+    xml_bytes: int
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def _count(stream, max_bytes: int = 0) -> ScoreStats:
+    counts = {b"score-part": 0, b"measure": 0, b"note": 0, b"rest": 0, b"chord": 0, b"grace": 0}
+    tail = b""
+    total = 0
+    while True:
+        chunk = stream.read(_SCAN_CHUNK)
+        if not chunk:
+            break
+        total += len(chunk)
+        if max_bytes and total > max_bytes:
+            raise ValueError("Score too large")
+        data = tail + chunk
+        skip = len(tail)
+        for match in _TOKENS.finditer(data):
+            # matches wholly inside the carried tail were counted last round
+            if match.end() > skip:
+                counts[match.group(1)] += 1
+        tail = data[-_TOKEN_TAIL:]
+    return ScoreStats(
+        parts=counts[b"score-part"],
+        measures=counts[b"measure"],
+        # <note> elements include rests; the analyzers only pay for pitched notes
+        notes=max(0, counts[b"note"] - counts[b"rest"]),
+        rests=counts[b"rest"],
+        chord_notes=counts[b"chord"],
+        grace_notes=counts[b"grace"],
+        xml_bytes=total,
+    )
+
+
+def scan_score(score_path: str) -> ScoreStats | None:
+    """
+    Counts parts, measures and notes by scanning the raw MusicXML bytes in
+    1 MiB chunks (inside .mxl containers too) without parsing it, so it
+    takes a small fraction of the music21 parse it helps to predict.
+    Returns None for files it can't read (e.g. UTF-16 encoded XML) and for
+    containers that expand past max_xml_bytes().
+    """
+    try:
+        if is_compressed_score(score_path):
+            with zipfile.ZipFile(score_path) as zf, zf.open(root_member(zf)) as f:
+                stats = _count(f, max_xml_bytes())
+        else:
+            with open(score_path, "rb") as f:
+                stats = _count(f)
+    except (OSError, ValueError, zipfile.BadZipFile):
+        return None
+    if stats.parts == 0 and stats.measures == 0:
+        return None
+    return stats
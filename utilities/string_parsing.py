@@ -1,4 +1,3 @@
-from data_processing import build_instrument_data
 import re, math
 
 
@@ -30,6 +29,9 @@ def _normalize_part_name(name: str) -> str:
 
 
 def validate_part_for_range_analysis(name):
+    # imported here: data_processing imports utilities while it loads
+    from data_processing.build_instrument_data import build_instrument_data
+
     instrument_data = build_instrument_data()
     name = _normalize_part_name(name)
 
@@ -42,6 +44,8 @@ def validate_part_for_range_analysis(name):
 
 
 def validate_part_for_availability(name):
+    from data_processing.build_instrument_data import build_instrument_data
+
     instrument_data = build_instrument_data()
     name = _normalize_part_name(name)
 
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import math
+import threading
+import weakref
+from fractions import Fraction
+
+# Largest tuplet denominator we expect; anything finer is float noise.
+MAX_DENOMINATOR = 65535
+
+_TPQ_CACHE: dict[int, tuple[object, int]] = {}
+_TPQ_LOCK = threading.Lock()
+
+
+def as_fraction(value) -> Fraction:
+    if isinstance(value, Fraction):
+        return value
+    return Fraction(value).limit_denominator(MAX_DENOMINATOR)
+
+
+def compute_ticks_per_quarter(score) -> int:
+    """
+    Smallest tick rate at which every offset and quarterLength in the score
+    is a whole number of ticks (LCM of the Fraction denominators). Time
+    signature beat lengths are included so beat arithmetic stays exact too.
+    """
+    tpq = 1
+    for n in score.recurse().notesAndRests:
+        tpq = math.lcm(tpq, as_fraction(n.offset).denominator)
+        tpq = math.lcm(tpq, as_fraction(n.duration.quarterLength).denominator)
+    for ts in score.recurse().getElementsByClass("TimeSignature"):
+        tpq = math.lcm(tpq, as_fraction(ts.beatDuration.quarterLength).denominator)
+    return tpq
+
+
+def ticks_per_quarter(score) -> int:
+    """Per-score memoized compute_ticks_per_quarter."""
+    key = id(score)
+    with _TPQ_LOCK:
+        cached = _TPQ_CACHE.get(key)
+    if cached is not None:
+        ref, tpq = cached
+        if ref() is score:
+            return tpq
+
+    tpq = compute_ticks_per_quarter(score)
+    try:
+        ref = weakref.ref(score, lambda _r, k=key: _TPQ_CACHE.pop(k, None))
+    except TypeError:
+        return tpq
+    with _TPQ_LOCK:
+        _TPQ_CACHE[key] = (ref, tpq)
+    return tpq
+
+
+def to_ticks(value, tpq: int) -> int | None:
+    """Quarter-length value (float or Fraction) -> integer ticks."""
+    if value is None:
+        return None
+    return round(as_fraction(value) * tpq)
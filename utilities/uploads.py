@@ -0,0 +1,377 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+CHUNK_SIZE = 64 * 1024
+
+_UPLOAD_ID_RE = re.compile(r"[0-9a-f]{32}")
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class UploadOffsetMismatch(ValueError):
+    """A chunk did not start where the stored upload ends; .offset says where to resume."""
+
+    def __init__(self, offset: int):
+        super().__init__(f"Upload is at offset {offset}")
+        self.offset = offset
+
+
+def _copy_stream(stream, f, hasher, *, written: int, max_bytes: int) -> int:
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            return written
+        written += len(chunk)
+        if max_bytes and written > max_bytes:
+            raise UploadTooLarge("Score too large")
+        hasher.update(chunk)
+        f.write(chunk)
+
+
+def _lock_file(f, *, blocking: bool = True) -> bool:
+    """Exclusive advisory lock on an open file, shared with other processes."""
+    if fcntl is None:
+        return True
+    flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+    try:
+        fcntl.flock(f.fileno(), flags)
+    except BlockingIOError:
+        return False
+    return True
+
+
+def _publish(tmp_path: str, upload_dir: str, digest: str, ext: str) -> str:
+    """Moves a finished temp file to its content-addressed name."""
+    save_path = os.path.join(upload_dir, f"{digest}{ext}")
+    if os.path.exists(save_path):
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, save_path)
+    return save_path
+
+
+def save_stream(stream, upload_dir: str, ext: str, *, max_bytes: int) -> tuple[str, str, int]:
+    """
+    Copies an upload stream to UPLOAD_DIR/<sha256><ext> in CHUNK_SIZE
+    pieces, hashing as it goes and stopping as soon as max_bytes is
+    exceeded. Returns (path, digest, size).
+    """
+    tmp_path = os.path.join(upload_dir, f"{uuid.uuid4().hex}.part")
+    hasher = hashlib.sha256()
+    try:
+        with open(tmp_path, "wb") as f:
+            size = _copy_stream(stream, f, hasher, written=0, max_bytes=max_bytes)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    digest = hasher.hexdigest()
+    return _publish(tmp_path, upload_dir, digest, ext), digest, size
+
+
+class ChunkedUploads:
+    """
+    Resumable uploads sent as sequential chunks. State lives next to the
+    data (<id>.part + <id>.json in the upload directory), so any process
+    can accept the next chunk or report the offset to resume from.
+
+    The SHA-256 is updated incrementally while chunks keep arriving at the
+    process that holds the running hash; after a resume elsewhere the
+    finished file is re-hashed from disk in chunks instead.
+
+    Appends and completion hold an flock on the .part file, so concurrent
+    requests for one upload are serialized across processes. Every chunk
+    touches the .json, and cleanup() expires an upload's two files
+    together once neither has been touched within the TTL.
+    """
+
+    def __init__(self, upload_dir: str, *, max_bytes: int):
+        self.upload_dir = upload_dir
+        self.max_bytes = max_bytes
+        self._hashers: dict[str, tuple[object, int]] = {}
+        self._lock = threading.Lock()
+
+    def _paths(self, upload_id: str) -> tuple[str, str]:
+        if not _UPLOAD_ID_RE.fullmatch(upload_id or ""):
+            raise KeyError(upload_id)
+        base = os.path.join(self.upload_dir, upload_id)
+        return f"{base}.part", f"{base}.json"
+
+    def _meta(self, upload_id: str) -> dict:
+        _, meta_path = self._paths(upload_id)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            raise KeyError(upload_id) from None
+
+    def create(self, ext: str, size: int | None = None) -> str:
+        if size is not None and self.max_bytes and size > self.max_bytes:
+            raise UploadTooLarge("Score too large")
+        upload_id = uuid.uuid4().hex
+        data_path, meta_path = self._paths(upload_id)
+        open(data_path, "wb").close()
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"ext": ext, "size": size, "created_at": time.time()}, f)
+        with self._lock:
+            self._hashers[upload_id] = (hashlib.sha256(), 0)
+        return upload_id
+
+    def offset(self, upload_id: str) -> int:
+        data_path, _ = self._paths(upload_id)
+        self._meta(upload_id)
+        try:
+            return os.path.getsize(data_path)
+        except OSError:
+            raise KeyError(upload_id) from None
+
+    def append(self, upload_id: str, offset: int, stream) -> int:
+        """Writes one chunk at offset (which must be the current end); returns the new offset."""
+        data_path, meta_path = self._paths(upload_id)
+        meta = self._meta(upload_id)
+        limit = self.max_bytes
+        if meta.get("size"):
+            limit = min(limit, meta["size"]) if limit else meta["size"]
+        try:
+            f = open(data_path, "r+b")
+        except OSError:
+            raise KeyError(upload_id) from None
+        with f:
+            _lock_file(f)
+            try:
+                os.utime(meta_path, None)
+            except OSError:
+                # expired by cleanup() while we waited for the lock
+                raise KeyError(upload_id) from None
+            with self._lock:
+                hasher, hashed = self._hashers.pop(upload_id, (None, -1))
+            current = f.seek(0, os.SEEK_END)
+            if offset != current:
+                raise UploadOffsetMismatch(current)
+            if hasher is None or hashed != current:
+                # resumed here (or after a failed chunk): re-hash on completion
+                hasher = _NullHasher()
+            try:
+                written = _copy_stream(stream, f, hasher, written=current, max_bytes=limit)
+            except BaseException:
+                # drop the partial chunk so the client can resume at `current`
+                f.truncate(current)
+                raise
+        if not isinstance(hasher, _NullHasher):
+            with self._lock:
+                self._hashers[upload_id] = (hasher, written)
+        return written
+
+    def complete(self, upload_id: str) -> tuple[str, str, int]:
+        """Publishes the finished upload under its digest; returns (path, digest, size)."""
+        data_path, meta_path = self._paths(upload_id)
+        meta = self._meta(upload_id)
+        try:
+            f = open(data_path, "rb")
+        except OSError:
+            raise KeyError(upload_id) from None
+        with f:
+            _lock_file(f)
+            if not os.path.exists(meta_path):
+                # completed or expired while we waited for the lock
+                raise KeyError(upload_id)
+            size = f.seek(0, os.SEEK_END)
+            if meta.get("size") is not None and size != meta["size"]:
+                raise UploadOffsetMismatch(size)
+            with self._lock:
+                hasher, hashed = self._hashers.pop(upload_id, (None, -1))
+            if hasher is None or hashed != size:
+                hasher = hashlib.sha256()
+                f.seek(0)
+                for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    hasher.update(block)
+            digest = hasher.hexdigest()
+            path = _publish(data_path, self.upload_dir, digest, meta.get("ext") or ".musicxml")
+            try:
+                os.remove(meta_path)
+            except OSError:
+                pass
+        return path, digest, size
+
+    def cleanup(self, ttl_seconds: float) -> None:
+        """
+        Removes abandoned chunked uploads: both files of an upload go once
+        the newer of their mtimes is past the TTL and no append holds it.
+        """
+        cutoff = time.time() - ttl_seconds
+        newest: dict[str, float] = {}
+        try:
+            entries = list(os.scandir(self.upload_dir))
+        except OSError:
+            return
+        for entry in entries:
+            stem, ext = os.path.splitext(entry.name)
+            if ext not in (".part", ".json"):
+                continue
+            try:
+                mtime = entry.stat().st_mtime
+            except OSError:
+                continue
+            newest[stem] = max(mtime, newest.get(stem, mtime))
+        for stem, mtime in newest.items():
+            if mtime >= cutoff:
+                continue
+            base = os.path.join(self.upload_dir, stem)
+            try:
+                f = open(f"{base}.part", "rb")
+            except OSError:
+                f = None
+            try:
+                if f is not None and not _lock_file(f, blocking=False):
+                    continue
+                for path in (f"{base}.json", f"{base}.part"):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            finally:
+                if f is not None:
+                    f.close()
+        with self._lock:
+            for upload_id in list(self._hashers):
+                if not os.path.exists(self._paths(upload_id)[0]):
+                    self._hashers.pop(upload_id, None)
+
+
+class _NullHasher:
+    def update(self, _data) -> None:
+        pass
+
+
+_STORED_NAME_RE = re.compile(r"([0-9a-f]{64})\.[^.]+")
+
+
+class UploadStore:
+    """
+    Content-addressed upload directory (<sha256><ext>) held under a byte
+    budget. A file's mtime is its last access; trim() evicts least
+    recently used files first, never ones is_pinned(digest) reports as in
+    use by a queued or running job, nor ones touched in the last
+    `grace_seconds` (a request may be about to queue a job for them).
+    """
+
+    def __init__(
+        self,
+        upload_dir: str,
+        *,
+        budget_bytes: int,
+        is_pinned=None,
+        grace_seconds: float = 60.0,
+    ):
+        self.upload_dir = upload_dir
+        self.budget_bytes = budget_bytes
+        self.is_pinned = is_pinned or (lambda _digest: False)
+        self.grace_seconds = grace_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        os.makedirs(upload_dir, exist_ok=True)
+
+    def _entries(self) -> list[tuple[float, int, str, str]]:
+        entries = []
+        try:
+            with os.scandir(self.upload_dir) as it:
+                for entry in it:
+                    match = _STORED_NAME_RE.fullmatch(entry.name)
+                    if match is None or entry.name.endswith((".part", ".json")):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, match.group(1), entry.path))
+        except OSError:
+            pass
+        return entries
+
+    def touch(self, path: str | None) -> None:
+        if not path:
+            return
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+    def find(self, digest: str) -> str | None:
+        """Stored upload for a SHA-256 digest (any extension), marked as just used."""
+        prefix = f"{digest}."
+        try:
+            with os.scandir(self.upload_dir) as it:
+                for entry in it:
+                    if entry.name.startswith(prefix) and _STORED_NAME_RE.fullmatch(entry.name):
+                        if entry.name.endswith((".part", ".json")):
+                            continue
+                        self.touch(entry.path)
+                        with self._lock:
+                            self.hits += 1
+                        return entry.path
+        except OSError:
+            pass
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def trim(self) -> int:
+        """Evicts LRU files until the store fits its budget; returns bytes freed."""
+        if not self.budget_bytes:
+            return 0
+        entries = self._entries()
+        total = sum(size for _, size, _, _ in entries)
+        if total <= self.budget_bytes:
+            return 0
+        freed = 0
+        cutoff = time.time() - self.grace_seconds
+        for mtime, size, digest, path in sorted(entries):
+            if total <= self.budget_bytes:
+                break
+            if mtime > cutoff:
+                # everything after this was used even more recently
+                break
+            try:
+                if self.is_pinned(digest):
+                    continue
+                os.remove(path)
+            except Exception:
+                continue
+            total -= size
+            freed += size
+            with self._lock:
+                self.evictions += 1
+                self.evicted_bytes += size
+        return freed
+
+    def snapshot(self) -> dict:
+        entries = self._entries()
+        with self._lock:
+            return {
+                "files": len(entries),
+                "bytes": sum(size for _, size, _, _ in entries),
+                "budget": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "evicted_bytes": self.evicted_bytes,
+            }
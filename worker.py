@@ -0,0 +1,98 @@
+"""
+Standalone analysis worker: claims jobs from the shared job store and runs
+them, so analysis can scale across processes independently of the web
+workers (run those with ANALYSIS_WORKER_THREADS=0 to make them HTTP-only).
+
+    python worker.py --threads 2
+
+Long full sweeps can be moved to a niced, batch-only pool of workers
+(`--interactive-threads 0 --nice 10`) while the web processes keep their
+interactive lane, so the OS scheduler favours quick target-only checks.
+
+    python worker.py --smoke input_files/chord_test.musicxml
+
+imports the web app in a scratch state directory, submits one job through
+/api/analyze, runs it and exits non-zero unless it produced a result.
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+
+# this process runs its own loops; don't start the web process's threads too
+os.environ["ANALYSIS_WORKER_THREADS"] = "0"
+
+
+def smoke(score_path: str) -> int:
+    import flask_app
+
+    client = flask_app.app.test_client()
+    resp = client.post(
+        "/api/analyze",
+        json={"score_path": os.path.abspath(score_path), "target_grade": 2, "target_only": True},
+    )
+    job_id = (resp.get_json() or {}).get("job_id")
+    if resp.status_code != 200 or not job_id:
+        print(f"smoke: enqueue failed ({resp.status_code}): {resp.get_data(as_text=True)}")
+        return 1
+    claimed = flask_app.JOB_STORE.claim(f"smoke:{os.getpid()}:0")
+    if claimed is None or claimed[0] != job_id:
+        print("smoke: job was not queued")
+        return 1
+    flask_app._run_job(*claimed)
+    body = client.get(f"/api/result/{job_id}").get_json() or {}
+    if body.get("error") or not body.get("result"):
+        print(f"smoke: job failed: {body.get('error') or 'no result'}")
+        return 1
+    print(f"smoke: ok ({job_id})")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=int(os.environ.get("WORKER_THREADS", 1)),
+        help="Jobs this process runs concurrently",
+    )
+    parser.add_argument(
+        "--interactive-threads",
+        type=int,
+        default=int(os.environ.get("INTERACTIVE_WORKER_THREADS", 0)),
+        help="Extra threads that only take interactive (quick target-only) jobs",
+    )
+    parser.add_argument(
+        "--nice",
+        type=int,
+        default=0,
+        help="Lower this process's CPU priority (e.g. for batch-only workers)",
+    )
+    parser.add_argument(
+        "--smoke",
+        metavar="SCORE",
+        help="Run one job on SCORE in a scratch state directory and exit",
+    )
+    args = parser.parse_args()
+
+    if args.smoke:
+        scratch = tempfile.mkdtemp(prefix="exemplify-smoke-")
+        os.environ["APP_STATE_DIR"] = scratch
+        os.environ["JOB_DB_PATH"] = os.path.join(scratch, "jobs.sqlite3")
+        os.environ["RESULT_CACHE_DIR"] = os.path.join(scratch, "result_cache")
+        os.environ["UPLOAD_DIR"] = os.path.join(scratch, "uploads")
+        try:
+            raise SystemExit(smoke(args.smoke))
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    import flask_app  # config, job store, GC policy
+
+    if args.nice > 0 and hasattr(os, "nice"):
+        os.nice(args.nice)
+    threads = flask_app.start_job_workers(
+        max(1, args.threads), args.interactive_threads, prefix="worker"
+    )
+    for thread in threads:
+        thread.join()